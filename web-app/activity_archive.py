@@ -0,0 +1,240 @@
+"""
+Retention and archival for UserActivity rows.
+
+``flask archive-activity`` moves activity older than the retention horizon
+out of the database into compressed, date-partitioned files:
+
+    ACTIVITY_ARCHIVE_DIR/2025/03/2025-03-14-5f1c2a9b03de.jsonl.gz
+
+Each file holds one day's rows as gzipped JSON Lines, named after a digest
+of its contents: rerunning after an interruption rewrites the same file,
+and files never overwrite one another even if SQLite reuses the ids of
+deleted rows. Rows archived twice (a rerun after an interrupted delete)
+are returned once. The horizon is rounded down to midnight, so a day is
+normally archived whole.
+
+For each day the rows are streamed into the file, which is fsynced and
+renamed into place, and only then deleted from the table in batches of
+ACTIVITY_ARCHIVE_BATCH_SIZE rows, each in its own short transaction, so
+request threads never wait long for the write lock. The freed pages are
+then returned to the filesystem with ``PRAGMA incremental_vacuum`` in steps
+of ACTIVITY_VACUUM_PAGES pages (SQLite only, and only on databases created
+with auto_vacuum=INCREMENTAL; ``--full-vacuum`` converts an older one).
+
+``ActivityArchive.read_month()`` answers "activity for user X in month Y"
+from the archive files, and ``activity_for_month()`` combines it with the
+rows still in the table.
+
+Settings (app.config):
+
+- ACTIVITY_RETENTION_DAYS: days of activity kept in the database (default 90).
+- ACTIVITY_ARCHIVE_DIR: where archive files are written.
+- ACTIVITY_ARCHIVE_BATCH_SIZE: rows deleted per transaction (default 500).
+- ACTIVITY_VACUUM_PAGES: pages released per incremental_vacuum step
+  (default 1000).
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, time, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'user_id', 'activity_type', 'description', 'activity_metadata', 'timestamp')
+
+
+def _month_dir(root, year, month):
+    return os.path.join(root, f'{year:04d}', f'{month:02d}')
+
+
+def _write_rows(path, rows):
+    """Write rows to a gzipped JSON Lines file and fsync it.
+
+    Returns (row count, first id, last id, digest of the rows).
+    """
+    count, first_id, last_id = 0, None, None
+    digest = hashlib.sha1()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as raw:
+        # mtime=0 keeps a rewrite of the same rows byte-for-byte identical
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            for row in rows:
+                record = {name: getattr(row, name) for name in COLUMNS}
+                record['timestamp'] = record['timestamp'].isoformat()
+                line = (json.dumps(record) + '\n').encode()
+                f.write(line)
+                digest.update(line)
+                count += 1
+                first_id = row.id if first_id is None else first_id
+                last_id = row.id
+        raw.flush()
+        os.fsync(raw.fileno())
+    return count, first_id, last_id, digest.hexdigest()[:12]
+
+
+class ActivityArchive:
+    """Archives old activity rows to files and reads them back."""
+
+    def __init__(self, app=None, db=None, model=None):
+        self.db = db
+        self.model = model
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        instance_dir = app.config.get('INSTANCE_DIR', app.instance_path)
+        app.config.setdefault('ACTIVITY_RETENTION_DAYS', 90)
+        app.config.setdefault('ACTIVITY_ARCHIVE_DIR', os.path.join(instance_dir, 'activity_archive'))
+        app.config.setdefault('ACTIVITY_ARCHIVE_BATCH_SIZE', 500)
+        app.config.setdefault('ACTIVITY_VACUUM_PAGES', 1000)
+        self.app = app
+        self.db = db
+        self.model = model
+        app.extensions['activity_archive'] = self
+        app.cli.add_command(archive_activity_command)
+
+    @property
+    def root(self):
+        return self.app.config['ACTIVITY_ARCHIVE_DIR']
+
+    def horizon(self, now=None):
+        """Rows with a timestamp before this are archived: midnight, retention days ago."""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.app.config['ACTIVITY_RETENTION_DAYS'])
+        return datetime.combine(cutoff.date(), time.min)
+
+    def archive(self, now=None, progress=None):
+        """Archive and delete every row older than the horizon, a day at a time.
+
+        ``progress(day, rows)`` is called after each day. Returns the number
+        of rows archived. Must be called inside an application context.
+        """
+        table = self.model.__table__
+        horizon = self.horizon(now)
+        total = 0
+        day_start = None
+        while True:
+            condition = table.c.timestamp < horizon
+            if day_start is not None:
+                condition &= table.c.timestamp >= day_start
+            with self.db.engine.connect() as connection:
+                oldest = connection.scalar(select(func.min(table.c.timestamp)).where(condition))
+            if oldest is None:
+                return total
+            day_start = datetime.combine(oldest.date(), time.min)
+            rows = self._archive_day(day_start, day_start + timedelta(days=1))
+            total += rows
+            if progress:
+                progress(day_start.date(), rows)
+            day_start += timedelta(days=1)
+
+    def _archive_day(self, day_start, day_end):
+        table = self.model.__table__
+        in_day = (table.c.timestamp >= day_start) & (table.c.timestamp < day_end)
+        with self.db.engine.connect() as connection:
+            result = connection.execution_options(yield_per=1000).execute(
+                select(*[table.c[name] for name in COLUMNS]).where(in_day).order_by(table.c.id))
+            day_dir = _month_dir(self.root, day_start.year, day_start.month)
+            partial = os.path.join(day_dir, f'{day_start.date()}.jsonl.gz.partial')
+            count, first_id, last_id, digest = _write_rows(partial, result)
+        if not count:
+            os.remove(partial)
+            return 0
+        os.replace(partial, os.path.join(day_dir, f'{day_start.date()}-{digest}.jsonl.gz'))
+
+        # Only rows that made it into the file; anything logged for this day
+        # since then has a higher id and waits for the next run
+        batch_size = self.app.config['ACTIVITY_ARCHIVE_BATCH_SIZE']
+        batch = (select(table.c.id).where(in_day, table.c.id.between(first_id, last_id))
+                 .limit(batch_size))
+        while True:
+            with self.db.engine.begin() as connection:
+                deleted = connection.execute(table.delete().where(table.c.id.in_(batch))).rowcount
+            if deleted < batch_size:
+                break
+        logger.info(f"Archived {count} activity rows from {day_start.date()}")
+        return count
+
+    def vacuum(self, full=False):
+        """Return free pages to the filesystem after deletes (SQLite only).
+
+        Uses incremental_vacuum in small steps when the database allows it.
+        With ``full``, a database without incremental auto-vacuum is
+        converted with one VACUUM, which locks it for the whole rebuild.
+        Returns the number of pages released.
+        """
+        engine = self.db.engine
+        if engine.dialect.name != 'sqlite':
+            return 0
+        with engine.connect() as connection:
+            free_before = connection.scalar(text('PRAGMA freelist_count'))
+            mode = connection.scalar(text('PRAGMA auto_vacuum'))
+        if mode != 2:
+            if not full:
+                logger.info(f"{free_before} free pages; auto_vacuum is not incremental, "
+                            f"run with --full-vacuum once to convert the database")
+                return 0
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+                connection.execute(text('VACUUM'))
+            return free_before
+        pages = self.app.config['ACTIVITY_VACUUM_PAGES']
+        released = 0
+        while True:
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                free = connection.scalar(text('PRAGMA freelist_count'))
+                if not free:
+                    return released
+                connection.execute(text(f'PRAGMA incremental_vacuum({pages})'))
+                released += free - connection.scalar(text('PRAGMA freelist_count'))
+
+    def read_month(self, user_id, year, month):
+        """Archived activity for user_id in the given month, oldest first."""
+        rows = {}
+        for path in sorted(glob.glob(os.path.join(_month_dir(self.root, year, month), '*.jsonl.gz'))):
+            with gzip.open(path, 'rt') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record['user_id'] == user_id:
+                        # A rerun after an interrupted delete may archive a row twice
+                        rows[record['id'], record['timestamp']] = record
+                        record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+        return sorted(rows.values(), key=lambda record: (record['timestamp'], record['id']))
+
+    def activity_for_month(self, user_id, year, month):
+        """Activity for user_id in a month, from the archive and the live table."""
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+        archived = self.read_month(user_id, year, month) if start < self.horizon() else []
+        table = self.model.__table__
+        live = self.db.session.execute(
+            select(*[table.c[name] for name in COLUMNS])
+            .where(table.c.user_id == user_id, table.c.timestamp >= start, table.c.timestamp < end)
+            .order_by(table.c.timestamp, table.c.id)
+        ).all()
+        archived_keys = {(record['id'], record['timestamp']) for record in archived}
+        records = archived + [row._asdict() for row in live
+                              if (row.id, row.timestamp) not in archived_keys]
+        return sorted(records, key=lambda record: (record['timestamp'], record['id']))
+
+
+@click.command('archive-activity')
+@click.option('--full-vacuum', is_flag=True,
+              help='Convert a database without incremental auto-vacuum with one VACUUM.')
+@with_appcontext
+def archive_activity_command(full_vacuum):
+    """Archive activity older than ACTIVITY_RETENTION_DAYS and reclaim its space."""
+    archive = current_app.extensions['activity_archive']
+    total = archive.archive(progress=lambda day, rows: print(f"{day}: {rows} rows archived"))
+    released = archive.vacuum(full=full_vacuum)
+    print(f"Archived {total} rows before {archive.horizon():%Y-%m-%d} to {archive.root}; "
+          f"released {released} pages")
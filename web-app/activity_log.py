@@ -0,0 +1,189 @@
+"""
+Write-behind logging for UserActivity rows.
+
+Request handlers call ``ActivityLog.record()``, which only puts the event on
+a bounded in-process queue. A background thread drains the queue and writes
+events with one multi-row INSERT per batch, either when ``batch_size``
+events are waiting or ``flush_interval`` seconds after the first one arrived.
+
+If the queue is full the event is written synchronously instead, so nothing
+is dropped under overload. A batch that fails to write (e.g. the database is
+locked or briefly unavailable) is retried with exponential backoff; only a
+batch that still fails after ACTIVITY_WRITE_RETRIES attempts is logged and
+given up. Pending events are flushed at interpreter exit.
+
+``on_write(connection, rows)``, if given, is called with every batch inside
+the transaction that inserts it, e.g. to keep aggregates of the rows in step.
+
+Settings (app.config):
+
+- ACTIVITY_LOG_MODE: ``async`` (default) or ``sync`` to write every event
+  immediately on the calling thread.
+- ACTIVITY_QUEUE_SIZE: maximum number of queued events (default 10000).
+- ACTIVITY_BATCH_SIZE: maximum rows per INSERT (default 200).
+- ACTIVITY_FLUSH_INTERVAL: seconds to wait for a batch to fill (default 1.0).
+- ACTIVITY_WRITE_RETRIES: retries of a failed batch (default 5).
+- ACTIVITY_RETRY_DELAY: seconds before the first retry, doubled for each
+  further one (default 0.2).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+_FLUSH = object()
+_STOP = object()
+
+
+class ActivityLog:
+    """Batches activity events and writes them on a background thread."""
+
+    def __init__(self, app=None, db=None, model=None):
+        self.app = None
+        self.db = db
+        self.model = model
+        self.on_write = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model, on_write=None):
+        app.config.setdefault('ACTIVITY_LOG_MODE', 'async')
+        app.config.setdefault('ACTIVITY_QUEUE_SIZE', 10000)
+        app.config.setdefault('ACTIVITY_BATCH_SIZE', 200)
+        app.config.setdefault('ACTIVITY_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('ACTIVITY_WRITE_RETRIES', 5)
+        app.config.setdefault('ACTIVITY_RETRY_DELAY', 0.2)
+        self.app = app
+        self.db = db
+        self.model = model
+        self.on_write = on_write
+        self._queue = queue.Queue(maxsize=app.config['ACTIVITY_QUEUE_SIZE'])
+        app.extensions['activity_log'] = self
+
+    def record(self, user_id, activity_type, description=None, metadata=None):
+        """Queue an activity event for the background writer."""
+        row = {
+            'user_id': user_id,
+            'activity_type': activity_type,
+            'description': description,
+            'activity_metadata': metadata,
+            'timestamp': datetime.utcnow(),
+        }
+        if self.app.config['ACTIVITY_LOG_MODE'] == 'sync':
+            self._write([row])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            logger.warning("Activity queue full, writing event synchronously")
+            self._write([row])
+
+    def flush(self):
+        """Block until every event recorded so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            self._write(self._drain())
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def stop(self):
+        """Flush pending events and stop the writer thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout=10)
+        self._thread = None
+        self._write(self._drain())
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked worker: the parent's queue and thread are not ours
+                self._queue = queue.Queue(maxsize=self.app.config['ACTIVITY_QUEUE_SIZE'])
+            else:
+                atexit.register(self.stop)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='activity-log-writer',
+                                            daemon=True)
+            self._thread.start()
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return rows
+            self._queue.task_done()
+            if isinstance(item, dict):
+                rows.append(item)
+
+    def _run(self):
+        batch_size = self.app.config['ACTIVITY_BATCH_SIZE']
+        interval = self.app.config['ACTIVITY_FLUSH_INTERVAL']
+        while True:
+            item = self._queue.get()
+            batch, taken, stop = [], 1, item is _STOP
+            if isinstance(item, dict):
+                batch.append(item)
+                deadline = time.monotonic() + interval
+                while len(batch) < batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if not isinstance(item, dict):
+                        stop = item is _STOP
+                        break
+                    batch.append(item)
+            self._write(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, rows):
+        if not rows:
+            return
+        retries = self.app.config['ACTIVITY_WRITE_RETRIES']
+        delay = self.app.config['ACTIVITY_RETRY_DELAY']
+        for attempt in range(retries + 1):
+            try:
+                with self.app.app_context():
+                    with self.db.engine.begin() as connection:
+                        connection.execute(self.model.__table__.insert(), rows)
+                        if self.on_write:
+                            self.on_write(connection, rows)
+                return
+            except SQLAlchemyError as e:
+                if attempt == retries:
+                    logger.error(f"Failed to write {len(rows)} activity events "
+                                 f"after {retries + 1} attempts: {e}")
+                    return
+                logger.warning(f"Writing {len(rows)} activity events failed, "
+                               f"retrying in {delay:.1f} s: {e}")
+                time.sleep(delay)
+                delay *= 2
+            except Exception as e:
+                logger.error(f"Failed to write {len(rows)} activity events: {e}")
+                return
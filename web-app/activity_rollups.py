@@ -0,0 +1,237 @@
+"""
+Pre-aggregated activity counts.
+
+Questions like "logins per day" or "active users this week" are answered
+from a rollup table instead of scanning UserActivity. It holds one row per
+(period, bucket, activity_type, user_id) with the number of events in it:
+
+- ``hour`` buckets (starting on the hour) with totals per activity type,
+  under user_id ALL_USERS
+- ``day`` buckets (starting at midnight) with the same totals, plus one row
+  per user active that day, which also answers "distinct active users"
+
+Per-user counts are kept per day only: per user and hour, buckets hardly
+ever hold more than an event or two, so they would cost about as many rows
+as the activity table itself. Timestamps are UTC, like the activity rows.
+
+Rollups are maintained incrementally: ``ActivityRollups.apply()`` adds a
+batch of new activity rows to their buckets with one upsert per batch, in
+the same transaction as the INSERT that writes them. The activity log
+writer calls it for every batch, and app.py does the same for UserActivity
+objects flushed through the ORM. Deleting activity rows (e.g. archiving
+them) leaves the rollups alone, so they keep covering history that is no
+longer in the table.
+
+``flask backfill-activity-rollups`` rebuilds the buckets from the rows
+still in the table, e.g. after the first deploy or a restore: every bucket
+from the day of the oldest row (or ``--since``) onwards is recomputed with
+one GROUP BY query, while earlier buckets, whose rows may already be
+archived, are kept.
+
+Upserts and hour truncation are written for SQLite and PostgreSQL.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('hour', 'day')
+# Periods with per-user buckets
+USER_PERIODS = ('day',)
+# user_id of the per-type totals (real user ids start at 1)
+ALL_USERS = 0
+PERIOD_LENGTH = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+# Rollup rows written per INSERT during a backfill
+BACKFILL_BATCH_SIZE = 1000
+
+_UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def bucket_start(timestamp, period):
+    """Start of the period-long bucket a timestamp falls in."""
+    if period == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return datetime.combine(timestamp.date(), time.min)
+
+
+def bucket_end(timestamp, period):
+    """End of the bucket a timestamp falls in, or the timestamp itself on a boundary."""
+    start = bucket_start(timestamp, period)
+    return start if start == timestamp else start + PERIOD_LENGTH[period]
+
+
+def buckets(start, end, period):
+    """Bucket starts from start (inclusive) to end (exclusive)."""
+    bucket = bucket_start(start, period)
+    while bucket < end:
+        yield bucket
+        bucket += PERIOD_LENGTH[period]
+
+
+def _hour_of(column, dialect):
+    if dialect == 'sqlite':
+        return func.strftime('%Y-%m-%d %H:00:00', column)
+    return func.date_trunc('hour', column)
+
+
+class ActivityRollups:
+    """Keeps hourly and daily activity counts and reads them back."""
+
+    def __init__(self, app=None, db=None, model=None, rollup_model=None):
+        self.db = db
+        self.model = model
+        self.rollup_model = rollup_model
+        if app is not None:
+            self.init_app(app, db, model, rollup_model)
+
+    def init_app(self, app, db, model, rollup_model):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.rollup_model = rollup_model
+        app.extensions['activity_rollups'] = self
+        app.cli.add_command(backfill_activity_rollups_command)
+
+    def apply(self, connection, rows):
+        """Add activity rows (dicts with user_id, activity_type and timestamp)
+        to their hourly and daily buckets, in connection's transaction."""
+        counts = Counter()
+        for row in rows:
+            for period in PERIODS:
+                bucket = bucket_start(row['timestamp'], period)
+                counts[period, bucket, row['activity_type'], ALL_USERS] += 1
+                if period in USER_PERIODS:
+                    counts[period, bucket, row['activity_type'], row['user_id']] += 1
+        if not counts:
+            return
+        rollups = self.rollup_model.__table__
+        stmt = _UPSERTS[connection.dialect.name](rollups)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in rollups.primary_key],
+            set_={'count': rollups.c.count + stmt.excluded['count']},
+        )
+        connection.execute(stmt, [
+            {'period': period, 'bucket_start': bucket, 'activity_type': activity_type,
+             'user_id': user_id, 'count': count}
+            for (period, bucket, activity_type, user_id), count in counts.items()
+        ])
+
+    def oldest_activity(self, connection):
+        """Timestamp of the oldest activity row in the table, or None."""
+        return connection.scalar(select(func.min(self.model.__table__.c.timestamp)))
+
+    def backfill(self, connection, since=None, until=None):
+        """Recompute every bucket from since (default: the oldest row's day) to until.
+
+        Both ends are rounded down to midnight, so whole days are rebuilt.
+        Buckets outside the range are left as they are. Returns the number
+        of activity rows counted.
+        """
+        since = since or self.oldest_activity(connection)
+        if since is None:
+            return 0
+        since = bucket_start(since, 'day')
+        until = bucket_start(until, 'day') if until else None
+        activity = self.model.__table__
+        rollups = self.rollup_model.__table__
+
+        in_range = rollups.c.bucket_start >= since
+        if until:
+            in_range &= rollups.c.bucket_start < until
+        connection.execute(rollups.delete().where(in_range))
+
+        hour = _hour_of(activity.c.timestamp, connection.dialect.name).label('hour')
+        condition = activity.c.timestamp >= since
+        if until:
+            condition &= activity.c.timestamp < until
+        result = connection.execution_options(yield_per=BACKFILL_BATCH_SIZE).execute(
+            select(hour, activity.c.activity_type, activity.c.user_id, func.count().label('count'))
+            .where(condition)
+            .group_by(hour, activity.c.activity_type, activity.c.user_id)
+        )
+        counts = Counter()
+        for row in result:
+            hour = row.hour if isinstance(row.hour, datetime) else datetime.fromisoformat(row.hour)
+            day = bucket_start(hour, 'day')
+            counts['hour', hour, row.activity_type, ALL_USERS] += row.count
+            counts['day', day, row.activity_type, ALL_USERS] += row.count
+            counts['day', day, row.activity_type, row.user_id] += row.count
+        rows = [{'period': period, 'bucket_start': bucket, 'activity_type': activity_type,
+                 'user_id': user_id, 'count': count}
+                for (period, bucket, activity_type, user_id), count in counts.items()]
+        for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+            connection.execute(rollups.insert(), rows[start:start + BACKFILL_BATCH_SIZE])
+        total = sum(count for (period, _, _, user_id), count in counts.items()
+                    if period == 'day' and user_id == ALL_USERS)
+        logger.info(f"Backfilled activity rollups from {since:%Y-%m-%d}: {total} events")
+        return total
+
+    def _filtered(self, stmt, period, start, end, activity_type=None):
+        rollups = self.rollup_model.__table__
+        stmt = stmt.where(rollups.c.period == period, rollups.c.bucket_start >= start,
+                          rollups.c.bucket_start < end)
+        if activity_type:
+            stmt = stmt.where(rollups.c.activity_type == activity_type)
+        return stmt
+
+    def counts(self, period, start, end, activity_type=None, user_id=None):
+        """Event counts per bucket and activity type between start and end,
+        for everyone or for one user (periods in USER_PERIODS only).
+
+        Returns [(bucket start, {activity_type: count})] for every bucket in
+        the range, empty ones included.
+        """
+        if user_id and period not in USER_PERIODS:
+            raise ValueError(f"Per-user counts are not kept per {period}")
+        rollups = self.rollup_model.__table__
+        start, end = bucket_start(start, period), bucket_end(end, period)
+        stmt = self._filtered(
+            select(rollups.c.bucket_start, rollups.c.activity_type, rollups.c.count),
+            period, start, end, activity_type,
+        ).where(rollups.c.user_id == (user_id or ALL_USERS))
+        series = {bucket: {} for bucket in buckets(start, end, period)}
+        for bucket, row_type, count in self.db.session.execute(stmt):
+            series[bucket][row_type] = count
+        return list(series.items())
+
+    def active_users(self, start, end, activity_type=None):
+        """Distinct users with activity on each day and in the whole range.
+
+        Returns ([(day, users)], users in the range).
+        """
+        rollups = self.rollup_model.__table__
+        start, end = bucket_start(start, 'day'), bucket_end(end, 'day')
+        users = func.count(rollups.c.user_id.distinct())
+        stmt = self._filtered(select(rollups.c.bucket_start, users), 'day', start, end, activity_type)
+        stmt = stmt.where(rollups.c.user_id != ALL_USERS)
+        series = dict.fromkeys(buckets(start, end, 'day'), 0)
+        series.update(self.db.session.execute(stmt.group_by(rollups.c.bucket_start)).all())
+        total = self.db.session.scalar(stmt.with_only_columns(users))
+        return list(series.items()), total
+
+
+@click.command('backfill-activity-rollups')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='First day to rebuild (default: the day of the oldest activity row).')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Day to stop before (default: rebuild up to now).')
+@with_appcontext
+def backfill_activity_rollups_command(since, until):
+    """Rebuild hourly and daily activity rollups from the activity table."""
+    rollups = current_app.extensions['activity_rollups']
+    with rollups.db.engine.begin() as connection:
+        since = since or rollups.oldest_activity(connection)
+        total = rollups.backfill(connection, since, until)
+    if since is None:
+        print("No activity to roll up")
+        return
+    print(f"Rolled up {total} activity events from {since:%Y-%m-%d}"
+          + (f" until {until:%Y-%m-%d}" if until else ''))
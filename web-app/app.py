@@ -4,33 +4,130 @@ TechFlow - Professional Developer Collaboration Platform
 A modern web application for team collaboration, project management, and code sharing.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, get_flashed_messages, get_flashed_messages
+from flask import Blueprint, Flask, render_template, request, redirect, url_for, flash, session, jsonify, get_flashed_messages, get_flashed_messages, Response, stream_with_context, current_app, make_response, g, has_app_context
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup, escape
+from sqlalchemy import Float, String, bindparam, column, event, func, inspect, literal, literal_column, or_, select, table, tuple_, union_all
+from sqlalchemy.orm import Session, column_property, joinedload
+from activity_archive import ActivityArchive
+from activity_log import ActivityLog
+from activity_rollups import (PERIOD_LENGTH, PERIODS as ACTIVITY_PERIODS, USER_PERIODS as ACTIVITY_USER_PERIODS,
+                              ActivityRollups, bucket_start)
+from assets import Assets
+from bulk_import import IMPORT_FORMATS, BulkImport, describe_import
+from cache import Cache
+from compression import Compression
+from fragment_cache import FragmentCacheExtension
+from metrics import Metrics
+from passwords import PasswordHasher
+from sql_instrumentation import SQLInstrumentation
+import click
+import functools
+import hashlib
 import os
+import re
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 import uuid
 import json
+import base64
+import csv
+import io
+from dataclasses import dataclass
+from typing import List, Optional
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'techflow-secret-key-2025-enterprise'
+# Application routes and error handlers, registered on each app by create_app()
+main = Blueprint('main', __name__)
 
-# Create instance directory if it doesn't exist
-instance_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance')
-os.makedirs(instance_path, exist_ok=True)
+def default_config():
+    """Configuration read from the environment when an app is created."""
+    # Use absolute path for database (DATABASE_URL overrides it, e.g. for tests).
+    # Instance data lives next to the web-app directory unless INSTANCE_PATH
+    # says otherwise (the Docker image keeps it under /app/instance).
+    instance_path = os.getenv('INSTANCE_PATH') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+    db_path = os.path.join(instance_path, 'techflow.db')
+    return {
+        'SECRET_KEY': 'techflow-secret-key-2025-enterprise',
+        'INSTANCE_DIR': instance_path,
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL', f'sqlite:///{db_path}'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'DATABASE_PROFILE': os.getenv(
+            'DATABASE_PROFILE', 'prod' if os.getenv('FLASK_ENV') == 'production' else 'dev'),
+        'CACHE_URL': os.getenv('CACHE_URL', 'memory://'),
+        'CACHE_DEFAULT_TTL': int(os.getenv('CACHE_DEFAULT_TTL', '300')),
+        'ACTIVITY_LOG_MODE': os.getenv('ACTIVITY_LOG_MODE', 'async'),
+        'ACTIVITY_RETENTION_DAYS': int(os.getenv('ACTIVITY_RETENTION_DAYS', '90')),
+        'ACTIVITY_ARCHIVE_DIR': os.getenv('ACTIVITY_ARCHIVE_DIR', os.path.join(instance_path, 'activity_archive')),
+        'PASSWORD_HASH_METHOD': os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+        # Per app process; 0 leaves concurrent hashes unbounded
+        'PASSWORD_HASH_CONCURRENCY': int(os.getenv('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 1)),
+        'SQL_SLOW_QUERY_MS': float(os.getenv('SQL_SLOW_QUERY_MS', '100')),
+        'COMPRESS_LEVEL': int(os.getenv('COMPRESS_LEVEL', '6')),
+        # Compiled templates, shared by every worker (empty disables the cache)
+        'JINJA_CACHE_DIR': os.getenv('JINJA_CACHE_DIR', os.path.join(instance_path, 'jinja_cache')),
+        'SCHEMA_AUTO_MIGRATE': os.getenv('SCHEMA_AUTO_MIGRATE', 'true').lower() == 'true',
+    }
+
+# SQLite tuning profiles, applied to every new connection. WAL lets readers
+# run alongside a writer, and busy_timeout makes writers queue for the lock
+# instead of failing with "database is locked". auto_vacuum only takes effect
+# on a new database (it must come before journal_mode) and lets the activity
+# archiver hand deleted pages back with incremental_vacuum.
+SQLITE_PROFILES = {
+    'dev': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL',
+    },
+    'prod': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'busy_timeout': 10000,
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,       # 64 MB page cache per connection
+        'mmap_size': 268435456,     # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+    },
+    'test': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'busy_timeout': 10000,
+        'synchronous': 'OFF',
+        'temp_store': 'MEMORY',
+    },
+}
 
-# Use absolute path for database
-db_path = os.path.join(instance_path, 'techflow.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def sqlite_profile_listener(profile):
+    """Build a connect listener applying a SQLITE_PROFILES entry."""
+    pragmas = SQLITE_PROFILES[profile]
+    
+    def apply_sqlite_profile(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return apply_sqlite_profile
 
-db = SQLAlchemy(app)
+db = SQLAlchemy()
+cache = Cache()
+passwords = PasswordHasher()
+sql_instrumentation = SQLInstrumentation()
+metrics = Metrics()
+activity_log = ActivityLog()
+activity_archive = ActivityArchive()
+activity_rollups = ActivityRollups()
+bulk_import = BulkImport()
+assets = Assets()
+compression = Compression()
 
 # Database Models
 class User(db.Model):
@@ -49,7 +146,9 @@ class User(db.Model):
     last_active = db.Column(db.DateTime)
     
     # Relationships
-    projects = db.relationship('Project', backref='owner', lazy=True)
+    # Templates render project.owner.username for every listed project, so
+    # the owner is always fetched in the same SELECT as the project.
+    projects = db.relationship('Project', backref=db.backref('owner', lazy='joined'), lazy=True)
     team_memberships = db.relationship('TeamMember', backref='user', lazy=True)
     activities = db.relationship('UserActivity', backref='user', lazy=True)
     
@@ -62,7 +161,8 @@ class Project(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     repository_url = db.Column(db.String(200))
-    status = db.Column(db.String(50), default='active')  # active, archived, completed
+    # active_history keeps the previous status available to the counter hooks
+    status = column_property(db.Column(db.String(50), default='active'), active_history=True)  # active, archived, completed
     visibility = db.Column(db.String(50), default='private')  # private, public, team
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -70,7 +170,14 @@ class Project(db.Model):
     
     # Relationships
     team_members = db.relationship('TeamMember', backref='project', lazy=True)
-    tasks = db.relationship('Task', backref='project', lazy=True)
+    tasks = db.relationship('Task', backref=db.backref('project', lazy='joined'), lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_project_owner_id_updated_at', 'owner_id', 'updated_at'),
+        db.Index('ix_project_visibility_updated_at', 'visibility', 'updated_at'),
+        db.Index('ix_project_status', 'status'),
+        db.Index('ix_project_updated_at', 'updated_at'),
+    )
     
     def __repr__(self):
         return f'<Project {self.name}>'
@@ -83,6 +190,10 @@ class TeamMember(db.Model):
     role = db.Column(db.String(50), default='member')  # owner, admin, member, viewer
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_team_member_user_id_project_id', 'user_id', 'project_id'),
+    )
+    
     def __repr__(self):
         return f'<TeamMember {self.user_id}:{self.project_id}>'
 
@@ -91,7 +202,7 @@ class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    status = db.Column(db.String(50), default='todo')  # todo, in_progress, review, done
+    status = column_property(db.Column(db.String(50), default='todo'), active_history=True)  # todo, in_progress, review, done
     priority = db.Column(db.String(50), default='medium')  # low, medium, high, urgent
     assignee_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
@@ -99,6 +210,10 @@ class Task(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     due_date = db.Column(db.DateTime)
     
+    __table_args__ = (
+        db.Index('ix_task_assignee_id_status_due_date', 'assignee_id', 'status', 'due_date'),
+    )
+    
     def __repr__(self):
         return f'<Task {self.title}>'
 
@@ -111,22 +226,527 @@ class UserActivity(db.Model):
     activity_metadata = db.Column(db.Text)  # JSON string for additional data
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_user_activity_user_id_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_user_activity_timestamp', 'timestamp'),
+    )
+    
     def __repr__(self):
         return f'<UserActivity {self.activity_type}'
 
+class ActivityRollup(db.Model):
+    """Number of activity events per hour or day and activity type, in total
+    and (per day) for each user."""
+    period = db.Column(db.String(4), primary_key=True)  # hour, day
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    activity_type = db.Column(db.String(50), primary_key=True)
+    # 0 for the total over all users. No foreign key: rollups outlive the
+    # activity rows, and may outlive users
+    user_id = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_activity_rollup_user_id_period_bucket_start', 'user_id', 'period', 'bucket_start'),
+    )
+    
+    def __repr__(self):
+        return f'<ActivityRollup {self.period} {self.bucket_start} {self.activity_type}={self.count}>'
+
+class PlatformCounter(db.Model):
+    """Precomputed platform-wide totals shown on the landing page and /api/stats."""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PlatformCounter {self.name}={self.value}>'
+
+class SchemaMigration(db.Model):
+    """Schema migrations applied to this database."""
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaMigration {self.version}>'
+
+class DataVersion(db.Model):
+    """Change counter per table, used to build HTTP validators."""
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.table_name}={self.version}>'
+
+class ImportJob(db.Model):
+    """A bulk import run, checkpointed after every committed chunk."""
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(200))
+    format = db.Column(db.String(10), nullable=False)  # csv, ndjson
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, failed, completed
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    projects_created = db.Column(db.Integer, nullable=False, default=0)
+    members_created = db.Column(db.Integer, nullable=False, default=0)
+    tasks_created = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
+
+class ImportProjectKey(db.Model):
+    """A project created by an import, under the key its file refers to it by."""
+    job_id = db.Column(db.Integer, db.ForeignKey('import_job.id'), primary_key=True)
+    key = db.Column(db.String(100), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    
+    def __repr__(self):
+        return f'<ImportProjectKey {self.job_id}:{self.key}>'
+
+# Platform counters
+# Source of truth for each counter, used to rebuild them from scratch.
+COUNTER_QUERIES = {
+    'total_users': lambda: User.query.count(),
+    'total_projects': lambda: Project.query.count(),
+    'active_projects': lambda: Project.query.filter_by(status='active').count(),
+    'total_tasks': lambda: Task.query.count(),
+    'completed_tasks': lambda: Task.query.filter_by(status='done').count(),
+}
+
+def _status_of(obj):
+    """Status an object will be stored with, applying the column default."""
+    if obj.status is not None:
+        return obj.status
+    return type(obj).__table__.c.status.default.arg
+
+def _status_change(obj):
+    """Return (old, new) status for a dirty Project/Task, or None if unchanged."""
+    history = db.inspect(obj).attrs.status.history
+    if not history.has_changes():
+        return None
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+def _counter_deltas(session):
+    """Work out how the pending flush changes each platform counter."""
+    deltas = dict.fromkeys(COUNTER_QUERIES, 0)
+    
+    def count(obj, sign, status=None):
+        if isinstance(obj, User):
+            deltas['total_users'] += sign
+        elif isinstance(obj, Project):
+            deltas['total_projects'] += sign
+            if status == 'active':
+                deltas['active_projects'] += sign
+        elif isinstance(obj, Task):
+            deltas['total_tasks'] += sign
+            if status == 'done':
+                deltas['completed_tasks'] += sign
+    
+    for obj in session.new:
+        if isinstance(obj, (User, Project, Task)):
+            count(obj, 1, None if isinstance(obj, User) else _status_of(obj))
+    for obj in session.deleted:
+        if isinstance(obj, (User, Project, Task)):
+            count(obj, -1, None if isinstance(obj, User) else obj.status)
+    for obj in session.dirty:
+        if isinstance(obj, (Project, Task)) and obj not in session.deleted:
+            change = _status_change(obj)
+            if change:
+                old, new = change
+                if isinstance(obj, Project):
+                    deltas['active_projects'] += (new == 'active') - (old == 'active')
+                else:
+                    deltas['completed_tasks'] += (new == 'done') - (old == 'done')
+    return {name: delta for name, delta in deltas.items() if delta}
+
+@event.listens_for(Session, 'before_flush')
+def update_platform_counters(session, flush_context, instances):
+    """Apply counter deltas in the same transaction as the rows they count."""
+    deltas = _counter_deltas(session)
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+def apply_counter_deltas(connection, deltas):
+    """Add deltas to platform counters. Writes that bypass the ORM call this."""
+    counters = PlatformCounter.__table__
+    for name, delta in deltas.items():
+        connection.execute(
+            counters.update()
+            .where(counters.c.name == name)
+            .values(value=counters.c.value + delta)
+        )
+
+def reconcile_counters():
+    """Recompute every platform counter from the underlying tables."""
+    values = {name: query() for name, query in COUNTER_QUERIES.items()}
+    for name, value in values.items():
+        db.session.merge(PlatformCounter(name=name, value=value))
+    return values
+
+def get_platform_stats():
+    """Read the precomputed platform counters in a single query."""
+    values = {counter.name: counter.value for counter in PlatformCounter.query.all()}
+    if set(values) != set(COUNTER_QUERIES):
+        # Counters never initialised on this database; build them once
+        values = reconcile_counters()
+        db.session.commit()
+    return values
+
+# Cache invalidation
+# Cached data is tagged with the names of the tables it was read from. Every
+# commit that touched one of those tables retires the matching entries.
+# Columns written by every login that no cached data or versioned view reads.
+# Updates to these alone neither retire cache entries nor bump data versions,
+# so logins leave the landing page, stats and their ETags alone.
+UNTRACKED_COLUMNS = {'user': {'last_login', 'last_active', 'password_hash'}}
+
+def has_tracked_changes(session, obj):
+    """True if a dirty object changed a column that cached data or ETags depend on."""
+    if not session.is_modified(obj, include_collections=False):
+        return False
+    untracked = UNTRACKED_COLUMNS.get(obj.__table__.name)
+    if not untracked:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[key].history.has_changes()
+               for key in state.mapper.column_attrs.keys() if key not in untracked)
+
+@event.listens_for(Session, 'after_flush')
+def collect_cache_tags(session, flush_context):
+    tags = session.info.setdefault('cache_tags', set())
+    for obj in (*session.new, *session.deleted):
+        tags.add(obj.__table__.name)
+    tags.update(obj.__table__.name for obj in session.dirty if has_tracked_changes(session, obj))
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_cache_tags(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        cache.invalidate(*tags)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_cache_tags(session):
+    session.info.pop('cache_tags', None)
+
+# HTTP conditional requests
+# Every ORM flush that writes to a versioned table bumps that table's row in
+# data_version, in the same transaction. Cacheable views hash the versions of
+# the tables they read into a weak ETag and answer 304 Not Modified before
+# doing any other work when the client already has that version.
+VERSIONED_TABLES = ('user', 'project', 'team_member', 'task')
+
+# Per-route Cache-Control policies. Pages and per-user API results depend on
+# the session, so browsers must revalidate them; platform stats are the same
+# for everyone and may be reused for a short while.
+CACHE_CONTROL_PRIVATE = 'private, no-cache'
+CACHE_CONTROL_STATS = 'public, max-age=30'
+
+def touch_data_versions(connection, tables):
+    """Bump the version of each table. Writes that bypass the ORM call this."""
+    tables = [name for name in tables if name in VERSIONED_TABLES]
+    if not tables:
+        return
+    forget_data_versions()
+    versions = DataVersion.__table__
+    connection.execute(
+        versions.update()
+        .where(versions.c.table_name.in_(tables))
+        .values(version=versions.c.version + 1, changed_at=datetime.utcnow())
+    )
+
+def record_bulk_write(session, tables):
+    """Version and invalidate tables written with core SQL in session's transaction."""
+    touch_data_versions(session.connection(), tables)
+    session.info.setdefault('cache_tags', set()).update(tables)
+
+@event.listens_for(Session, 'before_flush')
+def bump_data_versions(session, flush_context, instances):
+    tables = {obj.__table__.name for obj in (*session.new, *session.deleted)}
+    tables.update(obj.__table__.name for obj in session.dirty if has_tracked_changes(session, obj))
+    if tables & set(VERSIONED_TABLES):
+        touch_data_versions(session.connection(), tables)
+
+def data_versions(tables):
+    """Return (versions, last change) for tables, or None if they are not tracked yet.
+    
+    Read from the database (a primary-key lookup of a few rows) at most once
+    per request and table, never from the cache: with a per-process cache,
+    other workers would keep answering 304 for a version a write has already
+    replaced. Writes in the request forget what was read.
+    """
+    known = g.setdefault('data_versions', {})
+    missing = [name for name in tables if name not in known]
+    if missing:
+        known.update(dict.fromkeys(missing))
+        known.update((row.table_name, row) for row in db.session.execute(
+            select(DataVersion.table_name, DataVersion.version, DataVersion.changed_at)
+            .where(DataVersion.table_name.in_(missing))
+        ))
+    rows = [known[name] for name in tables]
+    if None in rows:
+        return None
+    return [row.version for row in rows], max(row.changed_at for row in rows)
+
+@main.before_app_request
+def forget_data_versions():
+    if has_app_context():
+        g.pop('data_versions', None)
+
+def data_version(*tables):
+    """Combined version of tables as a string, e.g. for fragment cache keys."""
+    state = data_versions(tables)
+    return None if state is None else '.'.join(str(version) for version in state[0])
+
+def code_version():
+    """Fingerprint of the code and templates, so a deploy changes every ETag."""
+    if 'CODE_VERSION' not in current_app.config:
+        digest = hashlib.sha1()
+        root = os.path.dirname(os.path.abspath(__file__))
+        paths = [os.path.abspath(__file__)]
+        for directory in ('templates', 'static'):
+            for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+                paths.extend(os.path.join(dirpath, name) for name in sorted(filenames))
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f'{os.path.relpath(path, root)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        current_app.config['CODE_VERSION'] = digest.hexdigest()[:12]
+    return current_app.config['CODE_VERSION']
+
+def conditional(*tables, cache_control=CACHE_CONTROL_PRIVATE, per_user=True):
+    """Serve a GET view with a data-version ETag and Last-Modified.
+    
+    The ETag covers the code version, the endpoint, the query string, the
+    versions of ``tables`` and, with ``per_user``, the logged-in user. A
+    matching If-None-Match returns 304 without calling the view. Requests
+    with pending flash messages are always rendered so the messages are shown.
+    
+    Last-Modified is informational only: If-Modified-Since is not answered
+    with 304, since a whole-second date can miss a second write in the same
+    second, and it knows nothing of the user or the code version.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if per_user and session.get('_flashes'):
+                return f(*args, **kwargs)
+            state = data_versions(tables)
+            if state is None:
+                return f(*args, **kwargs)
+            versions, changed_at = state
+            key = [code_version(), request.endpoint, sorted(request.args.items(multi=True)), versions]
+            if per_user:
+                key.append((session.get('user_id'), session.get('user')))
+            etag = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+            not_modified = request.if_none_match.contains_weak(etag)
+            response = Response(status=304) if not_modified else make_response(f(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                response.last_modified = changed_at.replace(microsecond=0)
+                response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
+
+def project_summary(project):
+    """Plain-data view of a project and its owner, safe to cache."""
+    return {
+        'id': project.id,
+        'name': project.name,
+        'description': project.description,
+        'repository_url': project.repository_url,
+        'status': project.status,
+        'visibility': project.visibility,
+        'created_at': project.created_at,
+        'updated_at': project.updated_at,
+        'owner': {'id': project.owner.id, 'username': project.owner.username},
+    }
+
+# Cached data read by views with a data-version ETag is keyed on the same
+# versions, so no worker serves a body older than the ETag it sends, even if
+# the write happened in another process and left this cache untouched.
+@cache.cached(key='featured_projects', tags=('project', 'user'), version=lambda: data_version('project', 'user'))
+def featured_projects_data():
+    """Public projects shown on the landing page."""
+    projects = Project.query.options(joinedload(Project.owner)).filter_by(visibility='public').limit(6).all()
+    return [project_summary(project) for project in projects]
+
+@cache.cached(key='public_projects', tags=('project', 'user'), version=lambda: data_version('project', 'user'))
+def public_projects_data():
+    """Public projects listed on the projects page."""
+    projects = Project.query.options(joinedload(Project.owner)).filter_by(visibility='public').limit(10).all()
+    return [project_summary(project) for project in projects]
+
+@cache.cached(key='platform_stats', tags=('user', 'project', 'task', 'platform_counter'),
+              version=lambda: data_version('user', 'project', 'task'))
+def platform_stats_data():
+    return get_platform_stats()
+
+# Keyset pagination
+# Lists are ordered newest first by (updated_at, id). A cursor encodes the
+# last row of the previous page, so each page is an index range scan that
+# costs the same no matter how deep into the list it is.
+PAGE_SIZE = 12
+MAX_PAGE_SIZE = 50
+
+def encode_cursor(row):
+    raw = f"{row.updated_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (updated_at, id) from a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        updated_at, row_id = raw.split('|')
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def page_size_arg(name='per_page'):
+    """Page size from the query string, clamped to MAX_PAGE_SIZE."""
+    size = request.args.get(name, PAGE_SIZE, type=int)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def keyset_after(query, model, cursor):
+    """Restrict a Query or select() to rows after cursor, newest first."""
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(tuple_(model.updated_at, model.id) < position)
+    return query.order_by(model.updated_at.desc(), model.id.desc())
+
+def keyset_page(query, model, cursor, per_page):
+    """Return (rows, next_cursor) for the page of query after cursor."""
+    rows = keyset_after(query, model, cursor).limit(per_page + 1).all()
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Rebuild platform counters from scratch to repair drift."""
+    values = reconcile_counters()
+    db.session.commit()
+    for name, value in values.items():
+        print(f"{name}: {value}")
+
+# Dashboard data
+ACTIVE_TASK_STATUSES = ('todo', 'in_progress')
+
+@dataclass(frozen=True)
+class DashboardProject:
+    id: int
+    name: str
+    status: Optional[str]
+    created_at: Optional[datetime]
+    owner_username: Optional[str]
+
+@dataclass(frozen=True)
+class DashboardActivity:
+    id: int
+    activity_type: str
+    description: Optional[str]
+    timestamp: Optional[datetime]
+
+@dataclass(frozen=True)
+class DashboardTask:
+    id: int
+    title: str
+    status: Optional[str]
+    due_date: Optional[datetime]
+    project_name: str
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """Everything the dashboard template renders, loaded in two queries."""
+    username: str
+    full_name: Optional[str]
+    total_projects: int
+    active_tasks: int
+    completed_tasks: int
+    team_memberships: int
+    user_projects: List[DashboardProject]
+    team_projects: List[DashboardProject]
+    activities: List[DashboardActivity]
+    assigned_tasks: List[DashboardTask]
+
+def _dashboard_panel(kind, stmt, order_by, limit):
+    """Wrap one panel query so it can take part in a UNION ALL."""
+    position = func.row_number().over(order_by=order_by).label('position')
+    subquery = stmt.add_columns(literal(kind).label('kind'), position).order_by(*order_by).limit(limit).subquery()
+    return select(subquery)
+
+def load_dashboard(user_id):
+    """Load a user's dashboard as a DashboardSnapshot, or None if no such user.
+    
+    The first query fetches the user and every aggregate count with scalar
+    subqueries; the second fetches all four panels with one UNION ALL.
+    """
+    memberships = select(TeamMember.project_id).where(TeamMember.user_id == user_id)
+    count = lambda stmt: stmt.with_only_columns(func.count()).scalar_subquery()
+    totals = db.session.execute(select(
+        User.username,
+        User.full_name,
+        count(select(Project).where(or_(Project.owner_id == user_id,
+                                        Project.id.in_(memberships)))).label('total_projects'),
+        count(select(Task).where(Task.assignee_id == user_id,
+                                 Task.status.in_(ACTIVE_TASK_STATUSES))).label('active_tasks'),
+        count(select(Task).where(Task.assignee_id == user_id,
+                                 Task.status == 'done')).label('completed_tasks'),
+        count(select(TeamMember).where(TeamMember.user_id == user_id)).label('team_memberships'),
+    ).where(User.id == user_id)).first()
+    if totals is None:
+        return None
+    
+    # The panels share one column layout: (id, label, detail, status, at)
+    def columns(row_id, label, detail, status, at):
+        return select(row_id.label('id'), label.label('label'), detail.label('detail'),
+                      status.label('status'), at.label('at'))
+    
+    none = literal(None, String)
+    panels = union_all(
+        _dashboard_panel('user_projects', columns(
+            Project.id, Project.name, none, Project.status, Project.created_at
+        ).where(Project.owner_id == user_id), [Project.updated_at.desc()], 5),
+        _dashboard_panel('team_projects', columns(
+            Project.id, Project.name, User.username, Project.status, Project.created_at
+        ).join(TeamMember, TeamMember.project_id == Project.id)
+         .join(User, User.id == Project.owner_id)
+         .where(TeamMember.user_id == user_id), [Project.updated_at.desc()], 5),
+        _dashboard_panel('activities', columns(
+            UserActivity.id, UserActivity.activity_type, UserActivity.description, none,
+            UserActivity.timestamp
+        ).where(UserActivity.user_id == user_id), [UserActivity.timestamp.desc()], 10),
+        _dashboard_panel('assigned_tasks', columns(
+            Task.id, Task.title, Project.name, Task.status, Task.due_date
+        ).join(Project, Project.id == Task.project_id)
+         .where(Task.assignee_id == user_id, Task.status.in_(ACTIVE_TASK_STATUSES)),
+         [Task.due_date.asc()], 5),
+    )
+    
+    build = {
+        'user_projects': lambda r: DashboardProject(r.id, r.label, r.status, r.at, r.detail),
+        'team_projects': lambda r: DashboardProject(r.id, r.label, r.status, r.at, r.detail),
+        'activities': lambda r: DashboardActivity(r.id, r.label, r.detail, r.at),
+        'assigned_tasks': lambda r: DashboardTask(r.id, r.label, r.status, r.at, r.detail),
+    }
+    grouped = {kind: [] for kind in build}
+    for row in sorted(db.session.execute(panels), key=lambda row: (row.kind, row.position)):
+        grouped[row.kind].append(build[row.kind](row))
+    return DashboardSnapshot(**totals._asdict(), **grouped)
+
 # Routes
-@app.route('/')
+@main.route('/')
+@conditional('user', 'project', 'task')
 def index():
     """Home page with modern landing design."""
-    featured_projects = Project.query.filter_by(visibility='public').limit(6).all()
-    stats = {
-        'total_users': User.query.count(),
-        'total_projects': Project.query.count(),
-        'active_projects': Project.query.filter_by(status='active').count()
-    }
+    featured_projects = featured_projects_data()
+    stats = platform_stats_data()
     return render_template('index.html', featured_projects=featured_projects, stats=stats)
 
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     """User registration with enhanced validation."""
     if request.method == 'POST':
@@ -186,7 +806,7 @@ def register():
             new_user = User(
                 username=username,
                 email=email,
-                password_hash=generate_password_hash(password),
+                password_hash=passwords.hash(password),
                 full_name=full_name.strip(),
                 avatar_url=f"https://ui-avatars.com/api/?name={full_name}&background=6366f1&color=fff"
             )
@@ -194,17 +814,11 @@ def register():
             db.session.commit()
             
             # Log activity
-            activity = UserActivity(
-                user_id=new_user.id,
-                activity_type='registration',
-                description='User registered successfully'
-            )
-            db.session.add(activity)
-            db.session.commit()
+            activity_log.record(new_user.id, 'registration', 'User registered successfully')
             
             print(f"User registered successfully: {new_user.username}")
             flash('Registration successful! Welcome to TechFlow.', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
             
         except Exception as e:
             logger.error(f"Registration error: {e}")
@@ -213,7 +827,7 @@ def register():
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     """User login with enhanced security."""
     if request.method == 'POST':
@@ -240,28 +854,26 @@ def login():
         
         if user:
             print(f"User found: {user.username}, checking password...")
-            if check_password_hash(user.password_hash, password):
+            if passwords.verify(user.password_hash, password):
                 print(f"Password correct, logging in user: {user.username}")
                 session['user_id'] = user.id
                 session['user'] = user.username
                 session['user_role'] = user.role
                 
+                # Upgrade hashes made with outdated parameters
+                if passwords.needs_rehash(user.password_hash):
+                    user.password_hash = passwords.hash(password)
+                
                 # Update last login and activity
                 user.last_login = datetime.utcnow()
                 user.last_active = datetime.utcnow()
                 db.session.commit()
                 
                 # Log activity
-                activity = UserActivity(
-                    user_id=user.id,
-                    activity_type='login',
-                    description='User logged in successfully'
-                )
-                db.session.add(activity)
-                db.session.commit()
+                activity_log.record(user.id, 'login', 'User logged in successfully')
                 
                 flash(f'Welcome back, {user.full_name or user.username}!', 'success')
-                return redirect(url_for('dashboard'))
+                return redirect(url_for('main.dashboard'))
             else:
                 print(f"Password incorrect for user: {user.username}")
                 flash('Invalid username or password', 'error')
@@ -271,82 +883,68 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/dashboard')
+@main.route('/dashboard')
 def dashboard():
     """Enhanced user dashboard with project overview."""
     if 'user_id' not in session:
         flash('Please login to access your dashboard', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    user = User.query.get(session['user_id'])
-    if not user:
+    snapshot = load_dashboard(session['user_id'])
+    if not snapshot:
         session.clear()
         flash('User not found', 'error')
-        return redirect(url_for('login'))
-    
-    # Get user's projects
-    user_projects = Project.query.filter_by(owner_id=user.id).order_by(Project.updated_at.desc()).limit(5).all()
+        return redirect(url_for('main.login'))
     
-    # Get team memberships
-    team_projects = db.session.query(Project).join(TeamMember).filter(
-        TeamMember.user_id == user.id
-    ).order_by(Project.updated_at.desc()).limit(5).all()
-    
-    # Get recent activities
-    activities = UserActivity.query.filter_by(user_id=user.id).order_by(UserActivity.timestamp.desc()).limit(10).all()
-    
-    # Get assigned tasks
-    assigned_tasks = Task.query.filter_by(assignee_id=user.id).filter(
-        Task.status.in_(['todo', 'in_progress'])
-    ).order_by(Task.due_date.asc()).limit(5).all()
-    
-    # Dashboard stats
-    stats = {
-        'total_projects': len(user_projects) + len(team_projects),
-        'active_tasks': len(assigned_tasks),
-        'completed_tasks': Task.query.filter_by(assignee_id=user.id, status='done').count(),
-        'team_memberships': TeamMember.query.filter_by(user_id=user.id).count()
-    }
-    
-    return render_template('dashboard.html', 
-                         user=user, 
-                         user_projects=user_projects,
-                         team_projects=team_projects,
-                         activities=activities,
-                         assigned_tasks=assigned_tasks,
-                         stats=stats)
+    return render_template('dashboard.html', dashboard=snapshot)
 
-@app.route('/projects')
+@main.route('/projects')
+@conditional('user', 'project', 'team_member')
 def projects():
     """Projects listing page."""
     if 'user_id' not in session:
         flash('Please login to view projects', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     user = User.query.get(session['user_id'])
+    per_page = page_size_arg()
+    own_cursor = request.args.get('own_cursor')
+    team_cursor = request.args.get('team_cursor')
     
-    # Get user's own projects
-    own_projects = Project.query.filter_by(owner_id=user.id).all()
+    # Get user's own projects, one page at a time
+    own_query = Project.query.filter_by(owner_id=user.id)
+    own_projects, own_next = keyset_page(own_query, Project, own_cursor, per_page)
     
-    # Get team projects
-    team_projects = db.session.query(Project).join(TeamMember).filter(
+    # Get team projects, one page at a time
+    team_query = db.session.query(Project).options(joinedload(Project.owner)).join(TeamMember).filter(
         TeamMember.user_id == user.id
-    ).all()
+    )
+    team_projects, team_next = keyset_page(team_query, Project, team_cursor, per_page)
+    
+    # Get public projects (identical for every viewer, so cached)
+    public_projects = public_projects_data()
     
-    # Get public projects
-    public_projects = Project.query.filter_by(visibility='public').limit(10).all()
+    stats = {
+        'own_projects': own_query.order_by(None).count(),
+        'team_projects': team_query.order_by(None).count(),
+        'public_projects': len(public_projects),
+    }
     
     return render_template('projects.html', 
                          own_projects=own_projects,
                          team_projects=team_projects,
-                         public_projects=public_projects)
+                         public_projects=public_projects,
+                         own_next=own_next,
+                         team_next=team_next,
+                         per_page=per_page,
+                         stats=stats)
 
-@app.route('/projects/new', methods=['GET', 'POST'])
+@main.route('/projects/new', methods=['GET', 'POST'])
 def new_project():
     """Create new project."""
     if 'user_id' not in session:
         flash('Please login to create projects', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     if request.method == 'POST':
         print(f"=== NEW PROJECT ROUTE CALLED ===")
@@ -387,7 +985,7 @@ def new_project():
             
             print(f"Project created successfully: {project.name}")
             flash(f'Project "{name}" created successfully!', 'success')
-            return redirect(url_for('projects'))
+            return redirect(url_for('main.projects'))
             
         except Exception as e:
             logger.error(f"Project creation error: {e}")
@@ -396,58 +994,93 @@ def new_project():
     
     return render_template('new_project.html')
 
-@app.route('/profile')
+@main.route('/profile')
 def profile():
     """User profile page."""
     if 'user_id' not in session:
         flash('Please login to view your profile', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     user = User.query.get(session['user_id'])
     return render_template('profile.html', user=user)
 
-@app.route('/logout')
+@main.route('/logout')
 def logout():
     """User logout functionality."""
     if 'user_id' in session:
         # Log activity
-        activity = UserActivity(
-            user_id=session['user_id'],
-            activity_type='logout',
-            description='User logged out'
-        )
-        db.session.add(activity)
-        db.session.commit()
+        activity_log.record(session['user_id'], 'logout', 'User logged out')
     
     session.clear()
     flash('You have been logged out successfully', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/test')
+@main.route('/test')
 def test():
-    """Test route to check database and users."""
-    users = User.query.all()
-    user_list = []
-    for user in users:
-        user_list.append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'full_name': user.full_name,
-            'role': user.role
-        })
+    """Test route to check database and users.
+    
+    Lists a small sample of users; the full list is available to admins
+    from /admin/users/export.
+    """
+    columns = [getattr(User, field) for field in ('id', 'username', 'email', 'full_name', 'role')]
+    sample = db.session.execute(select(*columns).order_by(User.id).limit(20)).all()
     
     return jsonify({
         'message': 'TechFlow is running!',
-        'total_users': len(users),
-        'users': user_list,
+        'total_users': platform_stats_data()['total_users'],
+        'users': [row._asdict() for row in sample],
         'test_credentials': {
             'username': 'admin',
             'password': 'admin123'
         }
     })
 
-@app.route('/api/health')
+# Columns included in the admin user export (never password_hash)
+USER_EXPORT_FIELDS = ('id', 'username', 'email', 'full_name', 'role', 'is_verified',
+                      'created_at', 'last_login', 'last_active')
+EXPORT_BATCH_SIZE = 1000
+
+@main.route('/admin/users/export')
+def export_users():
+    """Stream every user as JSON Lines (default) or CSV, for admins only.
+    
+    Rows are fetched EXPORT_BATCH_SIZE at a time and each batch is written
+    out before the next is read, so memory use does not grow with the table.
+    """
+    if 'user_id' not in session:
+        flash('Please login to export users', 'error')
+        return redirect(url_for('main.login'))
+    if session.get('user_role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    export_format = request.args.get('format', 'jsonl')
+    if export_format not in ('jsonl', 'csv'):
+        return jsonify({'error': 'format must be jsonl or csv'}), 400
+    
+    stmt = select(*[getattr(User, field) for field in USER_EXPORT_FIELDS]).order_by(User.id)
+    
+    def generate():
+        result = db.session.execute(stmt, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(USER_EXPORT_FIELDS)
+            for batch in result.partitions():
+                writer.writerows(batch)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            for batch in result.partitions():
+                yield ''.join(json.dumps(api_serialize(row, USER_EXPORT_FIELDS)) + '\n'
+                              for row in batch)
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"techflow-users-{datetime.utcnow():%Y%m%d}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@main.route('/api/health')
 def health_check():
     """Health check endpoint for monitoring."""
     try:
@@ -469,75 +1102,870 @@ def health_check():
             'error': str(e)
         }), 500
 
-@app.route('/api/stats')
+@main.route('/api/stats')
+@conditional('user', 'project', 'task', cache_control=CACHE_CONTROL_STATS, per_user=False)
 def api_stats():
     """API endpoint for platform statistics."""
     try:
-        stats = {
-            'total_users': User.query.count(),
-            'total_projects': Project.query.count(),
-            'active_projects': Project.query.filter_by(status='active').count(),
-            'total_tasks': Task.query.count(),
-            'completed_tasks': Task.query.filter_by(status='done').count()
-        }
+        stats = platform_stats_data()
         return jsonify(stats), 200
     except Exception as e:
         logger.error(f"Stats API error: {e}")
         return jsonify({'error': 'Database error'}), 500
 
+# JSON data API
+API_FIELDS = {
+    Project: ('id', 'name', 'description', 'repository_url', 'status', 'visibility',
+              'owner_id', 'created_at', 'updated_at'),
+    Task: ('id', 'title', 'description', 'status', 'priority', 'assignee_id',
+           'project_id', 'created_at', 'updated_at', 'due_date'),
+}
+
+class APIError(Exception):
+    """Invalid API request, reported to the client as a 400 response."""
+
+@main.app_errorhandler(APIError)
+def api_error(error):
+    return jsonify({'error': str(error)}), 400
+
+def api_fields_arg(model):
+    """Fields selected with ?fields=a,b (all fields by default)."""
+    allowed = API_FIELDS[model]
+    requested = request.args.get('fields')
+    if not requested:
+        return allowed
+    fields = tuple(field.strip() for field in requested.split(',') if field.strip())
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def api_filter(stmt, column, name, cast=str):
+    """Apply ?name=a,b as an IN filter on column."""
+    value = request.args.get(name)
+    if not value:
+        return stmt
+    try:
+        values = [cast(item) for item in value.split(',')]
+    except ValueError:
+        raise APIError(f"Invalid value for {name}: {value}")
+    return stmt.where(column.in_(values))
+
+def visible_projects_condition(user_id):
+    """Projects the given user (or an anonymous client) may read."""
+    condition = Project.visibility == 'public'
+    if user_id:
+        memberships = select(TeamMember.project_id).where(TeamMember.user_id == user_id)
+        condition = or_(condition, Project.owner_id == user_id, Project.id.in_(memberships))
+    return condition
+
+def api_serialize(row, fields):
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        item[field] = value.isoformat() if isinstance(value, datetime) else value
+    return item
+
+def api_list(model, stmt, fields):
+    """Page through stmt as JSON, or stream all of it as NDJSON.
+
+    Only the projected columns (plus the cursor key) are selected, and rows
+    are plain tuples rather than ORM objects.
+    """
+    cursor = request.args.get('cursor')
+    if cursor and decode_cursor(cursor) is None:
+        raise APIError('Invalid cursor')
+    columns = [getattr(model, field) for field in fields]
+    columns += [getattr(model, key) for key in ('id', 'updated_at') if key not in fields]
+    stmt = keyset_after(stmt.with_only_columns(*columns), model, cursor)
+    
+    wants_ndjson = (request.args.get('format') == 'ndjson' or
+                    request.accept_mimetypes.best == 'application/x-ndjson')
+    if wants_ndjson:
+        def generate():
+            result = db.session.execute(stmt, execution_options={'yield_per': 500})
+            for row in result:
+                yield json.dumps(api_serialize(row, fields)) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    per_page = page_size_arg()
+    rows = db.session.execute(stmt.limit(per_page + 1)).all()
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return jsonify({
+        'items': [api_serialize(row, fields) for row in rows[:per_page]],
+        'next_cursor': next_cursor,
+        'per_page': per_page,
+    })
+
+@main.route('/api/projects')
+@conditional('project', 'team_member')
+def api_projects():
+    """Projects visible to the caller, filterable by status, visibility and owner."""
+    fields = api_fields_arg(Project)
+    stmt = select(Project).where(visible_projects_condition(session.get('user_id')))
+    stmt = api_filter(stmt, Project.status, 'status')
+    stmt = api_filter(stmt, Project.visibility, 'visibility')
+    stmt = api_filter(stmt, Project.owner_id, 'owner_id', int)
+    return api_list(Project, stmt, fields)
+
+@main.route('/api/tasks')
+@conditional('task', 'project', 'team_member')
+def api_tasks():
+    """Tasks in projects visible to the caller, filterable by status, priority,
+    assignee and project."""
+    fields = api_fields_arg(Task)
+    stmt = select(Task).join(Project, Task.project_id == Project.id).where(
+        visible_projects_condition(session.get('user_id')))
+    stmt = api_filter(stmt, Task.status, 'status')
+    stmt = api_filter(stmt, Task.priority, 'priority')
+    stmt = api_filter(stmt, Task.assignee_id, 'assignee_id', int)
+    stmt = api_filter(stmt, Task.project_id, 'project_id', int)
+    return api_list(Task, stmt, fields)
+
+ACTIVITY_FIELDS = ('id', 'activity_type', 'description', 'activity_metadata', 'timestamp')
+
+@main.route('/api/user/activity')
+def api_user_activity():
+    """The caller's activity in one month (``?month=YYYY-MM``, default this one).
+    
+    Months past the retention horizon are read back from the activity
+    archive. Admins may ask for another user's with ``user_id``.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    user_id = request.args.get('user_id', session['user_id'], type=int)
+    if user_id != session['user_id'] and session.get('user_role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    month = request.args.get('month') or f"{datetime.utcnow():%Y-%m}"
+    try:
+        start = datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        raise APIError('month must be YYYY-MM')
+    records = activity_archive.activity_for_month(user_id, start.year, start.month)
+    return jsonify({
+        'user_id': user_id,
+        'month': month,
+        'items': [{field: record[field].isoformat() if field == 'timestamp' else record[field]
+                   for field in ACTIVITY_FIELDS} for record in records],
+    })
+
+# Activity analytics
+# The analytics endpoints read only activity_rollup (see activity_rollups.py),
+# never user_activity. Rows are rolled up as they are written: the activity
+# log writer applies each batch, and this listener covers UserActivity
+# objects added through the ORM.
+ANALYTICS_DEFAULT_BUCKETS = {'hour': 24, 'day': 7}
+MAX_ANALYTICS_BUCKETS = 1000
+
+@event.listens_for(Session, 'before_flush')
+def rollup_new_activity(session, flush_context, instances):
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, UserActivity):
+            if obj.timestamp is None:
+                obj.timestamp = datetime.utcnow()
+            rows.append({'user_id': obj.user_id, 'activity_type': obj.activity_type,
+                         'timestamp': obj.timestamp})
+    if rows:
+        activity_rollups.apply(session.connection(), rows)
+
+def _analytics_time_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        value = datetime.fromisoformat(value)
+    except ValueError:
+        raise APIError(f"{name} must be an ISO date or time")
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def analytics_range_args(periods=ACTIVITY_PERIODS):
+    """(period, start, end) from ?period=hour|day&start=...&end=...
+    
+    end is exclusive and defaults to the end of the current bucket; start
+    defaults to the last 24 hours or 7 days.
+    """
+    period = request.args.get('period', 'day')
+    if period not in periods:
+        raise APIError(f"period must be one of: {', '.join(periods)}")
+    end = _analytics_time_arg('end') or datetime.utcnow()
+    start = _analytics_time_arg('start') or (
+        bucket_start(end, period) - (ANALYTICS_DEFAULT_BUCKETS[period] - 1) * PERIOD_LENGTH[period])
+    if start >= end:
+        raise APIError('start must be before end')
+    if (end - start) / PERIOD_LENGTH[period] > MAX_ANALYTICS_BUCKETS:
+        raise APIError(f"At most {MAX_ANALYTICS_BUCKETS} {period} buckets per request")
+    return period, start, end
+
+@main.route('/api/analytics/activity')
+def api_analytics_activity():
+    """Activity counts per hour or day, by activity type.
+    
+    Filterable by ``type`` and ``user_id`` (per day only). Admins see every
+    user's activity, other users only their own.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    is_admin = session.get('user_role') == 'admin'
+    user_id = request.args.get('user_id', None if is_admin else session['user_id'], type=int)
+    if user_id != session['user_id'] and not is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    period, start, end = analytics_range_args(ACTIVITY_USER_PERIODS if user_id else ACTIVITY_PERIODS)
+    activity_type = request.args.get('type')
+    series = activity_rollups.counts(period, start, end, activity_type, user_id)
+    return jsonify({
+        'period': period,
+        'start': series[0][0].isoformat(),
+        'end': (series[-1][0] + PERIOD_LENGTH[period]).isoformat(),
+        'type': activity_type,
+        'user_id': user_id,
+        'items': [{'start': bucket.isoformat(), 'count': sum(by_type.values()), 'by_type': by_type}
+                  for bucket, by_type in series],
+        'total': sum(sum(by_type.values()) for _, by_type in series),
+    })
+
+@main.route('/api/analytics/activity/users')
+def api_analytics_active_users():
+    """Distinct active users per day and over the whole range (admin only)."""
+    if session.get('user_role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    period, start, end = analytics_range_args(ACTIVITY_USER_PERIODS)
+    activity_type = request.args.get('type')
+    series, total = activity_rollups.active_users(start, end, activity_type)
+    return jsonify({
+        'period': period,
+        'start': series[0][0].isoformat(),
+        'end': (series[-1][0] + PERIOD_LENGTH[period]).isoformat(),
+        'type': activity_type,
+        'items': [{'start': bucket.isoformat(), 'active_users': users} for bucket, users in series],
+        'active_users': total,
+    })
+
+# Batch task operations
+# POST /api/tasks/batch applies up to MAX_BATCH_OPERATIONS creates, updates,
+# moves and deletes in one transaction. Every operation is checked first,
+# with one IN query each for the tasks, projects and assignees involved; the
+# writes are then one executemany statement per kind of change. They bypass
+# the ORM, so the batch maintains counters, data versions and cache tags.
+TASK_STATUSES = ('todo', 'in_progress', 'review', 'done')
+TASK_PRIORITIES = ('low', 'medium', 'high', 'urgent')
+TASK_WRITE_FIELDS = ('title', 'description', 'status', 'priority', 'assignee_id', 'due_date')
+TASK_WRITER_ROLES = ('owner', 'admin', 'member')
+MAX_BATCH_OPERATIONS = 1000
+
+def bulk_row_template(model_table):
+    """Column defaults for rows inserted with core SQL.
+    
+    Every row of an executemany insert needs the same columns, so rows are
+    built from this and only the values a record provides are overridden.
+    """
+    row = {column.name: None for column in model_table.columns if not column.primary_key}
+    row.update((column.name, column.default.arg) for column in model_table.columns
+               if column.default is not None and column.default.is_scalar and not column.primary_key)
+    return row
+
+def insert_returning_ids(model_table, rows):
+    """Insert rows with multi-row INSERTs and return their ids, in order.
+    
+    A multi-row INSERT allocates ascending ids in VALUES order, so the
+    sorted ids line up with the rows whatever order RETURNING uses.
+    (sort_by_parameter_order would fall back to a statement per row on
+    SQLite, which has no implicit sentinel column.)
+    """
+    return sorted(db.session.scalars(model_table.insert().returning(model_table.c.id), rows))
+
+def writable_projects_condition(user_id):
+    """Projects whose tasks the given user may change (owners and non-viewer members)."""
+    memberships = select(TeamMember.project_id).where(
+        TeamMember.user_id == user_id, TeamMember.role.in_(TASK_WRITER_ROLES))
+    return or_(Project.owner_id == user_id, Project.id.in_(memberships))
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _task_field_value(field, value):
+    """Check one writable task field from a batch operation."""
+    if field == 'title':
+        if not isinstance(value, str) or not value.strip():
+            raise APIError('title must be a non-empty string')
+        if len(value) > Task.__table__.c.title.type.length:
+            raise APIError('title is too long')
+    elif field == 'description':
+        if value is not None and not isinstance(value, str):
+            raise APIError('description must be a string')
+    elif field == 'status':
+        if value not in TASK_STATUSES:
+            raise APIError(f"status must be one of {', '.join(TASK_STATUSES)}")
+    elif field == 'priority':
+        if value not in TASK_PRIORITIES:
+            raise APIError(f"priority must be one of {', '.join(TASK_PRIORITIES)}")
+    elif field == 'assignee_id':
+        if value is not None and not _is_id(value):
+            raise APIError('assignee_id must be a user id')
+    elif field == 'due_date' and value is not None:
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise APIError('due_date must be an ISO 8601 date')
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def parse_batch_operation(operation):
+    """Return (op, task_id, values) for one batch operation, or raise APIError."""
+    if not isinstance(operation, dict):
+        raise APIError('Operation must be an object')
+    op = operation.get('op')
+    if not isinstance(op, str):
+        raise APIError('op must be create, update, move or delete')
+    allowed = {
+        'create': {'project_id', *TASK_WRITE_FIELDS},
+        'update': {'id', *TASK_WRITE_FIELDS},
+        'move': {'id', 'project_id'},
+        'delete': {'id'},
+    }.get(op)
+    if allowed is None:
+        raise APIError('op must be create, update, move or delete')
+    unknown = set(operation) - allowed - {'op'}
+    if unknown:
+        raise APIError(f"Unknown fields for {op}: {', '.join(sorted(unknown))}")
+    task_id = operation.get('id')
+    if op != 'create' and not _is_id(task_id):
+        raise APIError('id must be a task id')
+    if op in ('create', 'move') and not _is_id(operation.get('project_id')):
+        raise APIError('project_id must be a project id')
+    if op == 'create' and 'title' not in operation:
+        raise APIError('title is required')
+    if op == 'update' and len(operation) == 2:
+        raise APIError('update has no fields to change')
+    values = {field: _task_field_value(field, value) for field, value in operation.items()
+              if field in TASK_WRITE_FIELDS}
+    if 'project_id' in operation:
+        values['project_id'] = operation['project_id']
+    return op, task_id, values
+
+def apply_task_batch(user_id, operations, atomic=True):
+    """Validate operations for user_id and apply them in the current transaction.
+    
+    Returns (results, applied): one result per operation, in order, and
+    whether anything was written. With ``atomic``, a single invalid
+    operation means nothing is written; otherwise the valid ones still are.
+    The caller commits.
+    """
+    results, parsed = [], {}
+    seen_tasks = set()
+    for index, operation in enumerate(operations):
+        results.append({'index': index, 'op': operation.get('op') if isinstance(operation, dict) else None})
+        try:
+            op, task_id, values = parse_batch_operation(operation)
+            if task_id is not None:
+                if task_id in seen_tasks:
+                    raise APIError(f"Task {task_id} appears in more than one operation")
+                seen_tasks.add(task_id)
+            parsed[index] = (op, task_id, values)
+        except APIError as e:
+            results[index].update(status='error', error=str(e))
+    
+    # Everything the operations refer to, looked up once
+    tasks = {row.id: row for row in db.session.execute(
+        select(Task.id, Task.project_id, Task.status).where(Task.id.in_(seen_tasks)))}
+    project_ids = {values['project_id'] for _, _, values in parsed.values() if 'project_id' in values}
+    project_ids.update(row.project_id for row in tasks.values())
+    writable = set(db.session.scalars(
+        select(Project.id).where(Project.id.in_(project_ids), writable_projects_condition(user_id))))
+    assignee_ids = {values['assignee_id'] for _, _, values in parsed.values()
+                    if values.get('assignee_id') is not None}
+    users = set(db.session.scalars(select(User.id).where(User.id.in_(assignee_ids))))
+    
+    for index, (op, task_id, values) in list(parsed.items()):
+        error = None
+        if task_id is not None and task_id not in tasks:
+            error = f"Task {task_id} not found"
+        elif task_id is not None and tasks[task_id].project_id not in writable:
+            error = f"Not allowed to change tasks in project {tasks[task_id].project_id}"
+        elif values.get('project_id') is not None and values['project_id'] not in writable:
+            error = f"Project {values['project_id']} not found or not writable"
+        elif values.get('assignee_id') is not None and values['assignee_id'] not in users:
+            error = f"User {values['assignee_id']} not found"
+        if error:
+            results[index].update(status='error', error=error)
+            del parsed[index]
+    
+    if not parsed or (atomic and len(parsed) < len(operations)):
+        for index in parsed:
+            results[index]['status'] = 'skipped'
+        return results, False
+    
+    tasks_table = Task.__table__
+    now = datetime.utcnow()
+    new_row = bulk_row_template(tasks_table)
+    creates, updates, deletes = [], {}, []
+    deltas = {'total_tasks': 0, 'completed_tasks': 0}
+    for index, (op, task_id, values) in parsed.items():
+        if op == 'create':
+            row = dict(new_row, **values, created_at=now, updated_at=now)
+            creates.append((index, row))
+            deltas['total_tasks'] += 1
+            deltas['completed_tasks'] += row['status'] == 'done'
+        elif op == 'delete':
+            deletes.append(task_id)
+            results[index].update(status='deleted', id=task_id)
+            deltas['total_tasks'] -= 1
+            deltas['completed_tasks'] -= tasks[task_id].status == 'done'
+        else:
+            # One executemany per distinct set of changed columns
+            updates.setdefault(tuple(sorted(values)), []).append(
+                dict(values, task_id=task_id, updated_at=now))
+            results[index].update(status='moved' if op == 'move' else 'updated', id=task_id)
+            if 'status' in values:
+                deltas['completed_tasks'] += (values['status'] == 'done') - (tasks[task_id].status == 'done')
+    
+    if creates:
+        ids = insert_returning_ids(tasks_table, [row for _, row in creates])
+        for (index, _), task_id in zip(creates, ids):
+            results[index].update(status='created', id=task_id)
+    for rows in updates.values():
+        db.session.execute(tasks_table.update().where(tasks_table.c.id == bindparam('task_id')), rows)
+    if deletes:
+        db.session.execute(tasks_table.delete().where(tasks_table.c.id.in_(deletes)))
+    
+    apply_counter_deltas(db.session.connection(), {name: delta for name, delta in deltas.items() if delta})
+    record_bulk_write(db.session, ['task'])
+    return results, True
+
+@main.route('/api/tasks/batch', methods=['POST'])
+def api_tasks_batch():
+    """Create, update, move and delete many tasks in one transaction.
+    
+    Takes ``{"operations": [...], "atomic": true}`` and returns a result for
+    each operation. Atomic batches (the default) are all-or-nothing and get
+    a 400 if any operation is invalid.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('operations'), list):
+        raise APIError('Expected a JSON object with an operations list')
+    operations = payload['operations']
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise APIError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+    atomic = payload.get('atomic', True)
+    if not isinstance(atomic, bool):
+        raise APIError('atomic must be true or false')
+    
+    results, applied = apply_task_batch(session['user_id'], operations, atomic)
+    db.session.commit()
+    failed = any(result['status'] == 'error' for result in results)
+    return jsonify({'applied': applied, 'results': results}), 400 if failed and atomic else 200
+
+# Bulk import
+# Records are parsed, validated and checkpointed by bulk_import; the rows of
+# each chunk are written here with bulk INSERTs, like task batches, and
+# counted and versioned in the same transaction.
+def write_import_chunk(projects, members, tasks, project_keys):
+    """Insert one chunk of imported (project key, values) pairs.
+    
+    project_keys maps the keys of earlier chunks to project ids. Returns
+    the ids of the projects created, by key.
+    """
+    now = datetime.utcnow()
+    
+    def rows(model_table, records, **extra):
+        template = bulk_row_template(model_table)
+        return [dict(template, **{name: value for name, value in values.items() if value is not None},
+                     **extra) for _, values in records]
+    
+    deltas = {}
+    new_keys = {}
+    if projects:
+        project_rows = rows(Project.__table__, projects, created_at=now, updated_at=now)
+        ids = insert_returning_ids(Project.__table__, project_rows)
+        new_keys = {key: project_id for (key, _), project_id in zip(projects, ids)}
+        deltas['total_projects'] = len(projects)
+        deltas['active_projects'] = sum(row['status'] == 'active' for row in project_rows)
+    lookup = {**project_keys, **new_keys}
+    if members:
+        member_rows = rows(TeamMember.__table__, members, joined_at=now)
+        for (key, _), row in zip(members, member_rows):
+            row['project_id'] = lookup[key]
+        db.session.execute(TeamMember.__table__.insert(), member_rows)
+    if tasks:
+        task_rows = rows(Task.__table__, tasks, created_at=now, updated_at=now)
+        for (key, _), row in zip(tasks, task_rows):
+            row['project_id'] = lookup[key]
+        db.session.execute(Task.__table__.insert(), task_rows)
+        deltas['total_tasks'] = len(tasks)
+        deltas['completed_tasks'] = sum(row['status'] == 'done' for row in task_rows)
+    
+    apply_counter_deltas(db.session.connection(), {name: delta for name, delta in deltas.items() if delta})
+    record_bulk_write(db.session, [name for name, records in
+                                   (('project', projects), ('team_member', members), ('task', tasks))
+                                   if records])
+    return new_keys
+
+def check_import_task_field(field, value):
+    """_task_field_value() for imported tasks, reporting invalid values as ValueError."""
+    try:
+        return _task_field_value(field, value)
+    except APIError as e:
+        raise ValueError(str(e))
+
+IMPORT_JOB_FIELDS = ('id', 'source', 'format', 'status', 'rows_done', 'projects_created',
+                     'members_created', 'tasks_created', 'error', 'created_at', 'updated_at')
+
+@main.route('/api/import', methods=['POST'])
+def api_import():
+    """Import projects, members and tasks from a CSV or NDJSON body, for admins only.
+    
+    The format comes from ``?format=`` or the Content-Type. A failed import
+    is continued by sending the corrected file again with ``?resume=<id>``;
+    progress can be followed meanwhile at /api/import/<id>.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    if session.get('user_role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    resume = request.args.get('resume', type=int)
+    if resume:
+        job = db.session.get(ImportJob, resume)
+        if job is None:
+            return jsonify({'error': f"Import {resume} not found"}), 404
+        if job.status == 'completed':
+            raise APIError(f"Import {resume} already completed")
+    else:
+        import_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+        if import_format not in IMPORT_FORMATS:
+            raise APIError('format must be csv or ndjson')
+        job = bulk_import.create_job(import_format, source=request.args.get('source'),
+                                     created_by=session['user_id'])
+    
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    bulk_import.run(job, lines, progress=lambda job: logger.info(describe_import(job)))
+    return jsonify(api_serialize(job, IMPORT_JOB_FIELDS)), 200 if job.status == 'completed' else 400
+
+@main.route('/api/import/<int:job_id>')
+def api_import_status(job_id):
+    """Progress of an import, for admins only."""
+    if session.get('user_role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    job = db.session.get(ImportJob, job_id)
+    if job is None:
+        return jsonify({'error': f"Import {job_id} not found"}), 404
+    return jsonify(api_serialize(job, IMPORT_JOB_FIELDS))
+
+# Full-text search
+# project_fts and task_fts are FTS5 indexes over the project and task tables
+# (external content, so the text is not stored twice). Triggers keep them in
+# step with every write, including bulk SQL that bypasses the ORM.
+SEARCH_INDEXES = {
+    'project': ('project_fts', ('name', 'description')),
+    'task': ('task_fts', ('title', 'description')),
+}
+# bm25 column weights: a hit in the name/title counts ten times a description hit
+SEARCH_WEIGHTS = (10.0, 1.0)
+# Private-use markers around matches in snippets, replaced after escaping
+SNIPPET_START, SNIPPET_END = '\ue000', '\ue001'
+
+def create_search_indexes(connection):
+    """Create the FTS5 search indexes and their sync triggers, and fill them."""
+    if connection.dialect.name != 'sqlite':
+        logger.warning("Full-text search needs SQLite FTS5; search indexes not created")
+        return
+    for source, (index, columns) in SEARCH_INDEXES.items():
+        cols = ', '.join(columns)
+        new = ', '.join(f'new.{c}' for c in columns)
+        old = ', '.join(f'old.{c}' for c in columns)
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+            f"{cols}, content='{source}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+            # Only edits to indexed text reindex the row
+            f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new}); END",
+            f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+def encode_search_cursor(row):
+    raw = f"{row.rank!r}|{row.kind}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_search_cursor(cursor):
+    """Return (rank, kind, id) from a search cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        rank, kind, row_id = raw.split('|')
+        return float(rank), kind, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def _search_source(kind, match, user_id):
+    index, columns = SEARCH_INDEXES[kind]
+    fts = table(index, column('rowid'), column(index))
+    model = Project if kind == 'project' else Task
+    title = Project.name if kind == 'project' else Task.title
+    stmt = select(
+        literal(kind).label('kind'),
+        model.id.label('id'),
+        title.label('title'),
+        func.snippet(literal_column(index), -1, SNIPPET_START, SNIPPET_END, '…', 16).label('snippet'),
+        Project.id.label('project_id'),
+        Project.name.label('project_name'),
+        func.bm25(literal_column(index), *SEARCH_WEIGHTS, type_=Float).label('rank'),
+    ).select_from(fts).join(model, model.id == fts.c.rowid)
+    if kind == 'task':
+        stmt = stmt.join(Project, Project.id == Task.project_id)
+    return stmt.where(fts.c[index].match(match), visible_projects_condition(user_id))
+
+def search(text, user_id, kinds=('project', 'task'), cursor=None, per_page=PAGE_SIZE):
+    """Best matches for text among projects and tasks the user may read.
+
+    Returns (rows, next_cursor). Rows are ordered by bm25 rank, best first,
+    and paged with a keyset cursor on (rank, kind, id).
+    """
+    match = fts_query(text)
+    if not match:
+        return [], None
+    results = union_all(*(_search_source(kind, match, user_id) for kind in kinds)).subquery()
+    stmt = select(results)
+    position = decode_search_cursor(cursor) if cursor else None
+    if position:
+        stmt = stmt.where(tuple_(results.c.rank, results.c.kind, results.c.id) > position)
+    stmt = stmt.order_by(results.c.rank, results.c.kind, results.c.id).limit(per_page + 1)
+    rows = db.session.execute(stmt).all()
+    next_cursor = encode_search_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+def highlight(snippet):
+    """Escape a search snippet and wrap the matched words in <mark>."""
+    html = str(escape(snippet or ''))
+    return Markup(html.replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
+
+def search_kinds_arg():
+    kind = request.args.get('type')
+    if not kind:
+        return tuple(SEARCH_INDEXES)
+    if kind not in SEARCH_INDEXES:
+        raise APIError(f"Unknown type: {kind}")
+    return (kind,)
+
+@main.route('/api/search')
+@conditional('project', 'task', 'team_member')
+def api_search():
+    """Ranked prefix search over the projects and tasks visible to the caller."""
+    cursor = request.args.get('cursor')
+    if cursor and decode_search_cursor(cursor) is None:
+        raise APIError('Invalid cursor')
+    per_page = page_size_arg()
+    rows, next_cursor = search(request.args.get('q', ''), session.get('user_id'),
+                               search_kinds_arg(), cursor, per_page)
+    return jsonify({
+        'items': [{
+            'type': row.kind,
+            'id': row.id,
+            'title': row.title,
+            'snippet_html': str(highlight(row.snippet)),
+            'project_id': row.project_id,
+            'project_name': row.project_name,
+            'rank': row.rank,
+        } for row in rows],
+        'next_cursor': next_cursor,
+        'per_page': per_page,
+    })
+
+@main.route('/search')
+@conditional('project', 'task', 'team_member')
+def search_page():
+    """Search page for projects and tasks."""
+    query = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+    kind = request.args.get('type')
+    kinds = (kind,) if kind in SEARCH_INDEXES else tuple(SEARCH_INDEXES)
+    if cursor and decode_search_cursor(cursor) is None:
+        cursor = None
+    per_page = page_size_arg()
+    rows, next_cursor = search(query, session.get('user_id'), kinds, cursor, per_page)
+    return render_template('search.html', query=query, kind=kind, results=rows,
+                           next_cursor=next_cursor, per_page=per_page, highlight=highlight)
+
+@main.route('/api/cache/stats')
+def api_cache_stats():
+    """Cache hit/miss/eviction counters for monitoring."""
+    return jsonify(cache.stats()), 200
+
 # Error handlers
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     """Handle 404 errors."""
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
     db.session.rollback()
     return render_template('500.html'), 500
 
+def create_model_indexes(connection):
+    """Create any index declared on the models that the database lacks.
+    
+    Tables that do not exist yet are skipped: the later migration that
+    creates one creates its indexes with it.
+    """
+    existing = set(inspect(connection).get_table_names())
+    for model_table in db.metadata.sorted_tables:
+        if model_table.name not in existing:
+            continue
+        for index in model_table.indexes:
+            index.create(connection, checkfirst=True)
+
+def create_data_versions(connection):
+    """Create the data_version table with a row for every versioned table."""
+    DataVersion.__table__.create(connection, checkfirst=True)
+    existing = set(connection.scalars(select(DataVersion.table_name)))
+    rows = [{'table_name': name, 'version': 0, 'changed_at': datetime.utcnow()}
+            for name in VERSIONED_TABLES if name not in existing]
+    if rows:
+        connection.execute(DataVersion.__table__.insert(), rows)
+
+def create_activity_rollups(connection):
+    """Create the activity rollup table and fill it from existing activity."""
+    ActivityRollup.__table__.create(connection, checkfirst=True)
+    activity_rollups.backfill(connection)
+
+def create_import_tables(connection):
+    """Create the tables that checkpoint bulk imports."""
+    for model in (ImportJob, ImportProjectKey):
+        model.__table__.create(connection, checkfirst=True)
+
+# Versioned schema migrations, applied in order by migrate_db(). Each step
+# must be safe to run against a database created by any earlier release,
+# and must never drop user data.
+MIGRATIONS = [
+    (1, 'Add secondary indexes on hot filter columns', create_model_indexes),
+    (2, 'Build platform counters', lambda connection: reconcile_counters()),
+    (3, 'Track table versions for HTTP caching', create_data_versions),
+    (4, 'Add full-text search indexes', create_search_indexes),
+    (5, 'Track bulk import jobs', create_import_tables),
+    (6, 'Index activity by timestamp for retention', create_model_indexes),
+    (7, 'Roll up activity per hour and day', create_activity_rollups),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate_db():
+    """Apply pending schema migrations to an existing database."""
+    applied = {row.version for row in SchemaMigration.query.all()}
+    for version, description, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"Applying schema migration {version}: {description}")
+        upgrade(db.session.connection())
+        db.session.add(SchemaMigration(version=version, description=description))
+        db.session.commit()
+
 def init_db():
-    """Initialize the database with tables and sample data."""
-    with app.app_context():
-        db.create_all()
+    """Initialize the database with tables and sample data.
+    
+    Must be called inside an application context.
+    """
+    db.create_all()
+    migrate_db()
+    
+    # Create sample admin user if no users exist
+    if User.query.count() == 0:
+        admin_user = User(
+            username='admin',
+            email='admin@techflow.com',
+            password_hash=passwords.hash('admin123'),
+            full_name='TechFlow Admin',
+            role='admin',
+            is_verified=True,
+            avatar_url='https://ui-avatars.com/api/?name=Admin&background=ef4444&color=fff'
+        )
+        db.session.add(admin_user)
         
-        # Create sample admin user if no users exist
-        if User.query.count() == 0:
-            admin_user = User(
-                username='admin',
-                email='admin@techflow.com',
-                password_hash=generate_password_hash('admin123'),
-                full_name='TechFlow Admin',
-                role='admin',
-                is_verified=True,
-                avatar_url='https://ui-avatars.com/api/?name=Admin&background=ef4444&color=fff'
-            )
-            db.session.add(admin_user)
-            
-            # Create sample project
-            sample_project = Project(
-                name='TechFlow Platform',
-                description='The main TechFlow collaboration platform',
-                visibility='public',
-                owner_id=1
-            )
-            db.session.add(sample_project)
-            
-            db.session.commit()
-            logger.info("Database initialized with sample data")
-        else:
-            logger.info("Database already initialized")
+        # Create sample project
+        sample_project = Project(
+            name='TechFlow Platform',
+            description='The main TechFlow collaboration platform',
+            visibility='public',
+            owner_id=1
+        )
+        db.session.add(sample_project)
+        
+        db.session.commit()
+        logger.info("Database initialized with sample data")
+    else:
+        logger.info("Database already initialized")
+
+def schema_version():
+    """Latest migration applied to the database, or None if it was never initialised."""
+    if not inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        return None
+    return db.session.scalar(select(func.max(SchemaMigration.version))) or 0
+
+def ensure_schema():
+    """Bring the database schema up to date at startup.
+    
+    An up-to-date database costs two cheap queries. A fresh database is
+    initialised and an outdated one migrated, unless SCHEMA_AUTO_MIGRATE is
+    off, in which case startup fails until ``flask migrate-db`` is run.
+    Must be called inside an application context.
+    """
+    version = schema_version()
+    if version == SCHEMA_VERSION:
+        return
+    if not current_app.config['SCHEMA_AUTO_MIGRATE']:
+        raise RuntimeError(f"Database schema is at version {version}, expected {SCHEMA_VERSION}; "
+                           f"run 'flask init-db' or 'flask migrate-db'")
+    if version is None:
+        init_db()
+    else:
+        migrate_db()
+
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates_command():
+    """Compile every template into the Jinja bytecode cache."""
+    names = current_app.jinja_env.list_templates()
+    for name in names:
+        current_app.jinja_env.get_template(name)
+    print(f"Compiled {len(names)} templates into {current_app.config['JINJA_CACHE_DIR']}")
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database tables and sample data."""
+    init_db()
+
+@click.command('migrate-db')
+@with_appcontext
+def migrate_db_command():
+    """Apply pending schema migrations."""
+    db.create_all()
+    migrate_db()
+    print(f"Database schema is at version {schema_version()}")
 
-@app.route('/test-flash')
+@main.route('/test-flash')
 def test_flash():
     """Test endpoint to verify flash messages are working."""
     flash('This is a test success message!', 'success')
     flash('This is a test error message!', 'error')
     flash('This is a test info message!', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/flash-debug')
+@main.route('/flash-debug')
 def flash_debug():
     """Debug endpoint to show current flash messages."""
     messages = get_flashed_messages(with_categories=True)
@@ -546,13 +1974,58 @@ def flash_debug():
         'total_messages': len(messages)
     })
 
+def create_app(config=None):
+    """Create and configure a TechFlow application.
+    
+    ``config`` overrides the environment-derived defaults, e.g. for tests.
+    """
+    logging.basicConfig(level=logging.INFO)
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    if config:
+        app.config.update(config)
+    os.makedirs(app.config['INSTANCE_DIR'], exist_ok=True)
+    if app.config['JINJA_CACHE_DIR']:
+        os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = cache
+    app.jinja_env.globals['data_version'] = data_version
+    
+    db.init_app(app)
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            event.listen(db.engine, 'connect',
+                         sqlite_profile_listener(app.config['DATABASE_PROFILE']))
+    cache.init_app(app)
+    passwords.init_app(app)
+    activity_log.init_app(app, db, UserActivity, on_write=activity_rollups.apply)
+    activity_archive.init_app(app, db, UserActivity)
+    activity_rollups.init_app(app, db, UserActivity, ActivityRollup)
+    bulk_import.init_app(app, db, ImportJob, ImportProjectKey, User,
+                         write_chunk=write_import_chunk, check_task_field=check_import_task_field)
+    sql_instrumentation.init_app(app, db)
+    metrics.init_app(app, cache)
+    assets.init_app(app)
+    compression.init_app(app)
+    
+    app.register_blueprint(main)
+    app.cli.add_command(compile_templates_command)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_db_command)
+    app.cli.add_command(reconcile_counters_command)
+    return app
+
 if __name__ == '__main__':
-    # Initialize database
-    init_db()
+    app = create_app()
+    
+    # Create or migrate the database if needed
+    with app.app_context():
+        ensure_schema()
     
     # Run the application
     app.run(
         host='0.0.0.0',
         port=5000,
         debug=True
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,331 @@
+"""
+Static asset pipeline for TechFlow.
+
+``flask build-assets`` prepares everything under static/ for long-lived
+browser caching:
+
+1. Third-party CSS, JS and fonts that base.html used to load from CDNs are
+   downloaded into static/vendor/, together with every file their
+   stylesheets reference (Font Awesome webfonts, Inter font files).
+2. Each file is copied to static/dist/ with a content hash in its name
+   (``style.3f9a1c2b7d.css``). References between stylesheets and the files
+   they use are rewritten to the fingerprinted names.
+3. Text assets get precompressed ``.gz`` and ``.br`` variants (the ``.br``
+   ones are skipped if the Brotli package from requirements.txt is missing).
+4. static/dist/manifest.json maps each logical name to its fingerprinted one,
+   and lists the origins pages still load files from: those of vendored
+   assets missing from static/ (e.g. after ``build-assets --offline``).
+
+At runtime templates call ``asset_url('style.css')``, which takes the same
+filename as ``url_for('static', filename=...)``. Built assets are served
+from /assets/ with ``Cache-Control: immutable`` and the best precompressed
+variant the client accepts. Without a build, asset_url() falls back to the
+CDN URL for vendored files and to /static/ for local ones, so development
+needs no build step. ``remote_origins()`` gives base.html the origins to
+emit preconnect hints for.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.parse
+import urllib.request
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+# Logical name under static/ -> CDN URL it is vendored from
+VENDOR_ASSETS = {
+    'vendor/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'vendor/inter.css': 'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap',
+}
+
+# Other origins the files a vendored stylesheet references are served from
+VENDOR_FILE_ORIGINS = {
+    'vendor/inter.css': ('https://fonts.gstatic.com',),
+}
+
+# Google Fonts picks the font format from the User-Agent; ask for woff2
+FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+}
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def _is_local_reference(target):
+    return not target.startswith(('data:', '#', '/')) and '://' not in target
+
+
+def _split_reference(target):
+    """Split a CSS url() target into its path and any ?query/#fragment suffix."""
+    match = re.match(r'([^?#]*)(.*)', target)
+    return match.group(1), match.group(2)
+
+
+def _origin(url):
+    parts = urllib.parse.urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def remote_origins(vendor=VENDOR_ASSETS, local=(), file_origins=VENDOR_FILE_ORIGINS):
+    """Origins still loaded from for vendored assets not among local names.
+
+    Returns a list of {'origin', 'crossorigin'} dicts: files referenced from
+    stylesheets (fonts) are fetched in CORS mode, so their connections need
+    the crossorigin attribute to be reused.
+    """
+    origins = {}
+    for name, url in vendor.items():
+        if name in local:
+            continue
+        origins.setdefault(_origin(url), False)
+        for origin in file_origins.get(name, ()):
+            origins.setdefault(origin, True)
+    return [{'origin': origin, 'crossorigin': crossorigin} for origin, crossorigin in origins.items()]
+
+
+def _fetch(url):
+    with urllib.request.urlopen(urllib.request.Request(url, headers=FETCH_HEADERS),
+                                timeout=30) as response:
+        return response.read()
+
+
+def vendor_assets(static_dir, vendor=VENDOR_ASSETS, refresh=False, fetch=_fetch):
+    """Download vendored assets, and the files their stylesheets reference.
+
+    Files already present are kept unless ``refresh`` is set. Referenced files
+    on other hosts (Google's font files) are stored next to the stylesheet
+    and its url() references rewritten to point at the local copies.
+    """
+    for name, url in vendor.items():
+        path = os.path.join(static_dir, name)
+        if os.path.exists(path) and not refresh:
+            continue
+        logger.info(f"Vendoring {url}")
+        content = fetch(url)
+        if name.endswith('.css'):
+            content = _vendor_stylesheet_files(static_dir, name, url, content.decode(), fetch)
+            content = content.encode()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+
+def _vendor_stylesheet_files(static_dir, name, url, css, fetch):
+    base_dir = posixpath.dirname(name)
+
+    def download(match):
+        target = match.group(2)
+        if target.startswith('data:'):
+            return match.group(0)
+        source = urllib.parse.urljoin(url, target)
+        path, suffix = _split_reference(target)
+        if _is_local_reference(target):
+            local = posixpath.normpath(posixpath.join(base_dir, path))
+        else:
+            # Another host: keep the file beside the stylesheet
+            local = posixpath.join(base_dir, 'files', posixpath.basename(urllib.parse.urlparse(source).path))
+            suffix = ''
+        destination = os.path.join(static_dir, local)
+        if not os.path.exists(destination):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with open(destination, 'wb') as f:
+                f.write(fetch(source.split('#')[0]))
+        return f'url({posixpath.relpath(local, base_dir)}{suffix})'
+
+    return _CSS_URL.sub(download, css)
+
+
+def _fingerprinted_name(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    root, ext = posixpath.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+def _is_compressible(name):
+    mimetype = mimetypes.guess_type(name)[0] or ''
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _write_variants(path, content, min_size):
+    with open(path, 'wb') as f:
+        f.write(content)
+    if len(content) < min_size or not _is_compressible(path):
+        return
+    with open(path + '.gz', 'wb') as f:
+        # mtime=0 keeps rebuilds byte-for-byte identical
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(content, quality=11))
+
+
+def build_assets(static_dir, dist_dir, min_size=256, vendor=VENDOR_ASSETS,
+                 file_origins=VENDOR_FILE_ORIGINS):
+    """Fingerprint and precompress every file under static_dir into dist_dir.
+
+    Returns the manifest mapping logical names to fingerprinted ones. The
+    manifest.json written next to the files also records the remote origins
+    of the vendored assets that are not in static_dir.
+    """
+    sources = []
+    dist_dir = os.path.abspath(dist_dir)
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != dist_dir]
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            sources.append(os.path.relpath(path, static_dir).replace(os.sep, '/'))
+
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    manifest = {}
+    # Stylesheets go last so the files they reference already have their
+    # fingerprinted names
+    for name in sorted(sources, key=lambda name: (name.endswith('.css'), name)):
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            content = f.read()
+        if name.endswith('.css'):
+            content = _rewrite_stylesheet(name, content.decode(), manifest).encode()
+        manifest[name] = _fingerprinted_name(name, content)
+        path = os.path.join(dist_dir, manifest[name])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_variants(path, content, min_size)
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump({'files': manifest, 'remote_origins': remote_origins(vendor, manifest, file_origins)},
+                  f, indent=2, sort_keys=True)
+    return manifest
+
+
+def _rewrite_stylesheet(name, css, manifest):
+    base_dir = posixpath.dirname(name)
+
+    def rewrite(match):
+        target = match.group(2)
+        if not _is_local_reference(target):
+            return match.group(0)
+        path, suffix = _split_reference(target)
+        logical = posixpath.normpath(posixpath.join(base_dir, path))
+        if logical not in manifest:
+            return match.group(0)
+        return f'url({posixpath.relpath(manifest[logical], base_dir)}{suffix})'
+
+    return _CSS_URL.sub(rewrite, css)
+
+
+class Assets:
+    """Serves built assets and provides the asset_url() template helper."""
+
+    def __init__(self, app=None):
+        self._manifest = None
+        self._remote_origins = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_DIST_DIR', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSETS_VENDOR', VENDOR_ASSETS)
+        app.config.setdefault('ASSETS_VENDOR_FILE_ORIGINS', VENDOR_FILE_ORIGINS)
+        app.config.setdefault('ASSETS_MIN_COMPRESS_SIZE', 256)
+        self.app = app
+        self._manifest = None
+        self._remote_origins = None
+        app.extensions['assets'] = self
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+        app.jinja_env.globals['remote_origins'] = self.remote_origins
+        app.cli.add_command(build_assets_command)
+
+    def _load(self):
+        # Read on first use rather than at startup
+        path = os.path.join(self.app.config['ASSETS_DIST_DIR'], 'manifest.json')
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            origins = remote_origins(self.app.config['ASSETS_VENDOR'],
+                                     file_origins=self.app.config['ASSETS_VENDOR_FILE_ORIGINS'])
+            data = {'files': {}, 'remote_origins': origins}
+        self._manifest = data['files']
+        self._remote_origins = data['remote_origins']
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._load()
+        return self._manifest
+
+    def reload(self):
+        self._manifest = None
+        self._remote_origins = None
+
+    def remote_origins(self):
+        """Origins pages load vendored assets from, for preconnect hints."""
+        if self._remote_origins is None:
+            self._load()
+        return self._remote_origins
+
+    def url(self, filename):
+        """URL for a file under static/, fingerprinted when assets are built."""
+        fingerprinted = self.manifest.get(filename)
+        if fingerprinted is not None:
+            return url_for('assets', filename=fingerprinted)
+        vendor = self.app.config['ASSETS_VENDOR']
+        if filename in vendor:
+            return vendor[filename]
+        return url_for('static', filename=filename)
+
+    def serve(self, filename):
+        """Send a fingerprinted asset, precompressed if the client accepts it."""
+        dist_dir = self.app.config['ASSETS_DIST_DIR']
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if (request.accept_encodings[candidate] > 0
+                    and os.path.isfile(os.path.join(dist_dir, filename + suffix))):
+                encoding, filename = candidate, filename + suffix
+                break
+        response = send_from_directory(dist_dir, filename, mimetype=mimetype, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE
+        # send_file names the precompressed file; the client saves the original
+        response.headers.pop('Content-Disposition', None)
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+@click.command('build-assets')
+@click.option('--refresh', is_flag=True, help='Download vendored assets again.')
+@click.option('--offline', is_flag=True, help='Only fingerprint files already in static/.')
+@with_appcontext
+def build_assets_command(refresh, offline):
+    """Vendor, fingerprint and precompress static assets."""
+    app = current_app
+    if not offline:
+        vendor_assets(app.static_folder, app.config['ASSETS_VENDOR'], refresh=refresh)
+    manifest = build_assets(app.static_folder, app.config['ASSETS_DIST_DIR'],
+                            min_size=app.config['ASSETS_MIN_COMPRESS_SIZE'],
+                            vendor=app.config['ASSETS_VENDOR'],
+                            file_origins=app.config['ASSETS_VENDOR_FILE_ORIGINS'])
+    app.extensions['assets'].reload()
+    print(f"Built {len(manifest)} assets into {app.config['ASSETS_DIST_DIR']}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Activity rollup benchmark.
+
+Seeds a throwaway SQLite database with activity spread over 90 days, in
+activity-log sized batches, timing the writes with and without rollup
+maintenance. Then answers "logins per day for the last 30 days" and
+"active users per day this week" two ways, by scanning user_activity and
+from the rollups, and reports the median latency of each.
+
+    python benchmarks/bench_activity_rollups.py [--rows 200000] [--users 2000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+from app import create_app, db, init_db, activity_rollups, UserActivity
+
+app = create_app()
+
+TYPES = ('login', 'logout', 'registration', 'task_update')
+BATCH_SIZE = 200  # ACTIVITY_BATCH_SIZE
+
+
+def write(rows, rollup):
+    """Insert rows the way the activity log writer does, one transaction per batch."""
+    start = time.perf_counter()
+    for offset in range(0, len(rows), BATCH_SIZE):
+        batch = rows[offset:offset + BATCH_SIZE]
+        with db.engine.begin() as connection:
+            connection.execute(UserActivity.__table__.insert(), batch)
+            if rollup:
+                activity_rollups.apply(connection, batch)
+    return time.perf_counter() - start
+
+
+def median_ms(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def scan_logins_per_day(start, end):
+    day = func.date(UserActivity.timestamp)
+    return db.session.execute(
+        select(day, func.count()).where(UserActivity.activity_type == 'login',
+                                        UserActivity.timestamp >= start, UserActivity.timestamp < end)
+        .group_by(day)).all()
+
+
+def scan_active_users(start, end):
+    day = func.date(UserActivity.timestamp)
+    in_range = (UserActivity.timestamp >= start) & (UserActivity.timestamp < end)
+    per_day = db.session.execute(
+        select(day, func.count(UserActivity.user_id.distinct())).where(in_range).group_by(day)).all()
+    total = db.session.scalar(select(func.count(UserActivity.user_id.distinct())).where(in_range))
+    return per_day, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    now = datetime.utcnow()
+    rows = [{'user_id': random.randint(1, args.users), 'activity_type': random.choice(TYPES),
+             'timestamp': now - timedelta(seconds=random.randrange(90 * 86400))}
+            for _ in range(args.rows)]
+    sample = rows[:args.rows // 10]
+
+    with app.app_context():
+        db.drop_all()
+        init_db()
+        plain = write(sample, rollup=False)
+        db.session.execute(UserActivity.__table__.delete())
+        db.session.commit()
+        rolled = write(sample, rollup=True)
+        write(rows[len(sample):], rollup=True)
+        print(f"Writes ({len(sample)} rows in batches of {BATCH_SIZE}): "
+              f"{len(sample) / plain:,.0f} rows/s plain, {len(sample) / rolled:,.0f} rows/s with rollups")
+
+        rollup_rows = db.session.scalar(select(func.count()).select_from(db.metadata.tables['activity_rollup']))
+        print(f"{args.rows} activity rows, {rollup_rows} rollup rows")
+
+        month = now - timedelta(days=30)
+        week = now - timedelta(days=7)
+        queries = [
+            ('logins per day, 30 days',
+             lambda: scan_logins_per_day(month, now),
+             lambda: activity_rollups.counts('day', month, now, activity_type='login')),
+            ('active users per day, 7 days',
+             lambda: scan_active_users(week, now),
+             lambda: activity_rollups.active_users(week, now)),
+        ]
+        print(f"{'query':<30} {'scan ms':>9} {'rollup ms':>10}")
+        for label, scan, rollup in queries:
+            print(f"{label:<30} {median_ms(scan):>9.1f} {median_ms(rollup):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark.
+
+Renders /, /projects, /profile and /api/projects through the Flask test
+client with each compression setting and reports the bytes sent per response
+and the CPU time per request, next to the uncompressed baseline.
+
+    python benchmarks/bench_compression.py [--requests 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db, init_db, User, Project, TeamMember
+from compression import _brotli
+
+app = create_app()
+
+ENDPOINTS = ('/', '/projects', '/profile', '/api/projects?per_page=50')
+
+SETTINGS = [('identity', None, None), ('gzip-1', 'gzip', 1), ('gzip-6', 'gzip', 6),
+            ('gzip-9', 'gzip', 9)]
+if _brotli():
+    SETTINGS += [('br-4', 'br', 4), ('br-11', 'br', 11)]
+
+
+def seed():
+    with app.app_context():
+        db.drop_all()
+        init_db()
+        user = User(username='bench', email='bench@example.com', password_hash='x',
+                    full_name='Bench User', bio='Benchmarks response compression.')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(60):
+            db.session.add(Project(name=f'Project {i}', owner_id=user.id if i % 2 else 1,
+                                   description=f'Project {i} for the compression benchmark',
+                                   visibility='public'))
+        db.session.flush()
+        for project in Project.query.filter(Project.owner_id == 1).limit(20):
+            db.session.add(TeamMember(project_id=project.id, user_id=user.id))
+        db.session.commit()
+        return user.id, user.username
+
+
+def measure(client, path, encoding, requests):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    size = len(client.get(path, headers=headers).data)
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(path, headers=headers).close()
+    return size, (time.process_time() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    user_id, username = seed()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'], sess['user'], sess['user_role'] = user_id, username, 'developer'
+
+    print(f"{'endpoint':<28} {'setting':<9} {'bytes':>8} {'ratio':>6} {'cpu ms':>7} {'+cpu ms':>8}")
+    for path in ENDPOINTS:
+        baseline_size = baseline_cpu = None
+        for label, encoding, level in SETTINGS:
+            if encoding == 'gzip':
+                app.config['COMPRESS_LEVEL'] = level
+            elif encoding == 'br':
+                app.config['COMPRESS_BR_LEVEL'] = level
+            size, cpu = measure(client, path, encoding, args.requests)
+            if baseline_size is None:
+                baseline_size, baseline_cpu = size, cpu
+            print(f"{path:<28} {label:<9} {size:>8} {size / baseline_size:>6.2f} "
+                  f"{cpu:>7.2f} {cpu - baseline_cpu:>+8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Dashboard data loading benchmark.
+
+Seeds a throwaway SQLite database (10k projects and 100k tasks by default)
+and compares the old per-panel dashboard queries with load_dashboard().
+
+    python benchmarks/bench_dashboard.py [--projects 10000] [--tasks 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db, load_dashboard, migrate_db, User, Project, TeamMember, Task, UserActivity
+
+app = create_app()
+
+USERS = 1000
+TARGET_USER = 1
+
+
+def seed(project_count, task_count):
+    random.seed(42)
+    now = datetime.utcnow()
+    db.drop_all()
+    db.create_all()
+    migrate_db()
+    insert = lambda model, rows: db.session.execute(model.__table__.insert(), rows)
+    insert(User, [{'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com',
+                   'password_hash': 'x', 'created_at': now} for i in range(1, USERS + 1)])
+    insert(Project, [{'id': i, 'name': f'Project {i}', 'owner_id': random.randint(1, USERS),
+                      'status': 'active', 'visibility': 'private', 'created_at': now,
+                      'updated_at': now - timedelta(minutes=i)}
+                     for i in range(1, project_count + 1)])
+    insert(TeamMember, [{'user_id': random.randint(1, USERS), 'project_id': random.randint(1, project_count),
+                         'joined_at': now} for _ in range(project_count * 3)])
+    insert(Task, [{'title': f'Task {i}', 'project_id': random.randint(1, project_count),
+                   'assignee_id': random.randint(1, USERS),
+                   'status': random.choice(('todo', 'in_progress', 'review', 'done')),
+                   'created_at': now, 'updated_at': now,
+                   'due_date': now + timedelta(days=random.randint(0, 90))}
+                  for i in range(task_count)])
+    insert(UserActivity, [{'user_id': random.randint(1, USERS), 'activity_type': 'login',
+                           'timestamp': now - timedelta(seconds=i)} for i in range(task_count)])
+    db.session.commit()
+
+
+def legacy_dashboard(user_id):
+    """The per-panel queries dashboard() issued before load_dashboard()."""
+    user = db.session.get(User, user_id)
+    user_projects = Project.query.filter_by(owner_id=user.id).order_by(Project.updated_at.desc()).limit(5).all()
+    team_projects = db.session.query(Project).join(TeamMember).filter(
+        TeamMember.user_id == user.id).order_by(Project.updated_at.desc()).limit(5).all()
+    activities = UserActivity.query.filter_by(user_id=user.id).order_by(UserActivity.timestamp.desc()).limit(10).all()
+    assigned_tasks = Task.query.filter_by(assignee_id=user.id).filter(
+        Task.status.in_(['todo', 'in_progress'])).order_by(Task.due_date.asc()).limit(5).all()
+    return {
+        'user_projects': user_projects,
+        'team_projects': team_projects,
+        'activities': activities,
+        'assigned_tasks': assigned_tasks,
+        'total_projects': len(user_projects) + len(team_projects),
+        'active_tasks': len(assigned_tasks),
+        'completed_tasks': Task.query.filter_by(assignee_id=user.id, status='done').count(),
+        'team_memberships': TeamMember.query.filter_by(user_id=user.id).count(),
+    }
+
+
+def measure(func, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.expire_all()
+        start = time.perf_counter()
+        func(TARGET_USER)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--projects', type=int, default=10000)
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(args.projects, args.tasks)
+        print(f"{'loader':<16} {'median ms':>10} {'max ms':>8}")
+        for label, func in (('legacy', legacy_dashboard), ('load_dashboard', load_dashboard)):
+            median, worst = measure(func, args.runs)
+            print(f"{label:<16} {median:>10.2f} {worst:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
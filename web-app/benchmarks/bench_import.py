@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Bulk import benchmark.
+
+Writes an NDJSON file of projects, members and tasks (one project with two
+members per 50 tasks) and imports it with bulk_import.run(), reporting rows
+per second and the process's peak memory before and after, to show memory
+stays flat as the file grows.
+
+    python benchmarks/bench_import.py [--rows 1000000] [--chunk-size 1000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db, init_db, bulk_import, ImportJob, User
+
+app = create_app()
+
+USERS = 500
+STATUSES = ('todo', 'in_progress', 'review', 'done')
+
+
+def write_file(path, rows):
+    with open(path, 'w') as f:
+        written = 0
+        while written < rows:
+            key = f'p{written}'
+            records = [{'type': 'project', 'project': key, 'name': f'Project {written}',
+                        'owner': f'user{written % USERS}'}]
+            records += [{'type': 'member', 'project': key, 'user': f'user{(written + i) % USERS}'}
+                        for i in (1, 2)]
+            records += [{'type': 'task', 'project': key, 'title': f'Task {written}.{i}',
+                         'status': STATUSES[i % 4], 'assignee': f'user{i % USERS}'} for i in range(50)]
+            for record in records[:rows - written]:
+                f.write(json.dumps(record) + '\n')
+            written += len(records)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    path = os.path.join(_tmpdir, 'import.ndjson')
+    write_file(path, args.rows)
+    print(f"File: {args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+    with app.app_context():
+        db.drop_all()
+        init_db()
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+            for i in range(USERS)])
+        db.session.commit()
+        job = ImportJob(format='ndjson', source='bench')
+        db.session.add(job)
+        db.session.commit()
+
+        before = peak_rss_mb()
+        start = time.perf_counter()
+        with open(path) as lines:
+            bulk_import.run(job, lines, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"Status: {job.status} {job.error or ''}")
+        print(f"Imported {job.rows_done} rows in {elapsed:.1f} s ({job.rows_done / elapsed:,.0f} rows/s): "
+              f"{job.projects_created} projects, {job.members_created} members, {job.tasks_created} tasks")
+        print(f"Peak RSS: {before:.0f} MB before import, {peak_rss_mb():.0f} MB after")
+
+
+if __name__ == '__main__':
+    main()
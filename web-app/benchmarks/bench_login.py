@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Runs concurrent POST /login requests through the Flask test client against a
+throwaway SQLite database and reports requests/sec and latency percentiles.
+
+- ``activity``: synchronous vs write-behind activity logging, with cheap
+  password hashes so the database work dominates.
+- ``storm``: logins at the configured PASSWORD_HASH_METHOD cost keep every
+  login thread busy, while other threads request /api/health. Reports the
+  latency of those other requests with no logins running, and with the
+  hashes per process unbounded, bounded to the CPU count and to one, next
+  to the login rate each setting allows.
+
+    python benchmarks/bench_login.py [--scenario all] [--threads 8] [--requests 400]
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from itertools import count
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db, activity_log, passwords, User
+
+app = create_app()
+
+PASSWORD = 'benchmark-password'
+
+
+def setup_users(count, method):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        db.session.add_all(User(username=f'bench{i}', email=f'bench{i}@example.com',
+                                password_hash=password_hash) for i in range(count))
+        db.session.commit()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(threads, total):
+    latencies = []
+    lock = threading.Lock()
+    per_thread = total // threads
+
+    def worker(index):
+        client = app.test_client()
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            response = client.post('/login', data={'username': f'bench{index}',
+                                                   'password': PASSWORD})
+            local.append(time.perf_counter() - start)
+            assert response.status_code == 302, response.status_code
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    activity_log.flush()
+    return len(latencies) / elapsed, latencies
+
+
+def storm(login_threads, probe_threads, seconds):
+    """Log in continuously from login_threads while probe_threads request
+    /api/health; return (logins/sec, probe latencies)."""
+    stop = threading.Event()
+    logins, probes = [], []
+    lock = threading.Lock()
+
+    def login(index):
+        client = app.test_client()
+        for done in count():
+            if stop.is_set():
+                break
+            client.post('/login', data={'username': f'bench{index}', 'password': PASSWORD})
+        with lock:
+            logins.append(done)
+
+    def probe():
+        client = app.test_client()
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get('/api/health')
+            local.append(time.perf_counter() - start)
+        with lock:
+            probes.extend(local)
+
+    threads = [threading.Thread(target=login, args=(i,)) for i in range(login_threads)]
+    threads += [threading.Thread(target=probe) for _ in range(probe_threads)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    activity_log.flush()
+    return sum(logins) / seconds, probes
+
+
+def report(label, rate, latencies):
+    print(f"{label:<16} {rate:>8.1f} {percentile(latencies, 50) * 1000:>8.1f} "
+          f"{percentile(latencies, 99) * 1000:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenario', choices=('activity', 'storm', 'all'), default='all')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--probes', type=int, default=4,
+                        help='threads requesting /api/health during the storm')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.scenario in ('activity', 'all'):
+        print(f"{'scenario':<16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        cheap = 'pbkdf2:sha256:1000'
+        passwords.method = cheap
+        for mode in ('sync', 'async'):
+            setup_users(args.threads, cheap)
+            app.config['ACTIVITY_LOG_MODE'] = mode
+            # The login route prints debug output for every request
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate, latencies = run(args.threads, args.requests)
+            report(f'activity-{mode}', rate, latencies)
+
+    if args.scenario in ('storm', 'all'):
+        method = app.config['PASSWORD_HASH_METHOD']
+        app.config['ACTIVITY_LOG_MODE'] = 'async'
+        passwords.method = method
+        setup_users(args.threads, method)
+        cpus = os.cpu_count() or 1
+        print(f"{args.threads} login threads, {args.probes} /api/health threads, {args.seconds:.0f} s each")
+        print(f"{'hash concurrency':<16} {'login/s':>8} {'p50 ms':>8} {'p99 ms':>8}  (/api/health)")
+        for label, concurrency, login_threads in (('no logins', 0, 0), ('unbounded', 0, args.threads),
+                                                  (f'{cpus} (CPUs)', cpus, args.threads), ('1', 1, args.threads)):
+            passwords.set_concurrency(concurrency)
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate, latencies = storm(login_threads, args.probes, args.seconds)
+            report(label, rate, latencies)
+
+
+if __name__ == '__main__':
+    main()
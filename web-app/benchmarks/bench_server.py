@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Server throughput benchmark.
+
+Starts the app under the Flask development server and under gunicorn with
+gunicorn.conf.py, each against the same seeded SQLite database, then fires
+concurrent GET requests at /, /login and /api/stats and reports requests/sec
+per endpoint.
+
+    python benchmarks/bench_server.py [--threads 16] [--requests 2000]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, HERE)
+
+from app import create_app, db, init_db, User, Project
+
+ENDPOINTS = ('/', '/login', '/api/stats')
+
+DEV_SERVER = "from app import create_app; create_app().run(port={port}, threaded=True)"
+
+
+def seed():
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        init_db()
+        users = [User(username=f'bench{i}', email=f'bench{i}@example.com', password_hash='x')
+                 for i in range(50)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(Project(name=f'Project {i}', description='Benchmark project',
+                                   owner_id=users[i % 50].id, visibility='public')
+                           for i in range(200))
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def start_server(kind, port):
+    env = dict(os.environ)
+    if kind == 'dev':
+        command = [sys.executable, '-c', DEV_SERVER.format(port=port)]
+    else:
+        env['PORT'] = str(port)
+        command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                   '--access-logfile', '/dev/null', 'wsgi:app']
+    process = subprocess.Popen(command, cwd=HERE, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_ready(port)
+    return process
+
+
+def hammer(port, path, threads, total):
+    url = f'http://127.0.0.1:{port}{path}'
+    per_thread = total // threads
+    errors = []
+
+    def worker():
+        for _ in range(per_thread):
+            try:
+                urllib.request.urlopen(url, timeout=30).read()
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        print(f"  {len(errors)} failed requests on {path}: {errors[0]!r}")
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    seed()
+    print(f"{'server':<10} " + ' '.join(f'{path:>12}' for path in ENDPOINTS) + '   (req/s)')
+    for kind in ('dev', 'gunicorn'):
+        port = free_port()
+        process = start_server(kind, port)
+        try:
+            for path in ENDPOINTS:
+                hammer(port, path, args.threads, args.threads * 5)  # warm-up
+            rates = [hammer(port, path, args.threads, args.requests) for path in ENDPOINTS]
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{kind:<10} " + ' '.join(f'{rate:>12.1f}' for rate in rates))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark.
+
+Boots the app in a fresh interpreter, as a restarted worker would, and times
+each phase from ``import app`` to the first response for GET /:
+
+- ``init_db``: the old boot path, running create_all() and the sample-data
+  check on every start.
+- ``ensure_schema``: the schema-version check that gunicorn.conf.py runs once
+  in the master (``on_starting``) and ``python app.py`` runs before serving.
+
+Each scenario runs against an already initialised database. Only the schema
+phase differs between them: the import phase is nearly all Flask, Werkzeug
+and SQLAlchemy loading, which app.py imports at module level and no boot path
+avoids. With GUNICORN_PRELOAD the master pays it once and workers inherit
+the loaded modules when they fork.
+
+    python benchmarks/bench_startup.py [--runs 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import app as techflow
+imported = time.perf_counter()
+app = techflow.create_app()
+created = time.perf_counter()
+with app.app_context():
+    techflow.{boot}()
+booted = time.perf_counter()
+response = app.test_client().get('/')
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'create_app': created - imported,
+                  'schema': booted - created, 'first_response': done - booted,
+                  'total': done - start}}))
+"""
+
+PHASES = ('import', 'create_app', 'schema', 'first_response', 'total')
+
+
+def boot(boot_function, env):
+    output = subprocess.run([sys.executable, '-c', CHILD.format(boot=boot_function)],
+                            cwd=HERE, env=env, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='techflow-bench-'), 'bench.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+    boot('init_db', env)  # create the database once
+
+    print(f"{'boot':<14} " + ' '.join(f'{phase:>15}' for phase in PHASES) + '   (median ms)')
+    for boot_function in ('init_db', 'ensure_schema'):
+        runs = [boot(boot_function, env) for _ in range(args.runs)]
+        medians = [statistics.median(run[phase] for run in runs) * 1000 for phase in PHASES]
+        print(f"{boot_function:<14} " + ' '.join(f'{value:>15.1f}' for value in medians))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Batch task operations benchmark.
+
+Applies the same task changes three ways against a throwaway SQLite
+database and reports operations per second:
+
+- orm: load, change and commit one Task at a time in-process
+- per-request: one POST /api/tasks/batch per operation (one HTTP call and
+  one commit each, as board tooling did before the batch endpoint)
+- batch: POST /api/tasks/batch with --batch-size operations per request
+
+    python benchmarks/bench_task_batch.py [--operations 1000] [--batch-size 500]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db, init_db, User, Project, Task
+
+app = create_app()
+
+STATUSES = ('todo', 'in_progress', 'review', 'done')
+
+
+def seed(task_count):
+    with app.app_context():
+        db.drop_all()
+        init_db()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        projects = [Project(name=f'Board {i}', owner_id=user.id) for i in range(2)]
+        db.session.add_all(projects)
+        db.session.flush()
+        now = datetime.utcnow()
+        db.session.execute(Task.__table__.insert(), [
+            {'title': f'Task {i}', 'project_id': projects[0].id, 'status': 'todo',
+             'priority': 'medium', 'created_at': now, 'updated_at': now}
+            for i in range(task_count)])
+        db.session.commit()
+        task_ids = db.session.scalars(db.select(Task.id).order_by(Task.id)).all()
+        return user.id, [project.id for project in projects], task_ids
+
+
+def operations(round_number, project_ids, task_ids):
+    """A mix of status changes, moves and creates, different every round."""
+    ops = []
+    for i, task_id in enumerate(task_ids):
+        if i % 4 == 3:
+            ops.append({'op': 'move', 'id': task_id, 'project_id': project_ids[round_number % 2]})
+        else:
+            ops.append({'op': 'update', 'id': task_id, 'status': STATUSES[(i + round_number) % 4]})
+    ops += [{'op': 'create', 'project_id': project_ids[0], 'title': f'New {round_number}.{i}'}
+            for i in range(len(task_ids) // 10)]
+    return ops
+
+
+def run_orm(ops):
+    with app.app_context():
+        for op in ops:
+            if op['op'] == 'create':
+                db.session.add(Task(title=op['title'], project_id=op['project_id']))
+            else:
+                task = db.session.get(Task, op['id'])
+                if op['op'] == 'move':
+                    task.project_id = op['project_id']
+                else:
+                    task.status = op['status']
+            db.session.commit()
+
+
+def run_requests(client, ops, batch_size):
+    for start in range(0, len(ops), batch_size):
+        response = client.post('/api/tasks/batch', json={'operations': ops[start:start + batch_size]})
+        assert response.status_code == 200, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', type=int, default=1000,
+                        help='task updates and moves per run (plus 10%% creates)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    user_id, project_ids, task_ids = seed(args.operations)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'], sess['user'], sess['user_role'] = user_id, 'bench', 'developer'
+
+    runs = [
+        ('orm', lambda ops: run_orm(ops)),
+        ('per-request', lambda ops: run_requests(client, ops, 1)),
+        (f'batch ({args.batch_size})', lambda ops: run_requests(client, ops, args.batch_size)),
+    ]
+    print(f"{'method':<14} {'operations':>10} {'seconds':>8} {'ops/s':>9}")
+    for round_number, (label, run) in enumerate(runs, 1):
+        ops = operations(round_number, project_ids, task_ids)
+        start = time.perf_counter()
+        run(ops)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<14} {len(ops):>10} {elapsed:>8.2f} {len(ops) / elapsed:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
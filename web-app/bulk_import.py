@@ -0,0 +1,291 @@
+"""
+Bulk import of projects, team members and tasks.
+
+Records are read from CSV or NDJSON, one per row, as a stream. Every record
+has a ``type`` and a ``project`` key: project records define the key, and
+member and task records refer to a project defined earlier in the same
+import. Owners, members and assignees are usernames, resolved through a
+lookup table loaded once per import.
+
+Records are written IMPORT_CHUNK_SIZE at a time, each chunk in its own
+transaction with bulk INSERTs. The chunk's transaction also advances the
+job's checkpoint, so after a failure (a bad record, undecodable text or a
+database error) the chunk is rolled back as a whole and ``resume``
+continues with it. Memory use is bounded by the chunk size, the username
+table and the project keys, never by the size of the file.
+
+``BulkImport`` validates the records and keeps the job and its project
+keys; the rows themselves are inserted by the ``write_chunk`` callback
+app.py passes in, which also maintains platform counters and data versions.
+``flask import-data`` imports a file from the command line.
+"""
+
+import csv
+import itertools
+import json
+import logging
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = {
+    'project': ('project', 'name', 'description', 'repository_url', 'status', 'visibility', 'owner'),
+    'member': ('project', 'user', 'role'),
+    'task': ('project', 'title', 'description', 'status', 'priority', 'assignee', 'due_date'),
+}
+PROJECT_STATUSES = ('active', 'archived', 'completed')
+PROJECT_VISIBILITIES = ('private', 'public', 'team')
+MEMBER_ROLES = ('owner', 'admin', 'member', 'viewer')
+TASK_FIELDS = ('title', 'description', 'status', 'priority', 'due_date')
+
+
+class ImportRecordError(Exception):
+    """A record that cannot be imported; fails the chunk it is in."""
+
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def read_import_records(lines, import_format):
+    """Yield (line number, record) from CSV or NDJSON text, one at a time.
+
+    Empty values are dropped, so CSV files can share one header between
+    record types. Text that is not UTF-8 and malformed CSV raise
+    ImportRecordError like an invalid record.
+    """
+    line_number = 0
+    try:
+        if import_format == 'csv':
+            reader = csv.DictReader(lines)
+            for record in reader:
+                line_number = reader.line_num
+                if None in record:
+                    raise ImportRecordError(line_number, 'more values than header columns')
+                yield line_number, {field: value for field, value in record.items() if value}
+            return
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ImportRecordError(line_number, 'invalid JSON')
+            if not isinstance(record, dict):
+                raise ImportRecordError(line_number, 'expected a JSON object')
+            yield line_number, {field: value for field, value in record.items() if value not in (None, '')}
+    except UnicodeDecodeError:
+        # Text is decoded ahead of the parser, so this is where it stopped
+        raise ImportRecordError(line_number + 1, 'text is not valid UTF-8')
+    except csv.Error as e:
+        # The reader has not counted the line it failed on
+        raise ImportRecordError(reader.line_num + 1, f"invalid CSV: {e}")
+
+
+def _import_choice(record, field, choices, line):
+    value = record.get(field)
+    if value is not None and value not in choices:
+        raise ImportRecordError(line, f"{field} must be one of {', '.join(choices)}")
+    return value
+
+
+def _import_text(record, field, line, required=False, max_length=None):
+    value = record.get(field)
+    if value is None:
+        if required:
+            raise ImportRecordError(line, f"{field} is required")
+        return None
+    if not isinstance(value, str):
+        raise ImportRecordError(line, f"{field} must be a string")
+    if max_length and len(value) > max_length:
+        raise ImportRecordError(line, f"{field} is too long")
+    return value
+
+
+def _import_user(record, field, line, usernames, required=False):
+    username = _import_text(record, field, line, required)
+    if username is None:
+        return None
+    if username not in usernames:
+        raise ImportRecordError(line, f"unknown user {username}")
+    return usernames[username]
+
+
+def describe_import(job):
+    return (f"Import {job.id}: {job.rows_done} rows ({job.projects_created} projects, "
+            f"{job.members_created} members, {job.tasks_created} tasks)")
+
+
+class BulkImport:
+    """Runs imports of projects, members and tasks, checkpointed per chunk."""
+
+    def __init__(self, app=None, db=None, job_model=None, key_model=None, user_model=None,
+                 write_chunk=None, check_task_field=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app, db, job_model, key_model, user_model, write_chunk, check_task_field)
+
+    def init_app(self, app, db, job_model, key_model, user_model, write_chunk, check_task_field):
+        """Register the importer.
+
+        ``write_chunk(projects, members, tasks, project_keys)`` inserts one
+        chunk's (project key, values) pairs and returns the new projects'
+        ids by key. ``check_task_field(field, value)`` returns a task value
+        for the database or raises ValueError.
+        """
+        self.app = app
+        self.db = db
+        self.job_model = job_model
+        self.key_model = key_model
+        self.user_model = user_model
+        self.write_chunk = write_chunk
+        self.check_task_field = check_task_field
+        app.extensions['bulk_import'] = self
+        app.cli.add_command(import_data_command)
+
+    def _parse_chunk(self, chunk, usernames, project_keys):
+        """Validate one chunk of records into (project key, values) pairs.
+
+        Returns the projects, members and tasks. Raises ImportRecordError on
+        the first invalid record.
+        """
+        projects, members, tasks = [], [], []
+        new_keys = set()
+        for line, record in chunk:
+            kind = record.get('type')
+            if not isinstance(kind, str) or kind not in IMPORT_FIELDS:
+                raise ImportRecordError(line, 'type must be project, member or task')
+            unexpected = set(record) - set(IMPORT_FIELDS[kind]) - {'type'}
+            if unexpected:
+                raise ImportRecordError(line, f"unexpected fields for {kind}: {', '.join(sorted(unexpected))}")
+            key = _import_text(record, 'project', line, required=True, max_length=100)
+            if kind == 'project':
+                if key in project_keys or key in new_keys:
+                    raise ImportRecordError(line, f"project {key} is defined twice")
+                new_keys.add(key)
+                projects.append((key, {
+                    'name': _import_text(record, 'name', line, required=True, max_length=100),
+                    'description': _import_text(record, 'description', line),
+                    'repository_url': _import_text(record, 'repository_url', line, max_length=200),
+                    'status': _import_choice(record, 'status', PROJECT_STATUSES, line),
+                    'visibility': _import_choice(record, 'visibility', PROJECT_VISIBILITIES, line),
+                    'owner_id': _import_user(record, 'owner', line, usernames, required=True),
+                }))
+                continue
+            if key not in project_keys and key not in new_keys:
+                raise ImportRecordError(line, f"unknown project {key}")
+            if kind == 'member':
+                members.append((key, {
+                    'user_id': _import_user(record, 'user', line, usernames, required=True),
+                    'role': _import_choice(record, 'role', MEMBER_ROLES, line),
+                }))
+            else:
+                values = {}
+                for field in TASK_FIELDS:
+                    if field in record:
+                        try:
+                            values[field] = self.check_task_field(field, record[field])
+                        except ValueError as e:
+                            raise ImportRecordError(line, str(e))
+                if 'title' not in values:
+                    raise ImportRecordError(line, 'title is required')
+                values['assignee_id'] = _import_user(record, 'assignee', line, usernames)
+                tasks.append((key, values))
+        return projects, members, tasks
+
+    def _import_chunk(self, job_id, chunk, usernames, project_keys):
+        """Validate and insert one chunk of records in the current transaction.
+
+        Returns the project keys the chunk defined and the number of
+        projects, members and tasks it created.
+        """
+        projects, members, tasks = self._parse_chunk(chunk, usernames, project_keys)
+        new_keys = self.write_chunk(projects, members, tasks, project_keys)
+        if new_keys:
+            self.db.session.execute(self.key_model.__table__.insert(), [
+                {'job_id': job_id, 'key': key, 'project_id': project_id}
+                for key, project_id in new_keys.items()])
+        return new_keys, {'projects': len(projects), 'members': len(members), 'tasks': len(tasks)}
+
+    def create_job(self, import_format, source=None, created_by=None):
+        job = self.job_model(format=import_format, source=source, created_by=created_by)
+        self.db.session.add(job)
+        self.db.session.commit()
+        return job
+
+    def run(self, job, lines, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+        """Import records from lines for job, starting after its checkpoint.
+
+        ``progress(job)`` is called after every committed chunk. On an
+        invalid record or a database error the chunk is rolled back and the
+        job marked failed; running it again with the same (corrected) file
+        resumes at the failed chunk.
+        """
+        session = self.db.session
+        users, keys = self.user_model, self.key_model
+        usernames = dict(session.execute(select(users.username, users.id)).all())
+        project_keys = dict(session.execute(
+            select(keys.key, keys.project_id).where(keys.job_id == job.id)).all())
+        job.status, job.error = 'running', None
+        session.commit()
+
+        # Records before the checkpoint were committed by an earlier run
+        records = itertools.islice(read_import_records(lines, job.format), job.rows_done, None)
+        try:
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                new_keys, counts = self._import_chunk(job.id, chunk, usernames, project_keys)
+                job.rows_done += len(chunk)
+                job.projects_created += counts['projects']
+                job.members_created += counts['members']
+                job.tasks_created += counts['tasks']
+                session.commit()
+                project_keys.update(new_keys)
+                if progress:
+                    progress(job)
+        except (ImportRecordError, SQLAlchemyError) as e:
+            session.rollback()
+            job.status, job.error = 'failed', str(e).splitlines()[0]
+            session.commit()
+            logger.warning(f"Import {job.id} failed after {job.rows_done} rows: {job.error}")
+            return job
+        job.status = 'completed'
+        session.commit()
+        return job
+
+
+@click.command('import-data')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS),
+              help='File format (default: from the file extension).')
+@click.option('--resume', type=int, help='Continue the failed import with this id.')
+@click.option('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, show_default=True,
+              help='Records per transaction.')
+@with_appcontext
+def import_data_command(path, import_format, resume, chunk_size):
+    """Import projects, members and tasks from a CSV or NDJSON file."""
+    importer = current_app.extensions['bulk_import']
+    if resume:
+        job = importer.db.session.get(importer.job_model, resume)
+        if job is None or job.status == 'completed':
+            raise click.ClickException(f"No unfinished import with id {resume}")
+    else:
+        import_format = import_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        job = importer.create_job(import_format, source=os.path.basename(path))
+
+    with open(path, encoding='utf-8-sig', newline='') as lines:
+        importer.run(job, lines, chunk_size, progress=lambda job: print(describe_import(job)))
+    if job.status == 'failed':
+        raise click.ClickException(f"Import {job.id} failed after {job.rows_done} rows: {job.error}\n"
+                                   f"Fix the file and run again with --resume {job.id}")
+    print(f"Import {job.id} completed: {job.rows_done} rows")
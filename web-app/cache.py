@@ -0,0 +1,232 @@
+"""
+TechFlow data cache.
+
+A small caching layer for data that is expensive to compute but changes
+rarely (landing-page projects, platform stats, public project lists).
+
+Two backends are available, chosen with the CACHE_URL setting:
+
+- ``memory://`` (default): an in-process LRU with per-entry TTL. Each worker
+  process has its own copy, so it suits single-process deployments.
+- ``redis://host:port/db``: shared by every worker process. Requires the
+  optional ``redis`` package.
+
+Entries can be tagged. ``Cache.invalidate(tag)`` retires every entry carrying
+that tag by bumping the tag's version, which works the same way for both
+backends and never needs to enumerate keys.
+"""
+
+import functools
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(MISSING)
+                elif entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    values.append(MISSING)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        return values
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache shared by all worker processes through a Redis server."""
+
+    name = 'redis'
+
+    def __init__(self, url, prefix='techflow:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_URL points at Redis but the 'redis' package is not installed"
+            ) from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        # Redis evicts entries itself; see INFO stats evicted_keys
+        self.evictions = 0
+
+    def get_many(self, keys):
+        raw_values = self.client.mget([self.prefix + key for key in keys])
+        return [MISSING if raw is None else pickle.loads(raw) for raw in raw_values]
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+
+def create_backend(url, max_entries=1024):
+    """Build a cache backend from a CACHE_URL value."""
+    if url.startswith('memory://'):
+        return MemoryBackend(max_entries=max_entries)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+class Cache:
+    """Cache front end with tag-based invalidation and hit/miss statistics."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = 300
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_URL', 'memory://')
+        app.config.setdefault('CACHE_DEFAULT_TTL', 300)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        self.backend = create_backend(app.config['CACHE_URL'],
+                                      max_entries=app.config['CACHE_MAX_ENTRIES'])
+        self.default_ttl = app.config['CACHE_DEFAULT_TTL']
+        app.extensions['cache'] = self
+
+    def _record(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _versioned_key(self, key, tags):
+        """Append the current version of each tag to the key."""
+        if not tags:
+            return key
+        tag_keys = [f'tag:{tag}' for tag in tags]
+        versions = self.backend.get_many(tag_keys)
+        for index, version in enumerate(versions):
+            if version is MISSING:
+                version = uuid.uuid4().hex[:12]
+                self.backend.set(tag_keys[index], version)
+                versions[index] = version
+        return f"{key}#{'.'.join(versions)}"
+
+    def get(self, key, tags=()):
+        """Return the cached value for key, or None if absent."""
+        value = self.backend.get_many([self._versioned_key(key, tags)])[0]
+        self._record(value is not MISSING)
+        return None if value is MISSING else value
+
+    def set(self, key, value, ttl=None, tags=()):
+        """Store value under key for ttl seconds (CACHE_DEFAULT_TTL if None)."""
+        self.backend.set(self._versioned_key(key, tags), value,
+                         self.default_ttl if ttl is None else ttl)
+
+    def delete(self, key, tags=()):
+        self.backend.delete(self._versioned_key(key, tags))
+
+    def get_or_set(self, key, compute, ttl=None, tags=()):
+        """Return the cached value for key, computing and storing it on a miss."""
+        versioned = self._versioned_key(key, tags)
+        value = self.backend.get_many([versioned])[0]
+        self._record(value is not MISSING)
+        if value is MISSING:
+            value = compute()
+            self.backend.set(versioned, value, self.default_ttl if ttl is None else ttl)
+        return value
+
+    def invalidate(self, *tags):
+        """Retire every entry stored with any of the given tags."""
+        for tag in tags:
+            self.backend.set(f'tag:{tag}', uuid.uuid4().hex[:12])
+
+    def clear(self):
+        self.backend.clear()
+
+    def cached(self, key=None, ttl=None, tags=(), version=None):
+        """Decorator caching a function's return value, keyed on its arguments.
+
+        ``version()``, if given, is called on every lookup and its result
+        made part of the key, so a version kept outside this cache (e.g. in
+        the database) retires entries in every process that shares it.
+        """
+        def decorator(f):
+            base_key = key or f'{f.__module__}.{f.__qualname__}'
+
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                cache_key = base_key
+                if version is not None:
+                    cache_key += f'@{version()}'
+                if args or kwargs:
+                    cache_key += f':{args!r}:{sorted(kwargs.items())!r}'
+                return self.get_or_set(cache_key, lambda: f(*args, **kwargs),
+                                       ttl=ttl, tags=tags)
+            return wrapper
+        return decorator
+
+    def counters(self):
+        """Hit, miss and eviction counters: cheap enough for every metrics scrape."""
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.backend.evictions,
+        }
+
+    def stats(self):
+        """Counters for monitoring, plus the number of entries.
+        
+        Counting entries scans the whole keyspace on Redis.
+        """
+        return {**self.counters(), 'size': self.backend.size()}
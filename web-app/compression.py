@@ -0,0 +1,161 @@
+"""
+Response compression for TechFlow.
+
+Compresses dynamic responses (rendered pages, JSON, NDJSON, metrics) with
+brotli or gzip, whichever the client prefers in Accept-Encoding. Brotli
+comes from the Brotli package in requirements.txt; should it fail to import,
+only gzip is offered.
+
+- Buffered responses are compressed in one go, and only when the body is
+  at least COMPRESS_MIN_SIZE bytes.
+- Streamed responses are compressed as they are produced. The compressor
+  is flushed whenever COMPRESS_STREAM_FLUSH_SIZE bytes of input have
+  arrived, so clients receive rows steadily without a flush per row
+  costing compression ratio.
+- Files sent with send_file, responses that already have a
+  Content-Encoding (the precompressed /assets/ files) and responses marked
+  ``Cache-Control: no-transform`` are left alone.
+
+Settings (app.config):
+
+- COMPRESS_ENABLED: turn compression on or off (default True).
+- COMPRESS_MIMETYPES: content types that are compressed.
+- COMPRESS_MIN_SIZE: smallest buffered body worth compressing (default 500).
+- COMPRESS_LEVEL: gzip level 1-9 (default 6).
+- COMPRESS_BR_LEVEL: brotli quality 0-11 (default 4).
+- COMPRESS_STREAM_FLUSH_SIZE: input bytes between flushes of a streamed
+  response (default 8192).
+"""
+
+import zlib
+
+from flask import request
+
+DEFAULT_MIMETYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+)
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class _GzipEncoder:
+    def __init__(self, level):
+        # wbits 16 + MAX_WBITS writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, brotli, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class Compression:
+    """Negotiated gzip/brotli compression of a Flask app's responses."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.config.setdefault('COMPRESS_STREAM_FLUSH_SIZE', 8192)
+        self.app = app
+        self.brotli = _brotli()
+        app.extensions['compression'] = self
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self._compress_response)
+
+    def _choose_encoding(self):
+        accept = request.accept_encodings
+        candidates = [('gzip', accept['gzip'])]
+        if self.brotli is not None:
+            candidates.append(('br', accept['br']))
+        # Prefer brotli when the client rates both the same
+        encoding, quality = max(candidates, key=lambda c: (c[1], c[0] == 'br'))
+        return encoding if quality > 0 else None
+
+    def _encoder(self, encoding):
+        if encoding == 'br':
+            return _BrotliEncoder(self.brotli, self.app.config['COMPRESS_BR_LEVEL'])
+        return _GzipEncoder(self.app.config['COMPRESS_LEVEL'])
+
+    def _compress_response(self, response):
+        if (response.mimetype not in self.app.config['COMPRESS_MIMETYPES']
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._choose_encoding()
+        if encoding is None or request.method == 'HEAD':
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(
+                response.response, self._encoder(encoding),
+                self.app.config['COMPRESS_STREAM_FLUSH_SIZE'])
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.app.config['COMPRESS_MIN_SIZE']:
+                return response
+            encoder = self._encoder(encoding)
+            response.set_data(encoder.compress(data) + encoder.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the original, so a strong
+        # validator would no longer be valid
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, encoder, flush_size):
+        try:
+            pending = 0
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                output = encoder.compress(chunk)
+                pending += len(chunk)
+                if pending >= flush_size:
+                    output += encoder.flush()
+                    pending = 0
+                if output:
+                    yield output
+            yield encoder.finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
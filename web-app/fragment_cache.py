@@ -0,0 +1,57 @@
+"""
+Fragment caching for Jinja templates.
+
+Wraps part of a template in a cache block so its rendered HTML is stored in
+the app cache and reused across requests:
+
+    {% cache 'featured_projects', 300, data_version('project', 'user') %}
+        ... expensive markup ...
+    {% endcache %}
+
+The first argument names the fragment and the second is its TTL in seconds
+(None for the cache default). Any further arguments become part of the key,
+so passing data versions makes a fragment expire as soon as its data
+changes. If any of them is None the fragment is rendered without caching.
+
+Keys also include the template name and a digest of the block's body, so
+editing the fragment retires old entries even in a shared Redis cache.
+"""
+
+import hashlib
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache key, ttl, *parts %} ... {% endcache %} tag."""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        # Set to a cache.Cache instance to enable the tag
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            parser.fail('cache tag requires a key and a ttl', lineno)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        digest = hashlib.sha1(repr(body).encode()).hexdigest()[:12]
+        prefix = nodes.Const(f'fragment:{parser.name}:{digest}')
+        call = self.call_method('_render', [prefix, args[0], args[1], nodes.List(args[2:])])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, prefix, key, ttl, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None or any(part is None for part in parts):
+            return caller()
+        cache_key = f'{prefix}:{key}'
+        if parts:
+            cache_key += ':' + ':'.join(str(part) for part in parts)
+        return Markup(cache.get_or_set(cache_key, lambda: str(caller()), ttl=ttl))
@@ -0,0 +1,58 @@
+"""
+Gunicorn configuration for TechFlow.
+
+Each worker process runs a pool of threads (gthread), so slow requests such
+as logins do not block the rest of the worker. The app is loaded once in the
+master before forking, and the master checks (and if allowed migrates) the
+database schema before any worker starts, so workers never race to migrate.
+
+Workers can be recycled after GUNICORN_MAX_REQUESTS requests (with jitter so
+they do not all restart at once) to contain slow memory growth. It is off by
+default: a recycled worker drops the keep-alive connections it was serving.
+
+Every setting can be overridden from the environment:
+
+    WEB_CONCURRENCY         worker processes (default: 2 x CPUs + 1)
+    GUNICORN_THREADS        threads per worker (default: 4)
+    GUNICORN_MAX_REQUESTS   requests before a worker is recycled (default: 0, off)
+    GUNICORN_PRELOAD        load the app before forking workers (default: true)
+    GUNICORN_TIMEOUT        seconds before a silent worker is killed (default: 30)
+    PORT                    listen port (default: 5000)
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+accesslog = '-'
+
+
+def on_starting(server):
+    # Runs once in the master, before workers are forked
+    from app import db, ensure_schema
+    from wsgi import app
+    with app.app_context():
+        ensure_schema()
+        db.session.remove()
+    if workers > 1 and app.config['CACHE_URL'].startswith('memory://'):
+        server.log.warning("CACHE_URL is memory://: each of the %d workers caches data "
+                           "separately. Entries keyed on data versions follow writes from any "
+                           "worker, others only those of the worker that made them. Use "
+                           "redis:// to share one cache", workers)
+
+
+def post_fork(server, worker):
+    # With preload_app the master may have opened database connections while
+    # initialising; a forked worker must not share them.
+    from app import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,181 @@
+"""
+Prometheus metrics for TechFlow.
+
+Times every request and exposes, at /metrics in the Prometheus text format:
+
+- techflow_http_requests_total{endpoint,method,status}
+- techflow_http_request_duration_seconds{endpoint} (histogram)
+- techflow_http_requests_in_flight
+- techflow_db_queries_total{endpoint} and techflow_db_time_seconds_total{endpoint}
+- techflow_cache_* counters from the data cache
+
+Each thread accumulates into its own set of counters, so recording a request
+takes no lock; the per-thread values are summed when /metrics is scraped.
+Values are per process: under a multi-process server, scrape each worker or
+aggregate them in Prometheus.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Response, g, request
+
+from sql_instrumentation import current_query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _ThreadMetrics:
+    """Counters written only by the thread that owns them."""
+
+    def __init__(self):
+        self.requests = defaultdict(int)
+        # endpoint -> [per-bucket counts..., +Inf count, sum]
+        self.latency = {}
+        self.db_queries = defaultdict(int)
+        self.db_time = defaultdict(float)
+        self.in_flight = 0
+
+    def observe(self, endpoint, seconds):
+        histogram = self.latency.get(endpoint)
+        if histogram is None:
+            histogram = self.latency[endpoint] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        histogram[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Request timing middleware and /metrics endpoint for a Flask app."""
+
+    def __init__(self, app=None, cache=None):
+        self._local = threading.local()
+        self._all = []
+        self._register_lock = threading.Lock()
+        self.cache = cache
+        if app is not None:
+            self.init_app(app, cache)
+
+    def init_app(self, app, cache=None):
+        app.config.setdefault('METRICS_ENABLED', True)
+        self.cache = cache
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def _thread_metrics(self):
+        metrics = getattr(self._local, 'metrics', None)
+        if metrics is None:
+            metrics = self._local.metrics = _ThreadMetrics()
+            with self._register_lock:
+                self._all.append(metrics)
+        return metrics
+
+    def _start_request(self):
+        g._metrics_start = time.perf_counter()
+        self._thread_metrics().in_flight += 1
+
+    def _record_status(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        metrics = self._thread_metrics()
+        metrics.in_flight -= 1
+        endpoint = request.endpoint or 'unmatched'
+        status = g.pop('_metrics_status', 500)
+        metrics.requests[(endpoint, request.method, status)] += 1
+        metrics.observe(endpoint, time.perf_counter() - start)
+        stats = current_query_stats()
+        if stats is not None:
+            metrics.db_queries[endpoint] += stats.count
+            metrics.db_time[endpoint] += stats.total_time
+
+    def collect(self):
+        """Sum the per-thread counters into one snapshot."""
+        with self._register_lock:
+            threads = list(self._all)
+        requests = defaultdict(int)
+        latency = {}
+        db_queries = defaultdict(int)
+        db_time = defaultdict(float)
+        in_flight = 0
+        for metrics in threads:
+            for key, value in list(metrics.requests.items()):
+                requests[key] += value
+            for endpoint, histogram in list(metrics.latency.items()):
+                total = latency.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+                for index, value in enumerate(histogram):
+                    total[index] += value
+            for key, value in list(metrics.db_queries.items()):
+                db_queries[key] += value
+            for key, value in list(metrics.db_time.items()):
+                db_time[key] += value
+            in_flight += metrics.in_flight
+        return requests, latency, db_queries, db_time, in_flight
+
+    def render(self):
+        """Current metrics in the Prometheus text exposition format."""
+        requests, latency, db_queries, db_time, in_flight = self.collect()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                lines.append(f'{name}{suffix}{labels} {_format_number(value)}')
+
+        metric('techflow_http_requests_total', 'counter', 'HTTP requests handled.', [
+            ('', _labels(endpoint=endpoint, method=method, status=status), count)
+            for (endpoint, method, status), count in sorted(requests.items())
+        ])
+
+        samples = []
+        for endpoint, histogram in sorted(latency.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram):
+                cumulative += count
+                samples.append(('_bucket', _labels(endpoint=endpoint, le=bound), cumulative))
+            samples.append(('_sum', _labels(endpoint=endpoint), histogram[-1]))
+            samples.append(('_count', _labels(endpoint=endpoint), cumulative))
+        metric('techflow_http_request_duration_seconds', 'histogram',
+               'Request latency by endpoint.', samples)
+
+        metric('techflow_http_requests_in_flight', 'gauge',
+               'Requests currently being handled.', [('', '', in_flight)])
+        metric('techflow_db_queries_total', 'counter', 'SQL statements run by endpoint.', [
+            ('', _labels(endpoint=endpoint), count) for endpoint, count in sorted(db_queries.items())
+        ])
+        metric('techflow_db_time_seconds_total', 'counter', 'Time spent in SQL by endpoint.', [
+            ('', _labels(endpoint=endpoint), seconds) for endpoint, seconds in sorted(db_time.items())
+        ])
+
+        if self.cache is not None:
+            # Not stats(): counting entries would scan the Redis keyspace each scrape
+            stats = self.cache.counters()
+            metric('techflow_cache_hits_total', 'counter', 'Data cache hits.', [('', '', stats['hits'])])
+            metric('techflow_cache_misses_total', 'counter', 'Data cache misses.', [('', '', stats['misses'])])
+            metric('techflow_cache_evictions_total', 'counter', 'Data cache evictions.',
+                   [('', '', stats['evictions'])])
+            metric('techflow_cache_hit_ratio', 'gauge', 'Data cache hit ratio.',
+                   [('', '', float(stats['hit_rate']))])
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
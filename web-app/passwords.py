@@ -0,0 +1,78 @@
+"""
+Password hashing for TechFlow.
+
+Hashing and verification are deliberately slow. They run on the request
+thread: Werkzeug hashes with hashlib's pbkdf2_hmac and scrypt, which release
+the GIL, so other requests in the same process keep running meanwhile. A
+semaphore bounds how many hashes a process runs at once, so a burst of
+logins queues for CPU instead of starving every other request of it.
+
+Settings (app.config):
+
+- PASSWORD_HASH_METHOD: Werkzeug method string for new hashes
+  (default ``pbkdf2:sha256:600000``).
+- PASSWORD_HASH_CONCURRENCY: hashes run at once per app process (default:
+  the number of CPUs). ``0`` leaves them unbounded.
+
+Stored hashes whose method differs from PASSWORD_HASH_METHOD are reported by
+``needs_rehash()`` so login can upgrade them transparently. Shorthand
+methods such as ``scrypt`` or ``pbkdf2`` are compared in the fully
+parameterised form Werkzeug stores (``scrypt:32768:8:1``).
+"""
+
+import contextlib
+import os
+import threading
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords, a bounded number at a time."""
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.concurrency = 0
+        self._stored_method = None
+        self._slots = contextlib.nullcontext()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        app.config.setdefault('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 1)
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.set_concurrency(app.config['PASSWORD_HASH_CONCURRENCY'])
+        self._stored_method = None
+        app.extensions['password_hasher'] = self
+
+    def set_concurrency(self, concurrency):
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency else contextlib.nullcontext()
+
+    def hash(self, password):
+        """Hash a password with the configured method."""
+        with self._slots:
+            return generate_password_hash(password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash."""
+        with self._slots:
+            return check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if a stored hash was made with a different method."""
+        return password_hash.split('$', 1)[0] != self.stored_method
+
+    @property
+    def stored_method(self):
+        """The method as Werkzeug records it in a hash, with every parameter.
+
+        Found by hashing a dummy password once, on first use rather than at
+        startup, since a hash at production cost takes a noticeable time.
+        """
+        if self._stored_method is None:
+            self._stored_method = self.hash('').split('$', 1)[0]
+        return self._stored_method
@@ -0,0 +1,124 @@
+"""
+Per-request SQL instrumentation.
+
+Hooks SQLAlchemy's cursor events to record, for every request, how many
+statements ran, how long they took in total and which were slowest.
+
+- Statements slower than SQL_SLOW_QUERY_MS are logged as they finish.
+- When the same statement shape runs SQL_N_PLUS_ONE_THRESHOLD or more times
+  in one request, it is logged as a likely N+1 pattern. Shapes ignore
+  literal values and the length of IN lists.
+- With SQL_DEBUG_HEADERS the totals are added to the response as
+  X-SQL-Query-Count, X-SQL-Time-Ms and X-SQL-Slowest-Ms. Unset, it follows
+  the app's debug flag at request time, so ``app.run(debug=True)`` turns
+  the headers on.
+
+Statements issued outside a request (CLI commands, background writers) are
+not recorded.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement):
+    """Normalise a statement so repeats with different values compare equal."""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return ' '.join(shape.split())
+
+
+class RequestQueryStats:
+    """Statements executed while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.timings = []
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        self.timings.append((duration, statement))
+        self.shapes[statement_shape(statement)] += 1
+
+    def slowest(self, limit=3):
+        return sorted(self.timings, key=lambda timing: timing[0], reverse=True)[:limit]
+
+    def repeated_shapes(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def current_query_stats():
+    """Stats for the current request, or None outside a request."""
+    if not has_request_context():
+        return None
+    return g.get('_sql_stats')
+
+
+class SQLInstrumentation:
+    """Records per-request query counts and timings for a Flask-SQLAlchemy app."""
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('SQL_INSTRUMENTATION', True)
+        app.config.setdefault('SQL_SLOW_QUERY_MS', 100)
+        app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        self.app = app
+        app.extensions['sql_instrumentation'] = self
+        if not app.config['SQL_INSTRUMENTATION']:
+            return
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        g._sql_stats = RequestQueryStats()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_start_time'].pop()
+        if duration * 1000 >= self.app.config['SQL_SLOW_QUERY_MS']:
+            logger.warning(f"Slow query ({duration * 1000:.1f} ms): {statement}")
+        stats = current_query_stats()
+        if stats is not None:
+            stats.record(statement, duration)
+
+    def _finish_request(self, response):
+        stats = current_query_stats()
+        if stats is None:
+            return response
+        threshold = self.app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        for shape, count in stats.repeated_shapes(threshold):
+            logger.warning(f"Possible N+1 in {request.method} {request.path}: "
+                           f"statement ran {count} times: {shape}")
+        debug_headers = self.app.config.get('SQL_DEBUG_HEADERS')
+        if debug_headers is None:
+            debug_headers = self.app.debug
+        if debug_headers:
+            slowest = stats.slowest(1)
+            response.headers['X-SQL-Query-Count'] = str(stats.count)
+            response.headers['X-SQL-Time-Ms'] = f"{stats.total_time * 1000:.2f}"
+            response.headers['X-SQL-Slowest-Ms'] = f"{slowest[0][0] * 1000:.2f}" if slowest else '0.00'
+        return response
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Unit tests for UserActivity retention and archival.
+"""
+
+import glob
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, text
+
+from activity_archive import ActivityArchive
+
+NOW = datetime(2025, 6, 15, 12, 0)
+
+
+class ActivityArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='techflow-archive-')
+        self.addCleanup(shutil.rmtree, self.root)
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(self.root, 'activity.db')}",
+            ACTIVITY_ARCHIVE_DIR=os.path.join(self.root, 'archive'),
+            ACTIVITY_RETENTION_DAYS=30,
+            ACTIVITY_ARCHIVE_BATCH_SIZE=40,
+            ACTIVITY_VACUUM_PAGES=2,
+        )
+        self.db = db = SQLAlchemy(self.app)
+
+        class Activity(db.Model):
+            id = db.Column(db.Integer, primary_key=True)
+            user_id = db.Column(db.Integer, nullable=False)
+            activity_type = db.Column(db.String(50), nullable=False)
+            description = db.Column(db.Text)
+            activity_metadata = db.Column(db.Text)
+            timestamp = db.Column(db.DateTime)
+
+        self.Activity = Activity
+        self.archive = ActivityArchive(self.app, db, Activity)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+        event.listen(db.engine, 'connect',
+                     lambda connection, record: connection.execute('PRAGMA auto_vacuum = INCREMENTAL'))
+        db.create_all()
+
+    def add_days(self, first_day, days, per_day=30):
+        """Activity for users 1 and 2, per_day rows on each day."""
+        rows = []
+        for day in range(days):
+            start = first_day + timedelta(days=day)
+            rows += [{'user_id': 1 + i % 2, 'activity_type': 'login', 'description': 'x' * 200,
+                      'timestamp': start + timedelta(minutes=i)} for i in range(per_day)]
+        self.db.session.execute(self.Activity.__table__.insert(), rows)
+        self.db.session.commit()
+
+    def files(self):
+        pattern = os.path.join(self.app.config['ACTIVITY_ARCHIVE_DIR'], '*', '*', '*')
+        return sorted(os.path.relpath(path, self.app.config['ACTIVITY_ARCHIVE_DIR'])
+                      for path in glob.glob(pattern))
+
+    def test_old_days_move_to_date_partitioned_files(self):
+        self.add_days(datetime(2025, 4, 29), 20)
+        horizon = self.archive.horizon(NOW)
+        self.assertEqual(horizon, datetime(2025, 5, 16))
+        statements = []
+        event.listen(self.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        days = []
+        archived = self.archive.archive(now=NOW, progress=lambda day, rows: days.append((str(day), rows)))
+        self.assertEqual(archived, 17 * 30)
+        self.assertEqual(days[0], ('2025-04-29', 30))
+        self.assertEqual(days[-1], ('2025-05-15', 30))
+        self.assertEqual(self.Activity.query.count(), 3 * 30)
+        self.assertTrue(all(row.timestamp >= horizon for row in self.Activity.query))
+        # 30 rows a day in batches of 40: one DELETE per day
+        self.assertEqual(len([s for s in statements if s.startswith('DELETE')]), 17)
+
+        files = self.files()
+        self.assertEqual(len(files), 17)
+        self.assertTrue(files[0].startswith(os.path.join('2025', '04', '2025-04-29-')))
+        with gzip.open(os.path.join(self.app.config['ACTIVITY_ARCHIVE_DIR'], files[0]), 'rt') as f:
+            first = json.loads(f.readline())
+        self.assertEqual((first['id'], first['user_id'], first['timestamp']), (1, 1, '2025-04-29T00:00:00'))
+
+    def test_month_is_read_back_from_archive_and_table(self):
+        self.add_days(datetime(2025, 4, 29), 20)
+        before = [(row.id, row.timestamp) for row in self.Activity.query.filter(
+            self.Activity.user_id == 2, self.Activity.timestamp >= datetime(2025, 5, 1),
+            self.Activity.timestamp < datetime(2025, 6, 1)).order_by(self.Activity.timestamp)]
+        self.archive.archive(now=NOW)
+
+        archived = self.archive.read_month(2, 2025, 5)
+        self.assertEqual(len(archived), 15 * 15)
+        self.assertTrue(all(record['user_id'] == 2 for record in archived))
+        month = self.archive.activity_for_month(2, 2025, 5)
+        self.assertEqual([(record['id'], record['timestamp']) for record in month], before)
+        self.assertEqual(self.archive.read_month(2, 2025, 7), [])
+
+    def test_rerun_is_idempotent_and_picks_up_late_rows(self):
+        self.add_days(datetime(2025, 5, 10), 3)
+        self.archive.archive(now=NOW)
+        files = self.files()
+        # A row logged for an archived day after the run, reusing a deleted id
+        self.add_days(datetime(2025, 5, 10, 23), 1, per_day=1)
+        self.assertEqual(self.Activity.query.one().id, 1)
+        self.assertEqual(self.archive.archive(now=NOW), 1)
+        self.assertEqual(len(self.files()), len(files) + 1)
+        self.assertEqual(self.archive.archive(now=NOW), 0)
+        self.assertEqual(len(self.archive.read_month(1, 2025, 5)), 3 * 15 + 1)
+
+        # Interrupted before the delete: the same rows are archived again
+        # into the same file and read back once
+        path = os.path.join(self.app.config['ACTIVITY_ARCHIVE_DIR'], files[0])
+        with gzip.open(path, 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        for row in rows:
+            row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        self.db.session.execute(self.Activity.__table__.insert(), rows)
+        self.db.session.commit()
+        self.assertEqual(self.archive.archive(now=NOW), 30)
+        self.assertEqual(len(self.files()), len(files) + 1)
+        self.assertEqual(len(self.archive.read_month(1, 2025, 5)), 3 * 15 + 1)
+
+    def test_incremental_vacuum_returns_freed_pages(self):
+        self.add_days(datetime(2025, 4, 1), 30)
+        page_count = lambda: self.db.session.execute(text('PRAGMA page_count')).scalar()
+        self.db.session.remove()
+        pages = page_count()
+        self.archive.archive(now=NOW)
+        released = self.archive.vacuum()
+        self.assertGreater(released, 0)
+        self.assertEqual(self.db.session.execute(text('PRAGMA freelist_count')).scalar(), 0)
+        self.assertLess(page_count(), pages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pre-aggregated activity rollups.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select
+
+from activity_rollups import ALL_USERS, ActivityRollups, bucket_start
+
+START = datetime(2025, 6, 1)
+TYPES = ('login', 'logout', 'task_update')
+
+
+class ActivityRollupsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='techflow-rollups-')
+        self.addCleanup(shutil.rmtree, self.root)
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.root, 'rollups.db')}"
+        self.db = db = SQLAlchemy(self.app)
+
+        class Activity(db.Model):
+            id = db.Column(db.Integer, primary_key=True)
+            user_id = db.Column(db.Integer, nullable=False)
+            activity_type = db.Column(db.String(50), nullable=False)
+            timestamp = db.Column(db.DateTime)
+
+        class Rollup(db.Model):
+            period = db.Column(db.String(4), primary_key=True)
+            bucket_start = db.Column(db.DateTime, primary_key=True)
+            activity_type = db.Column(db.String(50), primary_key=True)
+            user_id = db.Column(db.Integer, primary_key=True)
+            count = db.Column(db.Integer, nullable=False, default=0)
+
+        self.Activity, self.Rollup = Activity, Rollup
+        self.rollups = ActivityRollups(self.app, db, Activity, Rollup)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+        db.create_all()
+        self.random = random.Random(7)
+
+    def log(self, count, days=10):
+        """Write random activity the way the activity log does: insert and
+        roll up each batch in one transaction."""
+        rows = [{'user_id': self.random.randint(1, 20), 'activity_type': self.random.choice(TYPES),
+                 'timestamp': START + timedelta(seconds=self.random.randrange(days * 86400))}
+                for _ in range(count)]
+        for start in range(0, count, 150):
+            batch = rows[start:start + 150]
+            with self.db.engine.begin() as connection:
+                connection.execute(self.Activity.__table__.insert(), batch)
+                self.rollups.apply(connection, batch)
+
+    def stored(self):
+        rollups = self.Rollup.__table__
+        return Counter({(row.period, row.bucket_start, row.activity_type, row.user_id): row.count
+                        for row in self.db.session.execute(select(rollups))})
+
+    def scanned(self):
+        """The same counts, from a scan of every activity row."""
+        counts = Counter()
+        for row in self.db.session.execute(select(self.Activity.__table__)):
+            day = bucket_start(row.timestamp, 'day')
+            counts['hour', bucket_start(row.timestamp, 'hour'), row.activity_type, ALL_USERS] += 1
+            counts['day', day, row.activity_type, ALL_USERS] += 1
+            counts['day', day, row.activity_type, row.user_id] += 1
+        return counts
+
+    def test_incremental_rollups_match_a_raw_scan(self):
+        self.log(1000)
+        self.log(200)
+        self.assertEqual(self.stored(), self.scanned())
+        self.assertEqual(sum(count for key, count in self.stored().items() if key[0] == 'hour'), 1200)
+
+    def test_backfill_rebuilds_the_same_rollups(self):
+        self.log(1000)
+        incremental = self.stored()
+        self.db.session.execute(self.Rollup.__table__.delete())
+        self.db.session.commit()
+
+        with self.db.engine.begin() as connection:
+            self.assertEqual(self.rollups.backfill(connection), 1000)
+        self.assertEqual(self.stored(), incremental)
+        # Rebuilding again changes nothing
+        with self.db.engine.begin() as connection:
+            self.rollups.backfill(connection)
+        self.assertEqual(self.stored(), incremental)
+
+    def test_backfill_keeps_buckets_before_its_range(self):
+        self.log(1000)
+        before = self.stored()
+        # Rows archived away: their rollups must survive a backfill
+        cutoff = START + timedelta(days=4)
+        self.db.session.execute(self.Activity.__table__.delete().where(self.Activity.timestamp < cutoff))
+        self.db.session.commit()
+        with self.db.engine.begin() as connection:
+            self.rollups.backfill(connection)
+        self.assertEqual(self.stored(), before)
+
+        with self.db.engine.begin() as connection:
+            self.rollups.backfill(connection, since=START + timedelta(days=6), until=START + timedelta(days=8))
+        self.assertEqual(self.stored(), before)
+
+    def test_counts_and_active_users_match_a_raw_scan(self):
+        self.log(1000)
+        rows = self.db.session.execute(select(self.Activity.__table__)).all()
+        start, end = START + timedelta(days=2, hours=5), START + timedelta(days=5)
+
+        series = self.rollups.counts('day', start, end, activity_type='login')
+        self.assertEqual([bucket for bucket, _ in series],
+                         [START + timedelta(days=day) for day in (2, 3, 4)])
+        expected = Counter(bucket_start(row.timestamp, 'day') for row in rows
+                           if row.activity_type == 'login' and START + timedelta(days=2) <= row.timestamp < end)
+        self.assertEqual({bucket: by_type.get('login', 0) for bucket, by_type in series}, expected)
+
+        hourly = dict(self.rollups.counts('hour', START, START + timedelta(days=1)))
+        self.assertEqual(len(hourly), 24)
+        expected = defaultdict(Counter)
+        for row in rows:
+            if row.timestamp < START + timedelta(days=1):
+                expected[bucket_start(row.timestamp, 'hour')][row.activity_type] += 1
+        self.assertEqual({bucket: by_type for bucket, by_type in hourly.items() if by_type}, expected)
+
+        user_series = dict(self.rollups.counts('day', START, START + timedelta(days=10), user_id=3))
+        expected = defaultdict(Counter)
+        for row in rows:
+            if row.user_id == 3:
+                expected[bucket_start(row.timestamp, 'day')][row.activity_type] += 1
+        self.assertEqual({bucket: by_type for bucket, by_type in user_series.items() if by_type}, expected)
+        with self.assertRaises(ValueError):
+            self.rollups.counts('hour', START, START + timedelta(days=1), user_id=3)
+
+        week, users = self.rollups.active_users(START, START + timedelta(days=7))
+        self.assertEqual(users, len({row.user_id for row in rows if row.timestamp < START + timedelta(days=7)}))
+        self.assertEqual(dict(week)[START + timedelta(days=1)],
+                         len({row.user_id for row in rows if bucket_start(row.timestamp, 'day') == START + timedelta(days=1)}))
+
+        empty, users = self.rollups.active_users(START + timedelta(days=20), START + timedelta(days=22))
+        self.assertEqual((empty, users), ([(START + timedelta(days=20), 0), (START + timedelta(days=21), 0)], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
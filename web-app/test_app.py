@@ -0,0 +1,1328 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the TechFlow Flask application.
+
+These run against a throwaway SQLite database through Flask's test client,
+unlike the Selenium suite which needs a live server.
+"""
+
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Response, template_rendered
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from werkzeug.security import generate_password_hash
+
+from activity_log import ActivityLog
+from app import (create_app, db, cache, activity_log, User, Project, TeamMember, Task,
+                 UserActivity, ActivityRollup, PlatformCounter, SchemaMigration, ImportJob, MIGRATIONS, SCHEMA_VERSION,
+                 migrate_db, ensure_schema, schema_version, reconcile_counters, load_dashboard,
+                 bulk_import, touch_data_versions)
+
+_tmpdir = tempfile.mkdtemp(prefix='techflow-test-')
+app = create_app({
+    'TESTING': True,
+    'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(_tmpdir, 'test.db')}",
+    'DATABASE_PROFILE': 'test',
+    # Fast password hashing keeps the suite quick
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'JINJA_CACHE_DIR': os.path.join(_tmpdir, 'jinja_cache'),
+    'ACTIVITY_ARCHIVE_DIR': os.path.join(_tmpdir, 'activity_archive'),
+})
+
+
+class TechFlowTestCase(unittest.TestCase):
+    """Base test case with a fresh schema and a logged-in test client."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        cache.clear()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        activity_log.flush()
+        db.session.remove()
+        self.ctx.pop()
+
+    def make_user(self, username, **kwargs):
+        user = User(username=username, email=f'{username}@example.com',
+                    password_hash='x', **kwargs)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def login_as(self, user):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['user'] = user.username
+            sess['user_role'] = user.role
+
+    @contextmanager
+    def count_queries(self):
+        """Count SELECT/INSERT/... statements issued while the block runs."""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class EagerLoadingTest(TechFlowTestCase):
+    """Dashboard and projects pages must not issue one query per row."""
+
+    def populate(self, user, count):
+        for i in range(count):
+            owner = self.make_user(f'owner{user.id}_{i}')
+            project = Project(name=f'Team {i}', owner_id=owner.id, visibility='public')
+            db.session.add(project)
+            db.session.flush()
+            db.session.add(TeamMember(user_id=user.id, project_id=project.id))
+            db.session.add(Task(title=f'Task {i}', project_id=project.id,
+                                assignee_id=user.id, status='todo'))
+        db.session.commit()
+        # Start the request with an empty identity map so lazy loads show up
+        db.session.expunge_all()
+
+    def query_count(self, path, size):
+        user = self.make_user(f'viewer{size}')
+        self.login_as(user)
+        self.populate(user, size)
+        with self.count_queries() as statements:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_dashboard_query_count_is_constant(self):
+        small = self.query_count('/dashboard', 1)
+        large = self.query_count('/dashboard', 5)
+        self.assertEqual(small, large)
+
+    def test_projects_query_count_is_constant(self):
+        small = self.query_count('/projects', 2)
+        large = self.query_count('/projects', 12)
+        self.assertEqual(small, large)
+
+
+class SchemaMigrationTest(TechFlowTestCase):
+    """Existing databases are upgraded in place without losing rows."""
+
+    def index_names(self):
+        rows = db.session.execute(db.text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'"))
+        return {row.name for row in rows}
+
+    def test_migrate_adds_indexes_to_legacy_database(self):
+        user = self.make_user('legacy')
+        db.session.add(UserActivity(user_id=user.id, activity_type='login'))
+        db.session.commit()
+        # Simulate a database created before the indexes existed
+        for name in self.index_names():
+            db.session.execute(db.text(f'DROP INDEX {name}'))
+        db.session.commit()
+
+        migrate_db()
+
+        self.assertIn('ix_user_activity_user_id_timestamp', self.index_names())
+        self.assertIn('ix_task_assignee_id_status_due_date', self.index_names())
+        self.assertEqual(UserActivity.query.count(), 1)
+        self.assertEqual(SchemaMigration.query.count(), len(MIGRATIONS))
+
+        migrate_db()
+        self.assertEqual(SchemaMigration.query.count(), len(MIGRATIONS))
+
+    def test_dashboard_activity_query_uses_index(self):
+        plan = db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT * FROM user_activity '
+            'WHERE user_id = 1 ORDER BY timestamp DESC LIMIT 10')).all()
+        detail = ' '.join(row[-1] for row in plan)
+        self.assertIn('ix_user_activity_user_id_timestamp', detail)
+        self.assertNotIn('TEMP B-TREE', detail)
+
+
+class StartupTest(TechFlowTestCase):
+    """Booting the app does no schema work unless the schema is behind."""
+
+    def test_import_and_create_app_do_not_touch_the_database(self):
+        db_path = os.path.join(tempfile.mkdtemp(prefix='techflow-test-'), 'cold.db')
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+        subprocess.run([sys.executable, '-c', 'import app; app.create_app()'], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+        self.assertFalse(os.path.exists(db_path))
+
+    def test_current_schema_is_checked_without_schema_work(self):
+        migrate_db()
+        with self.count_queries() as statements:
+            ensure_schema()
+        self.assertLessEqual(len(statements), 2)
+        self.assertFalse(any(s.lstrip().upper().startswith(('CREATE', 'INSERT'))
+                             for s in statements))
+
+    def test_fresh_database_is_initialised(self):
+        db.drop_all()
+        self.assertIsNone(schema_version())
+
+        ensure_schema()
+
+        self.assertEqual(schema_version(), SCHEMA_VERSION)
+        self.assertEqual(User.query.filter_by(username='admin').count(), 1)
+
+    def test_outdated_schema_is_migrated_or_refused(self):
+        migrate_db()
+        # Back to a version 5 database: no activity rollups or timestamp index
+        for version in (6, 7):
+            db.session.delete(db.session.get(SchemaMigration, version))
+        db.session.commit()
+        ActivityRollup.__table__.drop(db.engine)
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP INDEX ix_user_activity_timestamp')
+
+        app.config['SCHEMA_AUTO_MIGRATE'] = False
+        try:
+            with self.assertRaises(RuntimeError):
+                ensure_schema()
+        finally:
+            app.config['SCHEMA_AUTO_MIGRATE'] = True
+        ensure_schema()
+        self.assertEqual(schema_version(), SCHEMA_VERSION)
+        inspector = db.inspect(db.engine)
+        self.assertIn('activity_rollup', inspector.get_table_names())
+        self.assertIn('ix_user_activity_timestamp',
+                      [index['name'] for index in inspector.get_indexes('user_activity')])
+
+
+class TemplateCacheTest(unittest.TestCase):
+    """Precompiled templates spare a fresh worker from compiling on first use."""
+
+    FIRST_REQUEST = """
+import json, sys
+import jinja2
+
+compiled, loaded, cached = [], [], []
+original_compile, original_load = jinja2.Environment.compile, jinja2.Environment._load_template
+original_load_bytecode = jinja2.FileSystemBytecodeCache.load_bytecode
+
+def compile(self, *args, **kwargs):
+    compiled.append(args[1] if len(args) > 1 else kwargs.get('name'))
+    return original_compile(self, *args, **kwargs)
+
+def load_template(self, name, globals):
+    loaded.append(name)
+    return original_load(self, name, globals)
+
+def load_bytecode(self, bucket):
+    original_load_bytecode(self, bucket)
+    if bucket.code is not None:
+        cached.append(bucket.key)
+
+jinja2.Environment.compile, jinja2.Environment._load_template = compile, load_template
+jinja2.FileSystemBytecodeCache.load_bytecode = load_bytecode
+
+import app as techflow
+app = techflow.create_app({'JINJA_CACHE_DIR': sys.argv[1]})
+response = app.test_client().get('/login')
+print(json.dumps({'status': response.status_code, 'compiled': compiled,
+                  'loaded': sorted(set(loaded)), 'cached': len(cached)}))
+"""
+
+    def first_request(self, cache_dir):
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(_tmpdir, 'cold.db')}")
+        output = subprocess.run([sys.executable, '-c', self.FIRST_REQUEST, cache_dir], check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(result['status'], 200)
+        return result
+
+    def test_warm_start_loads_precompiled_templates(self):
+        result = app.test_cli_runner().invoke(args=['compile-templates'])
+        self.assertIn(f"Compiled {len(app.jinja_env.list_templates())} templates", result.output)
+
+        cold = self.first_request(tempfile.mkdtemp(prefix='techflow-test-'))
+        warm = self.first_request(app.config['JINJA_CACHE_DIR'])
+
+        self.assertEqual(cold['loaded'], ['base.html', 'login.html'])
+        self.assertEqual(sorted(cold['compiled']), cold['loaded'])
+        self.assertEqual(cold['cached'], 0)
+        # The same templates, every one read from the bytecode cache
+        self.assertEqual(warm['loaded'], cold['loaded'])
+        self.assertEqual(warm['compiled'], [])
+        self.assertEqual(warm['cached'], len(warm['loaded']))
+
+
+class PlatformCounterTest(TechFlowTestCase):
+    """Landing-page totals are maintained by writes, not COUNT(*) on reads."""
+
+    def setUp(self):
+        super().setUp()
+        reconcile_counters()
+        db.session.commit()
+
+    def stats(self):
+        return self.client.get('/api/stats').get_json()
+
+    def test_writes_keep_counters_in_sync(self):
+        owner = self.make_user('counted')
+        project = Project(name='Counted', owner_id=owner.id)
+        db.session.add(project)
+        db.session.flush()
+        task = Task(title='Ship it', project_id=project.id)
+        db.session.add(task)
+        db.session.commit()
+        self.assertEqual(self.stats(), {
+            'total_users': 1, 'total_projects': 1, 'active_projects': 1,
+            'total_tasks': 1, 'completed_tasks': 0,
+        })
+
+        task.status = 'done'
+        project.status = 'archived'
+        db.session.commit()
+        stats = self.stats()
+        self.assertEqual(stats['completed_tasks'], 1)
+        self.assertEqual(stats['active_projects'], 0)
+
+        db.session.delete(task)
+        db.session.commit()
+        stats = self.stats()
+        self.assertEqual(stats['total_tasks'], 0)
+        self.assertEqual(stats['completed_tasks'], 0)
+
+    def test_stats_read_a_single_query(self):
+        with self.count_queries() as statements:
+            self.client.get('/api/stats')
+        # The counters in one query, plus the data-version lookup for the ETag
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(len([s for s in statements if 'FROM platform_counter' in s]), 1)
+        self.assertEqual(len([s for s in statements if 'FROM data_version' in s]), 1)
+
+    def test_reconcile_repairs_drift(self):
+        self.make_user('drifted')
+        db.session.get(PlatformCounter, 'total_users').value = 42
+        db.session.commit()
+        self.assertEqual(self.stats()['total_users'], 42)
+
+        result = app.test_cli_runner().invoke(args=['reconcile-counters'])
+        self.assertIn('total_users: 1', result.output)
+        self.assertEqual(self.stats()['total_users'], 1)
+
+
+class CacheInvalidationTest(TechFlowTestCase):
+    """Cached pages and stats never outlive a committed write."""
+
+    def test_new_project_invalidates_cached_data(self):
+        owner = self.make_user('author')
+        self.login_as(owner)
+        self.assertNotIn(b'Fresh Public Project', self.client.get('/').data)
+        self.assertEqual(self.client.get('/api/stats').get_json()['total_projects'], 0)
+
+        self.client.post('/projects/new', data={'name': 'Fresh Public Project', 'description': 'New',
+                                                'visibility': 'public'})
+
+        self.assertIn(b'Fresh Public Project', self.client.get('/').data)
+        self.assertIn(b'Fresh Public Project', self.client.get('/projects').data)
+        self.assertEqual(self.client.get('/api/stats').get_json()['total_projects'], 1)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        reconcile_counters()
+        db.session.commit()
+        self.client.get('/api/stats')
+        with self.count_queries() as statements:
+            self.client.get('/api/stats')
+        # Only the data-version lookup; the totals come from the cache
+        self.assertEqual(len(statements), 1)
+        self.assertIn('FROM data_version', statements[0])
+        self.assertGreaterEqual(self.client.get('/api/cache/stats').get_json()['hits'], 1)
+
+
+class ConditionalRequestTest(TechFlowTestCase):
+    """Unchanged pages and API results are answered with 304 Not Modified."""
+
+    def setUp(self):
+        super().setUp()
+        migrate_db()
+        self.user = self.make_user('viewer')
+        self.login_as(self.user)
+
+    @contextmanager
+    def rendered_templates(self):
+        templates = []
+
+        def record(sender, template, context, **extra):
+            templates.append(template.name)
+
+        template_rendered.connect(record, app)
+        try:
+            yield templates
+        finally:
+            template_rendered.disconnect(record, app)
+
+    def test_matching_etag_skips_rendering(self):
+        first = self.client.get('/projects')
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+        self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+
+        with self.rendered_templates() as templates:
+            second = self.client.get('/projects', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(templates, [])
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/projects').headers['ETag']
+        db.session.add(Project(name='New', owner_id=self.user.id, visibility='public'))
+        db.session.commit()
+
+        response = self.client.get('/api/projects', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_json()['items'][0]['name'], 'New')
+
+    def test_write_in_another_process_changes_the_etag_and_body(self):
+        reconcile_counters()
+        db.session.commit()
+        first = self.client.get('/api/stats')
+        self.assertEqual(first.get_json()['total_users'], 1)
+        # Another worker registers a user: the shared tables and data version
+        # move on, but nothing in this process's cache is invalidated
+        with db.engine.begin() as connection:
+            connection.execute(User.__table__.insert().values(
+                username='elsewhere', email='elsewhere@example.com', password_hash='x'))
+            connection.execute(PlatformCounter.__table__.update()
+                               .where(PlatformCounter.name == 'total_users')
+                               .values(value=PlatformCounter.value + 1))
+            touch_data_versions(connection, ['user'])
+        response = self.client.get('/api/stats', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(response.get_json()['total_users'], 2)
+
+    def test_logins_leave_shared_etags_and_cache_alone(self):
+        self.user.password_hash = generate_password_hash('secret-pass', method='pbkdf2:sha256:500')
+        db.session.commit()
+        reconcile_counters()
+        db.session.commit()
+        home = self.client.get('/').headers['ETag']
+        stats = self.client.get('/api/stats').headers['ETag']
+
+        # A login with a rehash: last_login, last_active and password_hash change
+        response = self.client.post('/login', data={'username': 'viewer', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 302)
+        db.session.expire_all()
+        self.assertIsNotNone(db.session.get(User, self.user.id).last_login)
+        self.client.get('/dashboard')  # shows the welcome flash
+        self.assertEqual(self.client.get('/api/stats', headers={'If-None-Match': stats}).status_code, 304)
+        self.assertEqual(self.client.get('/', headers={'If-None-Match': home}).status_code, 304)
+        # The cached totals survive too: only the data-version lookup runs
+        with self.count_queries() as statements:
+            self.client.get('/api/stats')
+        self.assertEqual(len(statements), 1)
+
+        self.user.full_name = 'Renamed Viewer'
+        db.session.commit()
+        self.assertEqual(self.client.get('/api/stats', headers={'If-None-Match': stats}).status_code, 200)
+
+    def test_etag_depends_on_user_and_query(self):
+        etag = self.client.get('/api/projects').headers['ETag']
+        self.assertNotEqual(self.client.get('/api/projects?status=active').headers['ETag'], etag)
+        self.login_as(self.make_user('other'))
+        self.assertEqual(self.client.get('/api/projects', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_stats_are_public_and_validated_by_etag_only(self):
+        first = self.client.get('/api/stats')
+        self.assertEqual(first.headers['Cache-Control'], 'public, max-age=30')
+        self.assertNotIn('Cookie', first.headers.get('Vary', ''))
+        self.assertEqual(self.client.get('/api/stats', headers={
+            'If-None-Match': first.headers['ETag']}).status_code, 304)
+
+        # A second write within the same second as the one the client saw
+        db.session.add(Project(name='Same second', owner_id=self.user.id))
+        db.session.commit()
+        response = self.client.get('/api/stats', headers={
+            'If-Modified-Since': first.headers['Last-Modified'], 'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['total_projects'], 1)
+        response = self.client.get('/api/stats', headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_pending_flash_messages_are_rendered(self):
+        etag = self.client.get('/projects').headers['ETag']
+        with self.client.session_transaction() as sess:
+            sess['_flashes'] = [('success', 'Saved')]
+        response = self.client.get('/projects', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Saved', response.data)
+
+
+class FragmentCacheTest(TechFlowTestCase):
+    """Shared page fragments are rendered once per data version."""
+
+    def setUp(self):
+        super().setUp()
+        migrate_db()
+        self.owner = self.make_user('owner')
+        db.session.add(Project(name='Shared Grid', description='Public project',
+                               owner_id=self.owner.id, visibility='public'))
+        db.session.commit()
+
+    def test_featured_grid_is_reused_until_projects_change(self):
+        self.assertIn(b'Shared Grid', self.client.get('/').data)
+        # A write that bypasses the ORM leaves the data version alone, so the
+        # cached fragment is still served
+        db.session.execute(db.text("UPDATE project SET name = 'Renamed'"))
+        db.session.commit()
+        cache.invalidate('project')
+        self.assertIn(b'Shared Grid', self.client.get('/').data)
+
+        project = Project.query.one()
+        project.name = 'Renamed Again'
+        db.session.commit()
+        self.assertIn(b'Renamed Again', self.client.get('/').data)
+
+    def test_public_list_fragment_on_projects_page(self):
+        self.login_as(self.owner)
+        self.assertIn(b'Shared Grid', self.client.get('/projects').data)
+        keys = [key for key in cache.backend._entries if key.startswith('fragment:projects.html')]
+        self.assertEqual(len(keys), 1)
+
+
+class SearchTest(TechFlowTestCase):
+    """Full-text search ranks, filters by visibility and stays in sync with writes."""
+
+    def setUp(self):
+        super().setUp()
+        migrate_db()
+        self.owner = self.make_user('owner')
+        self.viewer = self.make_user('viewer')
+        self.pipeline = Project(name='Data Pipeline', description='Streaming ingestion service',
+                                owner_id=self.owner.id, visibility='public')
+        self.secret = Project(name='Secret Pipeline', description='Internal tooling',
+                              owner_id=self.owner.id, visibility='private')
+        self.docs = Project(name='Docs', description='Notes about the pipeline rollout',
+                            owner_id=self.owner.id, visibility='public')
+        db.session.add_all([self.pipeline, self.secret, self.docs])
+        db.session.flush()
+        db.session.add(Task(title='Fix pipeline backfill', description='Reprocess March data',
+                            project_id=self.secret.id))
+        db.session.commit()
+
+    def search(self, q, **params):
+        response = self.client.get('/api/search', query_string={'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_prefix_matches_are_ranked_title_first(self):
+        items = self.search('pipe')['items']
+        self.assertEqual([item['title'] for item in items], ['Data Pipeline', 'Docs'])
+        self.assertIn('<mark>pipeline</mark>', items[1]['snippet_html'])
+
+    def test_private_projects_and_their_tasks_need_access(self):
+        self.assertNotIn('Secret Pipeline', [i['title'] for i in self.search('pipeline')['items']])
+        self.login_as(self.owner)
+        items = self.search('pipeline')['items']
+        self.assertIn('Secret Pipeline', [item['title'] for item in items])
+        task = next(item for item in items if item['type'] == 'task')
+        self.assertEqual(task['project_name'], 'Secret Pipeline')
+        self.assertEqual([i['type'] for i in self.search('pipeline', type='task')['items']], ['task'])
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        self.pipeline.name = 'Event Bus'
+        db.session.commit()
+        self.assertEqual([i['title'] for i in self.search('event')['items']], ['Event Bus'])
+        self.assertEqual([i['title'] for i in self.search('data')['items']], [])
+
+        db.session.delete(self.docs)
+        db.session.execute(Project.__table__.insert(), [
+            {'name': 'Bulk Rollout', 'owner_id': self.owner.id, 'visibility': 'public'}])
+        db.session.commit()
+        self.assertEqual([i['title'] for i in self.search('rollout')['items']], ['Bulk Rollout'])
+
+    def test_results_are_paged_with_a_cursor(self):
+        db.session.add_all(Project(name=f'Search Target {i}', owner_id=self.owner.id,
+                                   visibility='public') for i in range(5))
+        db.session.commit()
+        first = self.search('target', per_page=3)
+        second = self.search('target', per_page=3, cursor=first['next_cursor'])
+        titles = [i['title'] for i in first['items'] + second['items']]
+        self.assertEqual(sorted(titles), [f'Search Target {i}' for i in range(5)])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_query_syntax_is_neutralised(self):
+        self.assertEqual(self.search('"pipe* (')['items'][0]['title'], 'Data Pipeline')
+        self.assertEqual(self.search('')['items'], [])
+        self.assertEqual(self.client.get('/api/search?q=x&cursor=bogus').status_code, 400)
+
+    def test_search_page_renders_highlighted_results(self):
+        response = self.client.get('/search?q=rollout')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<mark>rollout</mark>', response.data)
+        self.assertIn(b'No results', self.client.get('/search?q=zzzz').data)
+
+
+class ActivityLogTest(TechFlowTestCase):
+    """Activity events are written off the request path in batches."""
+
+    def test_login_and_logout_events_are_written_on_flush(self):
+        user = self.make_user('writer')
+        user.password_hash = generate_password_hash('secret-pass', method='pbkdf2:sha256:1000')
+        db.session.commit()
+
+        self.client.post('/login', data={'username': 'writer', 'password': 'secret-pass'})
+        self.client.get('/logout')
+        activity_log.flush()
+
+        types = [a.activity_type for a in UserActivity.query.order_by(UserActivity.id)]
+        self.assertEqual(types, ['login', 'logout'])
+
+    def test_events_are_inserted_in_batches(self):
+        user = self.make_user('batched')
+        with self.count_queries() as statements:
+            for i in range(50):
+                activity_log.record(user.id, 'ping', f'Event {i}')
+            activity_log.flush()
+        inserts = [s for s in statements if s.startswith('INSERT INTO user_activity')]
+        self.assertLess(len(inserts), 5)
+        self.assertEqual(UserActivity.query.count(), 50)
+
+    def test_full_queue_falls_back_to_synchronous_write(self):
+        user = self.make_user('overflow')
+        log = ActivityLog(app, db, UserActivity)
+        log._queue = queue.Queue(maxsize=1)
+        log._ensure_started = lambda: None  # keep the writer thread from draining
+        log.record(user.id, 'queued')
+        log.record(user.id, 'overflowed')
+        self.assertEqual([a.activity_type for a in UserActivity.query], ['overflowed'])
+        log.flush()
+        self.assertEqual(UserActivity.query.count(), 2)
+
+    def failing_log(self, failures):
+        """A synchronous ActivityLog whose first ``failures`` writes fail and roll back."""
+        log = ActivityLog(app, db, UserActivity)
+        attempts = []
+
+        def on_write(connection, rows):
+            attempts.append(len(rows))
+            if len(attempts) <= failures:
+                raise OperationalError('INSERT', {}, sqlite3.OperationalError('database is locked'))
+        log.on_write = on_write
+        return log, attempts
+
+    def test_failed_flush_is_retried(self):
+        user = self.make_user('retried')
+        log, attempts = self.failing_log(failures=2)
+        app.config.update(ACTIVITY_LOG_MODE='sync', ACTIVITY_RETRY_DELAY=0.01)
+        try:
+            with self.assertLogs('activity_log', 'WARNING'):
+                log.record(user.id, 'login')
+        finally:
+            app.config.update(ACTIVITY_LOG_MODE='async', ACTIVITY_RETRY_DELAY=0.2)
+        self.assertEqual(attempts, [1, 1, 1])
+        self.assertEqual([a.activity_type for a in UserActivity.query], ['login'])
+
+    def test_batch_is_given_up_after_retries(self):
+        user = self.make_user('unlucky')
+        log, attempts = self.failing_log(failures=100)
+        app.config.update(ACTIVITY_WRITE_RETRIES=2, ACTIVITY_RETRY_DELAY=0.01)
+        try:
+            log._queue.put(dict(user_id=user.id, activity_type='lost', description=None,
+                                activity_metadata=None, timestamp=datetime.utcnow()))
+            with self.assertLogs('activity_log', 'ERROR') as logs:
+                log.flush()
+        finally:
+            app.config.update(ACTIVITY_WRITE_RETRIES=5, ACTIVITY_RETRY_DELAY=0.2)
+        self.assertEqual(len(attempts), 3)
+        self.assertIn('after 3 attempts', logs.output[-1])
+        self.assertEqual(UserActivity.query.count(), 0)
+
+
+class ActivityRetentionTest(TechFlowTestCase):
+    """Old activity is archived but still readable through the API."""
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(app.config['ACTIVITY_ARCHIVE_DIR'], ignore_errors=True)
+        self.user = self.make_user('veteran')
+        self.login_as(self.user)
+        old = datetime.utcnow() - timedelta(days=app.config['ACTIVITY_RETENTION_DAYS'] + 40)
+        self.month = f"{old:%Y-%m}"
+        db.session.add_all([
+            UserActivity(user_id=self.user.id, activity_type='login', timestamp=old),
+            UserActivity(user_id=self.user.id, activity_type='logout', timestamp=old + timedelta(hours=1)),
+            UserActivity(user_id=self.user.id, activity_type='login'),
+        ])
+        db.session.commit()
+
+    def test_archived_month_is_served_from_the_archive(self):
+        before = self.client.get(f'/api/user/activity?month={self.month}').get_json()['items']
+        self.assertEqual([item['activity_type'] for item in before], ['login', 'logout'])
+
+        result = app.test_cli_runner().invoke(args=['archive-activity'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Archived 2 rows', result.output)
+        self.assertEqual(UserActivity.query.count(), 1)
+
+        after = self.client.get(f'/api/user/activity?month={self.month}').get_json()['items']
+        self.assertEqual(after, before)
+        current = self.client.get('/api/user/activity').get_json()['items']
+        self.assertEqual([item['activity_type'] for item in current], ['login'])
+
+    def test_other_users_activity_needs_admin(self):
+        other = self.make_user('curious')
+        self.login_as(other)
+        self.assertEqual(self.client.get(f'/api/user/activity?user_id={self.user.id}').status_code, 403)
+        self.assertEqual(self.client.get('/api/user/activity?month=March').status_code, 400)
+        self.login_as(self.make_user('root', role='admin'))
+        items = self.client.get(f'/api/user/activity?user_id={self.user.id}&month={self.month}').get_json()['items']
+        self.assertEqual(len(items), 2)
+
+
+class ActivityAnalyticsTest(TechFlowTestCase):
+    """Activity analytics are served from rollups kept in step with every write."""
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(app.config['ACTIVITY_ARCHIVE_DIR'], ignore_errors=True)
+        self.user = self.make_user('counted')
+        self.admin = self.make_user('root', role='admin')
+        self.today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    def rollup_total(self, period='day', user_id=0):
+        return db.session.scalar(db.select(db.func.sum(ActivityRollup.count)).where(
+            ActivityRollup.period == period, ActivityRollup.user_id == user_id))
+
+    def test_logged_events_are_counted_per_day_and_type(self):
+        for activity_type in ('login', 'login', 'logout'):
+            activity_log.record(self.user.id, activity_type)
+        activity_log.record(self.admin.id, 'login')
+        activity_log.flush()
+        self.login_as(self.admin)
+
+        with self.count_queries() as statements:
+            data = self.client.get('/api/analytics/activity?type=login').get_json()
+        self.assertFalse([s for s in statements if 'user_activity' in s])
+        self.assertEqual(len(data['items']), 7)
+        self.assertEqual(data['items'][-1], {'start': self.today.isoformat(), 'count': 3,
+                                             'by_type': {'login': 3}})
+        self.assertEqual(data['total'], 3)
+
+        hourly = self.client.get('/api/analytics/activity?period=hour').get_json()
+        self.assertEqual(len(hourly['items']), 24)
+        self.assertEqual(hourly['items'][-1]['by_type'], {'login': 3, 'logout': 1})
+        mine = self.client.get(f'/api/analytics/activity?user_id={self.user.id}').get_json()
+        self.assertEqual(mine['items'][-1]['by_type'], {'login': 2, 'logout': 1})
+
+        users = self.client.get('/api/analytics/activity/users').get_json()
+        self.assertEqual(users['active_users'], 2)
+        self.assertEqual(users['items'][-1], {'start': self.today.isoformat(), 'active_users': 2})
+
+    def test_rollups_keep_archived_history(self):
+        old = self.today - timedelta(days=app.config['ACTIVITY_RETENTION_DAYS'] + 3)
+        db.session.add_all([UserActivity(user_id=self.user.id, activity_type='login', timestamp=old),
+                            UserActivity(user_id=self.user.id, activity_type='login')])
+        db.session.commit()
+        self.assertEqual(self.rollup_total(), 2)
+        result = app.test_cli_runner().invoke(args=['archive-activity'])
+        self.assertIn('Archived 1 rows', result.output)
+
+        result = app.test_cli_runner().invoke(args=['backfill-activity-rollups'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Rolled up 1 activity events', result.output)
+        self.assertEqual(self.rollup_total(), 2)
+        self.assertEqual(self.rollup_total('hour'), 2)
+        self.assertEqual(self.rollup_total(user_id=self.user.id), 2)
+
+        self.login_as(self.user)
+        query = f'start={old:%Y-%m-%d}&end={old + timedelta(days=1):%Y-%m-%d}'
+        data = self.client.get(f'/api/analytics/activity?{query}').get_json()
+        self.assertEqual([item['count'] for item in data['items']], [1])
+
+    def test_access_and_argument_checks(self):
+        self.assertEqual(self.client.get('/api/analytics/activity').status_code, 401)
+        self.login_as(self.user)
+        self.assertEqual(self.client.get('/api/analytics/activity').get_json()['user_id'], self.user.id)
+        self.assertEqual(self.client.get(f'/api/analytics/activity?user_id={self.admin.id}').status_code, 403)
+        self.assertEqual(self.client.get('/api/analytics/activity/users').status_code, 403)
+        for query in ('period=week', 'start=yesterday', 'period=hour', 'start=2025-06-02&end=2025-06-01',
+                      'period=hour&start=2024-01-01&end=2025-01-01'):
+            self.assertEqual(self.client.get(f'/api/analytics/activity?{query}').status_code, 400, query)
+
+
+class PasswordRehashTest(TechFlowTestCase):
+    """Logging in upgrades hashes made with outdated parameters."""
+
+    def test_login_rehashes_outdated_hash(self):
+        user = self.make_user('legacy-hash')
+        user.password_hash = generate_password_hash('secret-pass', method='pbkdf2:sha256:500')
+        db.session.commit()
+
+        response = self.client.post('/login', data={'username': 'legacy-hash',
+                                                    'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 302)
+        db.session.expire_all()
+        user = User.query.filter_by(username='legacy-hash').one()
+        self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:1000$'))
+        upgraded = user.password_hash
+
+        self.client.get('/logout')
+        response = self.client.post('/login', data={'username': 'legacy-hash',
+                                                    'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 302)
+        db.session.expire_all()
+        self.assertEqual(User.query.filter_by(username='legacy-hash').one().password_hash, upgraded)
+
+
+class SQLiteProfileTest(TechFlowTestCase):
+    """Connection pragmas let readers and writers run side by side."""
+
+    def test_profile_pragmas_are_applied(self):
+        pragma = lambda name: db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+        self.assertEqual(pragma('journal_mode'), 'wal')
+        self.assertEqual(pragma('busy_timeout'), 10000)
+        self.assertEqual(pragma('synchronous'), 0)
+
+    def test_parallel_readers_and_writers_do_not_hit_lock_errors(self):
+        owner = self.make_user('busy')
+        reconcile_counters()
+        db.session.commit()
+        errors = []
+
+        def writer(index):
+            with app.app_context():
+                try:
+                    for i in range(25):
+                        db.session.add(Project(name=f'P{index}-{i}', owner_id=owner.id))
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        def reader():
+            client = app.test_client()
+            try:
+                for _ in range(25):
+                    self.assertEqual(client.get('/api/stats').status_code, 200)
+                    self.assertEqual(client.get('/').status_code, 200)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Project.query.count(), 100)
+        self.assertEqual(self.client.get('/api/stats').get_json()['total_projects'], 100)
+
+
+class ProjectsPaginationTest(TechFlowTestCase):
+    """The projects page is keyset-paginated per section."""
+
+    def test_load_more_walks_every_own_project_once(self):
+        owner = self.make_user('prolific')
+        self.login_as(owner)
+        for i in range(25):
+            db.session.add(Project(name=f'Own project {i:02d}', owner_id=owner.id))
+        db.session.commit()
+
+        seen = []
+        path = '/projects?per_page=10'
+        while path:
+            html = self.client.get(path).get_data(as_text=True)
+            seen += re.findall(r'Own project \d\d', html)
+            self.assertIn('<div class="stats-number">25</div>', html)
+            match = re.search(r'href="([^"]+)"[^>]*id="own-load-more"', html)
+            path = match.group(1).replace('&amp;', '&') if match else None
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(sorted(seen), sorted(set(seen)))
+
+    def test_page_size_is_capped(self):
+        owner = self.make_user('greedy')
+        self.login_as(owner)
+        for i in range(60):
+            db.session.add(Project(name=f'Own project {i:02d}', owner_id=owner.id))
+        db.session.commit()
+        html = self.client.get('/projects?per_page=1000').get_data(as_text=True)
+        self.assertEqual(len(re.findall(r'Own project \d\d', html)), 50)
+
+
+class DataAPITest(TechFlowTestCase):
+    """/api/projects and /api/tasks page, filter, project and stream."""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self.make_user('api-owner')
+        self.other = self.make_user('api-other')
+        for i in range(7):
+            db.session.add(Project(name=f'Public {i}', owner_id=self.other.id,
+                                   visibility='public', status='active' if i % 2 else 'archived'))
+        self.private = Project(name='Secret', owner_id=self.other.id, visibility='private')
+        self.mine = Project(name='Mine', owner_id=self.owner.id, visibility='private')
+        db.session.add_all([self.private, self.mine])
+        db.session.flush()
+        db.session.add_all([
+            Task(title='Todo', project_id=self.mine.id, assignee_id=self.owner.id),
+            Task(title='Done', project_id=self.mine.id, assignee_id=self.owner.id, status='done'),
+            Task(title='Hidden', project_id=self.private.id),
+        ])
+        db.session.commit()
+
+    def test_projects_are_paged_with_cursor_and_visibility(self):
+        names, path = [], '/api/projects?per_page=3&fields=name'
+        while path:
+            page = self.client.get(path).get_json()
+            self.assertTrue(all(set(item) == {'name'} for item in page['items']))
+            names += [item['name'] for item in page['items']]
+            path = page['next_cursor'] and f"/api/projects?per_page=3&fields=name&cursor={page['next_cursor']}"
+        self.assertEqual(len(names), 7)
+        self.assertNotIn('Secret', names)
+
+        self.login_as(self.owner)
+        names = [p['name'] for p in self.client.get('/api/projects?per_page=50').get_json()['items']]
+        self.assertIn('Mine', names)
+        self.assertNotIn('Secret', names)
+
+    def test_filters_and_bad_requests(self):
+        items = self.client.get('/api/projects?status=archived').get_json()['items']
+        self.assertEqual({p['status'] for p in items}, {'archived'})
+        self.assertEqual(self.client.get('/api/projects?fields=password').status_code, 400)
+        self.assertEqual(self.client.get('/api/projects?cursor=%%%').status_code, 400)
+        self.assertEqual(self.client.get('/api/tasks?assignee_id=me').status_code, 400)
+
+        self.login_as(self.owner)
+        tasks = self.client.get(f'/api/tasks?assignee_id={self.owner.id}&status=todo,in_progress').get_json()
+        self.assertEqual([t['title'] for t in tasks['items']], ['Todo'])
+
+    def test_ndjson_streams_every_row(self):
+        self.login_as(self.owner)
+        response = self.client.get('/api/tasks?fields=id,title',
+                                   headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(sorted(row['title'] for row in rows), ['Done', 'Todo'])
+
+
+class TaskBatchTest(TechFlowTestCase):
+    """/api/tasks/batch applies many task changes in one transaction."""
+
+    def setUp(self):
+        super().setUp()
+        migrate_db()
+        self.owner = self.make_user('batch-owner')
+        self.other = self.make_user('batch-other')
+        self.board = Project(name='Board', owner_id=self.owner.id)
+        self.backlog = Project(name='Backlog', owner_id=self.owner.id)
+        self.foreign = Project(name='Foreign', owner_id=self.other.id, visibility='public')
+        self.watched = Project(name='Watched', owner_id=self.other.id)
+        db.session.add_all([self.board, self.backlog, self.foreign, self.watched])
+        db.session.flush()
+        db.session.add(TeamMember(user_id=self.owner.id, project_id=self.watched.id, role='viewer'))
+        self.tasks = [Task(title=f'Task {i}', project_id=self.board.id) for i in range(3)]
+        self.tasks.append(Task(title='Theirs', project_id=self.foreign.id))
+        db.session.add_all(self.tasks)
+        db.session.commit()
+        self.login_as(self.owner)
+
+    def batch(self, operations, **options):
+        return self.client.post('/api/tasks/batch', json={'operations': operations, **options})
+
+    def test_mixed_batch_is_applied_with_bulk_statements(self):
+        etag = self.client.get('/api/tasks').headers['ETag']
+        first, second, third = (task.id for task in self.tasks[:3])
+        operations = [
+            {'op': 'create', 'project_id': self.board.id, 'title': 'New', 'priority': 'high'},
+            {'op': 'create', 'project_id': self.board.id, 'title': 'Already done', 'status': 'done',
+             'assignee_id': self.other.id, 'due_date': '2025-03-01T12:00:00Z'},
+            {'op': 'update', 'id': first, 'status': 'done'},
+            {'op': 'update', 'id': second, 'title': 'Renamed'},
+            {'op': 'move', 'id': third, 'project_id': self.backlog.id},
+        ]
+        operations += [{'op': 'create', 'project_id': self.board.id, 'title': f'Bulk {i}'}
+                       for i in range(50)]
+        with self.count_queries() as statements:
+            response = self.batch(operations)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertTrue(body['applied'])
+        self.assertEqual([r['status'] for r in body['results'][:5]],
+                         ['created', 'created', 'updated', 'updated', 'moved'])
+        # One multi-row INSERT, and one executemany UPDATE per set of changed columns
+        self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO task')]), 1)
+        self.assertEqual(len([s for s in statements if s.startswith('UPDATE task')]), 3)
+
+        db.session.expire_all()
+        created = db.session.get(Task, body['results'][1]['id'])
+        self.assertEqual((created.title, created.status, created.assignee_id),
+                         ('Already done', 'done', self.other.id))
+        self.assertEqual(created.due_date.isoformat(), '2025-03-01T12:00:00')
+        self.assertEqual(db.session.get(Task, body['results'][0]['id']).priority, 'high')
+        self.assertEqual(db.session.get(Task, first).status, 'done')
+        self.assertEqual(db.session.get(Task, second).title, 'Renamed')
+        self.assertEqual(db.session.get(Task, third).project_id, self.backlog.id)
+
+        response = self.batch([{'op': 'delete', 'id': first}, {'op': 'delete', 'id': second}])
+        self.assertEqual([r['status'] for r in response.get_json()['results']], ['deleted', 'deleted'])
+        self.assertIsNone(db.session.get(Task, first))
+
+        stats = self.client.get('/api/stats').get_json()
+        self.assertEqual(stats['total_tasks'], Task.query.count())
+        self.assertEqual(stats['completed_tasks'], Task.query.filter_by(status='done').count())
+        self.assertEqual(self.client.get('/api/tasks', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_atomic_batches_are_all_or_nothing(self):
+        operations = [
+            {'op': 'update', 'id': self.tasks[0].id, 'status': 'done'},
+            {'op': 'update', 'id': self.tasks[1].id, 'status': 'finished'},
+            {'op': 'delete', 'id': 999},
+        ]
+        response = self.batch(operations)
+        self.assertEqual(response.status_code, 400)
+        results = response.get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['skipped', 'error', 'error'])
+        self.assertIn('status must be one of', results[1]['error'])
+        self.assertEqual(results[2]['error'], 'Task 999 not found')
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Task, self.tasks[0].id).status, 'todo')
+
+        response = self.batch(operations, atomic=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.get_json()['results']],
+                         ['updated', 'error', 'error'])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Task, self.tasks[0].id).status, 'done')
+
+    def test_only_writable_projects_can_be_changed(self):
+        results = self.batch([
+            {'op': 'update', 'id': self.tasks[3].id, 'status': 'done'},
+            {'op': 'create', 'project_id': self.watched.id, 'title': 'Viewer cannot add'},
+            {'op': 'move', 'id': self.tasks[0].id, 'project_id': self.foreign.id},
+            {'op': 'update', 'id': self.tasks[1].id, 'assignee_id': 999},
+            {'op': 'update', 'id': self.tasks[1].id, 'priority': 'low'},
+        ], atomic=False).get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['error'] * 5)
+        self.assertIn('Not allowed', results[0]['error'])
+        self.assertIn('not writable', results[1]['error'])
+        self.assertIn('not writable', results[2]['error'])
+        self.assertEqual(results[3]['error'], 'User 999 not found')
+        self.assertIn('more than one operation', results[4]['error'])
+
+    def test_assignee_zero_is_checked_like_any_id(self):
+        results = self.batch([{'op': 'update', 'id': self.tasks[0].id, 'assignee_id': 0}],
+                             atomic=False).get_json()['results']
+        self.assertEqual(results[0]['error'], 'User 0 not found')
+
+    def test_malformed_requests(self):
+        self.assertEqual(self.client.post('/api/tasks/batch', data='nope').status_code, 400)
+        self.assertEqual(self.batch([{'op': 'create', 'project_id': self.board.id}]).status_code, 400)
+        self.assertEqual(self.batch([{'op': 'rename', 'id': 1}]).status_code, 400)
+        self.assertEqual(self.batch([{'op': ['create'], 'id': 1}]).status_code, 400)
+        self.assertEqual(self.batch([{'op': {'create': 1}, 'id': 1}]).status_code, 400)
+        self.assertEqual(self.batch([{}] * 1001).status_code, 400)
+        with self.client.session_transaction() as sess:
+            sess.clear()
+        self.assertEqual(self.batch([]).status_code, 401)
+
+
+class BulkImportTest(TechFlowTestCase):
+    """Projects, members and tasks are imported in checkpointed chunks."""
+
+    def setUp(self):
+        super().setUp()
+        migrate_db()
+        self.admin = self.make_user('importer', role='admin')
+        self.make_user('alice')
+        self.make_user('bob')
+        self.login_as(self.admin)
+
+    def records(self, broken=False):
+        records = [
+            {'type': 'project', 'project': 'web', 'name': 'Website', 'owner': 'alice', 'visibility': 'public'},
+            {'type': 'member', 'project': 'web', 'user': 'bob'},
+            {'type': 'task', 'project': 'web', 'title': 'Landing page', 'assignee': 'bob'},
+            {'type': 'project', 'project': 'api', 'name': 'API', 'owner': 'bob', 'status': 'archived'},
+            {'type': 'task', 'project': 'api', 'title': 'Auth', 'status': 'done',
+             'assignee': 'carol' if broken else 'alice'},
+            {'type': 'task', 'project': 'web', 'title': 'Footer', 'priority': 'low'},
+            {'type': 'member', 'project': 'api', 'user': 'alice', 'role': 'viewer'},
+        ]
+        return ''.join(json.dumps(record) + '\n' for record in records)
+
+    def test_ndjson_import_over_the_api(self):
+        response = self.client.post('/api/import?source=team.ndjson', data=self.records(),
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        job = response.get_json()
+        self.assertEqual((job['status'], job['rows_done'], job['projects_created'],
+                          job['members_created'], job['tasks_created']), ('completed', 7, 2, 2, 3))
+
+        web = Project.query.filter_by(name='Website').one()
+        self.assertEqual((web.owner.username, web.visibility, web.status), ('alice', 'public', 'active'))
+        self.assertEqual(sorted(task.title for task in web.tasks), ['Footer', 'Landing page'])
+        self.assertEqual(Task.query.filter_by(title='Auth').one().status, 'done')
+        self.assertEqual(TeamMember.query.filter_by(role='viewer').one().user.username, 'alice')
+        stats = self.client.get('/api/stats').get_json()
+        self.assertEqual((stats['total_projects'], stats['active_projects'],
+                          stats['total_tasks'], stats['completed_tasks']), (2, 1, 3, 1))
+        self.assertEqual(self.client.get(f"/api/import/{job['id']}").get_json()['status'], 'completed')
+
+    def test_failed_chunk_is_rolled_back_and_resumed(self):
+        job = ImportJob(format='ndjson')
+        db.session.add(job)
+        db.session.commit()
+        bulk_import.run(job, io.StringIO(self.records(broken=True)), chunk_size=2)
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'line 5: unknown user carol')
+        # The first two chunks stay, the one with line 5 is rolled back
+        self.assertEqual(job.rows_done, 4)
+        self.assertEqual(Project.query.count(), 2)
+        self.assertEqual(Task.query.count(), 1)
+
+        progress = []
+        bulk_import.run(job, io.StringIO(self.records()), chunk_size=2,
+                        progress=lambda job: progress.append(job.rows_done))
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(progress, [6, 7])
+        self.assertEqual((Project.query.count(), TeamMember.query.count(), Task.query.count()), (2, 2, 3))
+        api = Project.query.filter_by(name='API').one()
+        self.assertEqual(Task.query.filter_by(title='Auth').one().project_id, api.id)
+
+    def test_undecodable_upload_fails_the_job_and_can_be_resumed(self):
+        # Latin-1 text from the third line on
+        body = self.records().replace('Footer', 'Pied de page \u00e9').encode('latin-1')
+        response = self.client.post('/api/import?format=ndjson', data=body)
+        self.assertEqual(response.status_code, 400)
+        job = response.get_json()
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('not valid UTF-8', job['error'])
+
+        response = self.client.post(f"/api/import?resume={job['id']}", data=self.records().encode())
+        self.assertEqual(response.get_json()['status'], 'completed')
+        self.assertEqual(Task.query.count(), 3)
+
+    def test_csv_import_from_the_command_line(self):
+        path = os.path.join(_tmpdir, 'team.csv')
+        with open(path, 'w', newline='') as f:
+            f.write('type,project,name,owner,user,title,status\n'
+                    'project,ops,Operations,alice,,,\n'
+                    'member,ops,,,bob,,\n'
+                    'task,ops,,,,Rotate keys,in_progress\n')
+        result = app.test_cli_runner().invoke(args=['import-data', path, '--chunk-size', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('rows (1 projects, 1 members, 0 tasks)', result.output)
+        self.assertEqual(Task.query.one().status, 'in_progress')
+
+        with open(path, 'a') as f:
+            f.write('task,nowhere,,,,Lost,\n')
+        result = app.test_cli_runner().invoke(args=['import-data', path])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('line 5: unknown project nowhere', result.output)
+        self.assertIn('--resume', result.output)
+
+    def test_invalid_requests(self):
+        bad = self.client.post('/api/import', data='{"type": "epic", "project": "x"}\n')
+        self.assertEqual(bad.status_code, 400)
+        self.assertIn('type must be', bad.get_json()['error'])
+        unhashable = self.client.post('/api/import', data='{"type": ["project"], "project": "x"}\n')
+        self.assertEqual(unhashable.status_code, 400)
+        self.assertEqual(unhashable.get_json()['status'], 'failed')
+        self.assertIn('type must be', unhashable.get_json()['error'])
+        self.assertEqual(self.client.post('/api/import?format=xml', data='').status_code, 400)
+        self.login_as(self.make_user('developer'))
+        self.assertEqual(self.client.post('/api/import', data=self.records()).status_code, 403)
+
+
+class UserExportTest(TechFlowTestCase):
+    """Admins can stream the user table without password hashes."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.make_user('root', role='admin')
+        for i in range(30):
+            self.make_user(f'member{i:02d}')
+
+    def test_jsonl_export_streams_every_user(self):
+        self.login_as(self.admin)
+        response = self.client.get('/admin/users/export')
+        self.assertTrue(response.is_streamed)
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(rows), 31)
+        self.assertNotIn('password_hash', rows[0])
+        self.assertEqual(rows[1]['username'], 'member00')
+
+    def test_csv_export(self):
+        self.login_as(self.admin)
+        lines = self.client.get('/admin/users/export?format=csv').get_data(as_text=True).splitlines()
+        self.assertTrue(lines[0].startswith('id,username,email'))
+        self.assertEqual(len(lines), 32)
+
+    def test_export_requires_admin(self):
+        self.login_as(User.query.filter_by(username='member00').one())
+        self.assertEqual(self.client.get('/admin/users/export').status_code, 403)
+
+    def test_smoke_endpoint_returns_a_bounded_sample(self):
+        data = self.client.get('/test').get_json()
+        self.assertEqual(data['total_users'], 31)
+        self.assertEqual(len(data['users']), 20)
+
+
+class DashboardSnapshotTest(TechFlowTestCase):
+    """The dashboard loads every panel and true totals in two queries."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('busy-dev', full_name='Busy Dev')
+        other = self.make_user('lead')
+        for i in range(8):
+            own = Project(name=f'Own {i}', owner_id=self.user.id)
+            team = Project(name=f'Team {i}', owner_id=other.id)
+            db.session.add_all([own, team])
+            db.session.flush()
+            db.session.add(TeamMember(user_id=self.user.id, project_id=team.id))
+            db.session.add(Task(title=f'Open {i}', project_id=team.id, assignee_id=self.user.id))
+            db.session.add(Task(title=f'Closed {i}', project_id=own.id,
+                                assignee_id=self.user.id, status='done'))
+        for i in range(12):
+            db.session.add(UserActivity(user_id=self.user.id, activity_type='login'))
+        db.session.commit()
+
+    def test_snapshot_counts_are_not_capped_by_panel_limits(self):
+        user_id = self.user.id
+        with self.count_queries() as statements:
+            snapshot = load_dashboard(user_id)
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(snapshot.full_name, 'Busy Dev')
+        self.assertEqual(snapshot.total_projects, 16)
+        self.assertEqual(snapshot.active_tasks, 8)
+        self.assertEqual(snapshot.completed_tasks, 8)
+        self.assertEqual(snapshot.team_memberships, 8)
+        self.assertEqual([p.name for p in snapshot.user_projects],
+                         ['Own 7', 'Own 6', 'Own 5', 'Own 4', 'Own 3'])
+        self.assertEqual({p.owner_username for p in snapshot.team_projects}, {'lead'})
+        self.assertEqual(len(snapshot.activities), 10)
+        self.assertEqual(len(snapshot.assigned_tasks), 5)
+        self.assertTrue(all(t.project_name.startswith('Team') for t in snapshot.assigned_tasks))
+
+    def test_missing_user_has_no_snapshot(self):
+        self.assertIsNone(load_dashboard(9999))
+
+    def test_dashboard_page_renders_snapshot(self):
+        self.login_as(self.user)
+        html = self.client.get('/dashboard').get_data(as_text=True)
+        self.assertIn('Welcome back, Busy Dev!', html)
+        self.assertIn('<div class="stats-number">16</div>', html)
+
+
+class SQLInstrumentationTest(TechFlowTestCase):
+    """Requests report their query count and repeated statement shapes."""
+
+    def setUp(self):
+        super().setUp()
+        app.config['SQL_DEBUG_HEADERS'] = True
+
+    def tearDown(self):
+        app.config.pop('SQL_DEBUG_HEADERS', None)
+        super().tearDown()
+
+    def test_debug_headers_report_query_count(self):
+        with self.count_queries() as statements:
+            response = self.client.get('/api/projects')
+        self.assertEqual(response.headers['X-SQL-Query-Count'], str(len(statements)))
+        self.assertIn('X-SQL-Time-Ms', response.headers)
+
+    def test_debug_headers_follow_debug_mode_when_unset(self):
+        del app.config['SQL_DEBUG_HEADERS']
+        self.assertNotIn('X-SQL-Query-Count', self.client.get('/api/health').headers)
+        # As set by app.run(debug=True), after create_app()
+        app.debug = True
+        try:
+            self.assertIn('X-SQL-Query-Count', self.client.get('/api/health').headers)
+        finally:
+            app.debug = False
+
+    def test_repeated_statement_shapes_are_flagged(self):
+        with app.test_request_context('/loop'):
+            app.preprocess_request()
+            for user_id in range(6):
+                db.session.get(User, user_id)
+            with self.assertLogs('sql_instrumentation', 'WARNING') as logs:
+                response = app.process_response(Response())
+        self.assertEqual(response.headers['X-SQL-Query-Count'], '6')
+        self.assertIn('Possible N+1 in GET /loop: statement ran 6 times', logs.output[0])
+
+    def test_slow_queries_are_logged(self):
+        app.config['SQL_SLOW_QUERY_MS'] = 0
+        try:
+            with self.assertLogs('sql_instrumentation', 'WARNING') as logs:
+                db.session.execute(db.text('SELECT 1'))
+        finally:
+            app.config['SQL_SLOW_QUERY_MS'] = 100
+        self.assertIn('Slow query', logs.output[0])
+
+
+class MetricsTest(TechFlowTestCase):
+    """/metrics exposes per-endpoint counters in Prometheus text format."""
+
+    def sample(self, text, name):
+        for line in text.splitlines():
+            if line.split(' ')[0] == name:
+                return float(line.rsplit(' ', 1)[1])
+        return 0.0
+
+    def test_requests_latency_and_db_time_are_exported(self):
+        before = self.client.get('/metrics').get_data(as_text=True)
+        ok = 'techflow_http_requests_total{endpoint="main.api_stats",method="GET",status="200"}'
+        bad = 'techflow_http_requests_total{endpoint="main.api_projects",method="GET",status="400"}'
+        count = 'techflow_http_request_duration_seconds_count{endpoint="main.api_stats"}'
+
+        self.client.get('/api/stats')
+        self.client.get('/api/stats')
+        self.client.get('/api/projects?fields=bogus')
+
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertEqual(self.sample(text, ok) - self.sample(before, ok), 2)
+        self.assertEqual(self.sample(text, bad) - self.sample(before, bad), 1)
+        self.assertEqual(self.sample(text, count) - self.sample(before, count), 2)
+        self.assertIn('techflow_http_request_duration_seconds_bucket{endpoint="main.api_stats",le="+Inf"}', text)
+        self.assertIn('techflow_db_queries_total{endpoint="main.api_stats"}', text)
+        self.assertIn('techflow_cache_hit_ratio ', text)
+
+    def test_scrape_does_not_count_cache_entries(self):
+        def size():
+            raise AssertionError('metrics scrape counted cache entries')
+        cache.backend.size = size
+        try:
+            text = self.client.get('/metrics').get_data(as_text=True)
+        finally:
+            del cache.backend.size
+        self.assertIn('techflow_cache_hits_total ', text)
+        # The scrape itself is the only request in flight
+        self.assertEqual(self.sample(text, 'techflow_http_requests_in_flight'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the TechFlow static asset pipeline.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, render_template_string
+
+from assets import Assets, build_assets, vendor_assets
+
+FONT_CSS = "@font-face { src: url(https://fonts.example.com/s/inter/v1/inter.woff2) format('woff2'); }"
+ICON_CSS = ".fa { background: url(../webfonts/fa-solid.woff2?v=6) } " * 20
+
+
+class AssetPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='techflow-assets-')
+        self.addCleanup(shutil.rmtree, self.root)
+        self.static = os.path.join(self.root, 'static')
+        os.makedirs(os.path.join(self.static, 'img'))
+        with open(os.path.join(self.static, 'style.css'), 'w') as f:
+            f.write('.logo { background: url("img/logo.png") }\n' + 'body { color: #222 }\n' * 50)
+        with open(os.path.join(self.static, 'img', 'logo.png'), 'wb') as f:
+            f.write(b'\x89PNG' + b'\x00' * 1000)
+        self.dist = os.path.join(self.static, 'dist')
+        self.vendor = {
+            'vendor/inter.css': 'https://fonts.example.com/css2?family=Inter',
+            'vendor/fa/css/all.min.css': 'https://cdn.example.com/fa/6.4.0/css/all.min.css',
+        }
+        self.file_origins = {'vendor/inter.css': ('https://fonts-files.example.com',)}
+        self.fetched = []
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        return {
+            'https://fonts.example.com/css2?family=Inter': FONT_CSS.encode(),
+            'https://cdn.example.com/fa/6.4.0/css/all.min.css': ICON_CSS.encode(),
+        }.get(url, b'font-bytes')
+
+    def make_app(self):
+        app = Flask(__name__, static_folder=self.static)
+        app.config['ASSETS_VENDOR'] = self.vendor
+        app.config['ASSETS_VENDOR_FILE_ORIGINS'] = self.file_origins
+        Assets(app)
+        return app
+
+    def read(self, name):
+        with open(os.path.join(self.dist, name), 'rb') as f:
+            return f.read()
+
+    def test_vendoring_downloads_stylesheets_and_their_files(self):
+        vendor_assets(self.static, self.vendor, fetch=self.fetch)
+
+        self.assertIn('https://cdn.example.com/fa/6.4.0/webfonts/fa-solid.woff2?v=6', self.fetched)
+        self.assertTrue(os.path.exists(os.path.join(self.static, 'vendor/fa/webfonts/fa-solid.woff2')))
+        with open(os.path.join(self.static, 'vendor/inter.css')) as f:
+            self.assertIn('url(files/inter.woff2)', f.read())
+
+        # Already vendored files are not downloaded again
+        self.fetched.clear()
+        vendor_assets(self.static, self.vendor, fetch=self.fetch)
+        self.assertEqual(self.fetched, [])
+
+    def test_build_fingerprints_rewrites_and_precompresses(self):
+        vendor_assets(self.static, self.vendor, fetch=self.fetch)
+        manifest = build_assets(self.static, self.dist, vendor=self.vendor, file_origins=self.file_origins)
+
+        self.assertRegex(manifest['style.css'], r'^style\.[0-9a-f]{10}\.css$')
+        with open(os.path.join(self.dist, 'manifest.json')) as f:
+            self.assertEqual(json.load(f), {'files': manifest, 'remote_origins': []})
+        style = self.read(manifest['style.css']).decode()
+        self.assertIn(f"url({manifest['img/logo.png']})", style)
+        icons = self.read(manifest['vendor/fa/css/all.min.css']).decode()
+        fingerprinted_font = os.path.basename(manifest['vendor/fa/webfonts/fa-solid.woff2'])
+        self.assertIn(f'url(../webfonts/{fingerprinted_font}?v=6)', icons)
+
+        self.assertEqual(gzip.decompress(self.read(manifest['style.css'] + '.gz')).decode(), style)
+        self.assertFalse(os.path.exists(os.path.join(self.dist, manifest['img/logo.png'] + '.gz')))
+        # Rebuilding unchanged sources gives the same names
+        self.assertEqual(build_assets(self.static, self.dist), manifest)
+
+    def test_built_assets_are_served_immutable_and_precompressed(self):
+        manifest = build_assets(self.static, self.dist)
+        app = self.make_app()
+        client = app.test_client()
+        with app.test_request_context():
+            url = render_template_string("{{ asset_url('style.css') }}")
+        self.assertEqual(url, f"/assets/{manifest['style.css']}")
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), self.read(manifest['style.css']))
+
+        plain = client.get(url)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.data, self.read(manifest['style.css']))
+
+    def test_unbuilt_assets_fall_back_to_static_and_cdn(self):
+        app = self.make_app()
+        with app.test_request_context():
+            self.assertEqual(render_template_string("{{ asset_url('style.css') }}"), '/static/style.css')
+            self.assertEqual(render_template_string("{{ asset_url('vendor/inter.css') }}"),
+                             'https://fonts.example.com/css2?family=Inter')
+            self.assertEqual(app.extensions['assets'].remote_origins(), [
+                {'origin': 'https://fonts.example.com', 'crossorigin': False},
+                {'origin': 'https://fonts-files.example.com', 'crossorigin': True},
+                {'origin': 'https://cdn.example.com', 'crossorigin': False},
+            ])
+
+    def test_offline_build_keeps_origins_of_assets_not_vendored(self):
+        # Only Font Awesome is in static/; the Inter stylesheet and its font
+        # files still come from their CDNs
+        vendor_assets(self.static, {'vendor/fa/css/all.min.css': self.vendor['vendor/fa/css/all.min.css']},
+                      fetch=self.fetch)
+        build_assets(self.static, self.dist, vendor=self.vendor, file_origins=self.file_origins)
+        app = self.make_app()
+        with app.test_request_context():
+            self.assertEqual(render_template_string("{{ asset_url('vendor/inter.css') }}"),
+                             'https://fonts.example.com/css2?family=Inter')
+            hints = render_template_string(
+                "{% for remote in remote_origins() %}{{ remote.origin }}"
+                "{% if remote.crossorigin %} crossorigin{% endif %};{% endfor %}")
+        self.assertEqual(hints, 'https://fonts.example.com;https://fonts-files.example.com crossorigin;')
+
+
+if __name__ == '__main__':
+    unittest.main()
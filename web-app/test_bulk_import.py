@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Unit tests for reading bulk import files.
+"""
+
+import csv
+import io
+import unittest
+
+from bulk_import import ImportRecordError, read_import_records
+
+
+class ReadImportRecordsTest(unittest.TestCase):
+
+    def read(self, data, import_format):
+        lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', newline='')
+        return list(read_import_records(lines, import_format))
+
+    def test_csv_and_ndjson_records(self):
+        records = self.read(b'\xef\xbb\xbftype,project,name\nproject,web,Website\nmember,web,\n', 'csv')
+        self.assertEqual(records, [(2, {'type': 'project', 'project': 'web', 'name': 'Website'}),
+                                   (3, {'type': 'member', 'project': 'web'})])
+        records = self.read(b'{"type": "task", "title": "x", "due_date": null}\n\n{"type": "member"}\n', 'ndjson')
+        self.assertEqual(records, [(1, {'type': 'task', 'title': 'x'}), (3, {'type': 'member'})])
+
+    def test_invalid_records(self):
+        with self.assertRaisesRegex(ImportRecordError, 'line 2: more values than header columns'):
+            self.read(b'type,project\nproject,web,extra\n', 'csv')
+        with self.assertRaisesRegex(ImportRecordError, 'line 2: invalid JSON'):
+            self.read(b'{"type": "project"}\n{"type": \n', 'ndjson')
+        with self.assertRaisesRegex(ImportRecordError, 'line 1: expected a JSON object'):
+            self.read(b'[1, 2]\n', 'ndjson')
+
+    def test_undecodable_text(self):
+        for import_format, data in (('csv', b'type,name\nproject,Caf\xe9\n'),
+                                    ('ndjson', b'{"name": "Caf\xe9"}\n')):
+            with self.subTest(import_format), self.assertRaisesRegex(ImportRecordError, 'not valid UTF-8'):
+                self.read(data, import_format)
+
+    def test_malformed_csv(self):
+        field = 'x' * (csv.field_size_limit() + 1)
+        with self.assertRaisesRegex(ImportRecordError, 'line 3: invalid CSV'):
+            self.read(f'type,name\nproject,ok\nproject,{field}\n'.encode(), 'csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the TechFlow cache layer.
+"""
+
+import time
+import unittest
+
+from jinja2 import DictLoader, Environment
+
+from cache import Cache, MemoryBackend
+from fragment_cache import FragmentCacheExtension
+
+
+class FakeApp:
+    def __init__(self, **config):
+        self.config = config
+        self.extensions = {}
+
+
+class MemoryBackendTest(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get_many(['a'])
+        backend.set('c', 3)
+        self.assertEqual(backend.get_many(['a', 'c']), [1, 3])
+        self.assertEqual(backend.evictions, 1)
+        self.assertEqual(backend.size(), 2)
+
+    def test_entries_expire(self):
+        backend = MemoryBackend()
+        backend.set('short', 'value', ttl=0.01)
+        time.sleep(0.02)
+        self.assertEqual(backend.size(), 1)
+        self.assertNotEqual(backend.get_many(['short']), ['value'])
+        self.assertEqual(backend.size(), 0)
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = Cache(FakeApp(CACHE_MAX_ENTRIES=16))
+
+    def test_cached_decorator_counts_hits_and_misses(self):
+        calls = []
+
+        @self.cache.cached(tags=('project',))
+        def square(n):
+            calls.append(n)
+            return n * n
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(4), 16)
+        self.assertEqual(calls, [3, 4])
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_cached_decorator_is_keyed_on_an_outside_version(self):
+        version, calls = [1], []
+
+        @self.cache.cached(version=lambda: version[0])
+        def totals():
+            calls.append(version[0])
+            return {'users': len(calls)}
+
+        self.assertEqual(totals(), {'users': 1})
+        self.assertEqual(totals(), {'users': 1})
+        # Changed elsewhere, with nothing invalidated in this cache
+        version[0] = 2
+        self.assertEqual(totals(), {'users': 2})
+        self.assertEqual(calls, [1, 2])
+
+    def test_invalidate_retires_tagged_entries_only(self):
+        self.cache.set('projects', ['old'], tags=('project',))
+        self.cache.set('users', ['alice'], tags=('user',))
+        self.cache.invalidate('project')
+        self.assertIsNone(self.cache.get('projects', tags=('project',)))
+        self.assertEqual(self.cache.get('users', tags=('user',)), ['alice'])
+
+
+class FragmentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.renders = 0
+        self.env = Environment(autoescape=True, extensions=[FragmentCacheExtension], loader=DictLoader({
+            'page.html': "<p>{% cache 'grid', 60, version %}{{ render() }}{% endcache %}</p>",
+        }))
+        self.env.fragment_cache = Cache(FakeApp(CACHE_MAX_ENTRIES=16))
+
+    def render(self, version=1):
+        def render():
+            self.renders += 1
+            return '<b>grid</b>'
+        return self.env.get_template('page.html').render(render=render, version=version)
+
+    def test_fragment_is_rendered_once_per_version(self):
+        self.assertEqual(self.render(), '<p>&lt;b&gt;grid&lt;/b&gt;</p>')
+        self.assertEqual(self.render(), '<p>&lt;b&gt;grid&lt;/b&gt;</p>')
+        self.assertEqual(self.renders, 1)
+        self.render(version=2)
+        self.assertEqual(self.renders, 2)
+
+    def test_none_key_part_or_no_cache_renders_every_time(self):
+        self.render(version=None)
+        self.render(version=None)
+        self.assertEqual(self.renders, 2)
+        self.env.fragment_cache = None
+        self.render()
+        self.assertEqual(self.renders, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
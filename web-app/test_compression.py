@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for TechFlow response compression.
+"""
+
+import gzip
+import unittest
+import zlib
+
+from flask import Flask, Response, jsonify
+
+from compression import Compression, _brotli
+
+PAGE = '<html><body>' + '<div class="project-card">TechFlow</div>\n' * 200 + '</body></html>'
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    Compression(app)
+
+    @app.route('/page')
+    def page():
+        return PAGE
+
+    @app.route('/small')
+    def small():
+        return jsonify(ok=True)
+
+    @app.route('/binary')
+    def binary():
+        return Response(b'\x00' * 5000, mimetype='image/png')
+
+    @app.route('/stream')
+    def stream():
+        def rows():
+            for i in range(2000):
+                yield f'{{"id": {i}, "name": "Project {i}"}}\n'
+        return Response(rows(), mimetype='application/x-ndjson')
+
+    @app.route('/etag')
+    def etag():
+        response = Response(PAGE)
+        response.set_etag('abc')
+        return response
+
+    @app.route('/precompressed')
+    def precompressed():
+        response = Response(gzip.compress(PAGE.encode()), mimetype='text/css')
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    return app
+
+
+class CompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = make_app().test_client()
+
+    def get(self, path, encoding='gzip'):
+        return self.client.get(path, headers={'Accept-Encoding': encoding})
+
+    def test_large_pages_are_gzipped(self):
+        response = self.get('/page')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertLess(len(response.data), len(PAGE) // 10)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(gzip.decompress(response.data).decode(), PAGE)
+
+    def test_small_and_binary_responses_are_not_compressed(self):
+        small = self.get('/small')
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertIn('Accept-Encoding', small.headers['Vary'])
+        self.assertNotIn('Content-Encoding', self.get('/binary').headers)
+        self.assertEqual(self.get('/precompressed').headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(self.get('/precompressed').data).decode(), PAGE)
+
+    def test_clients_that_do_not_accept_gzip_get_identity(self):
+        self.assertEqual(self.client.get('/page').data.decode(), PAGE)
+        self.assertNotIn('Content-Encoding', self.get('/page', 'gzip;q=0, identity').headers)
+
+    def test_streamed_responses_are_compressed_incrementally(self):
+        response = self.get('/stream')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        chunks = list(response.response)
+        self.assertGreater(len(chunks), 2)
+        # Rows are decodable as soon as the first flush arrives
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = decoder.decompress(b''.join(chunks[:2])).decode()
+        self.assertTrue(first.startswith('{"id": 0,'))
+        self.assertTrue(first.endswith('\n'))
+        body = gzip.decompress(b''.join(chunks)).decode()
+        self.assertEqual(len(body.splitlines()), 2000)
+
+    def test_strong_etags_become_weak(self):
+        response = self.get('/etag')
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+
+    def test_level_is_configurable(self):
+        fast = make_app(COMPRESS_LEVEL=1).test_client()
+        best = make_app(COMPRESS_LEVEL=9).test_client()
+        fast_size = len(fast.get('/page', headers={'Accept-Encoding': 'gzip'}).data)
+        best_size = len(best.get('/page', headers={'Accept-Encoding': 'gzip'}).data)
+        self.assertLessEqual(best_size, fast_size)
+
+    @unittest.skipUnless(_brotli(), 'brotli is not installed')
+    def test_brotli_is_preferred_when_available(self):
+        response = self.get('/page', 'gzip, br')
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(_brotli().decompress(response.data).decode(), PAGE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for TechFlow password hashing.
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import passwords
+from passwords import PasswordHasher
+
+
+class FakeApp:
+    def __init__(self, **config):
+        self.config = config
+        self.extensions = {}
+
+
+class PasswordHasherTest(unittest.TestCase):
+
+    def test_hashes_and_verifies(self):
+        hasher = PasswordHasher(FakeApp(PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+                                        PASSWORD_HASH_CONCURRENCY=1))
+        password_hash = hasher.hash('correct horse')
+        self.assertTrue(hasher.verify(password_hash, 'correct horse'))
+        self.assertFalse(hasher.verify(password_hash, 'wrong horse'))
+
+    def test_concurrent_hashes_are_bounded(self):
+        hasher = PasswordHasher(FakeApp(PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+                                        PASSWORD_HASH_CONCURRENCY=2))
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_hash(password, method):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return f'{method}$salt$digest'
+
+        with mock.patch.object(passwords, 'generate_password_hash', slow_hash):
+            threads = [threading.Thread(target=hasher.hash, args=('pw',)) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(peak[0], 2)
+
+    def test_needs_rehash_compares_method(self):
+        hasher = PasswordHasher(FakeApp(PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+                                        PASSWORD_HASH_CONCURRENCY=0))
+        self.assertFalse(hasher.needs_rehash(hasher.hash('pw')))
+        self.assertTrue(hasher.needs_rehash('pbkdf2:sha256:260000$salt$digest'))
+        self.assertTrue(hasher.needs_rehash('scrypt:32768:8:1$salt$digest'))
+
+    def test_shorthand_methods_match_their_stored_form(self):
+        for method, stored in (('scrypt', 'scrypt:32768:8:1'), ('pbkdf2', 'pbkdf2:sha256:600000'),
+                               ('pbkdf2:sha256', 'pbkdf2:sha256:600000')):
+            hasher = PasswordHasher(FakeApp(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_CONCURRENCY=0))
+            self.assertEqual(hasher.stored_method, stored)
+            self.assertFalse(hasher.needs_rehash(f'{stored}$salt$digest'), method)
+            self.assertTrue(hasher.needs_rehash('pbkdf2:sha256:1000$salt$digest'), method)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for TechFlow.
+
+    gunicorn --config gunicorn.conf.py wsgi:app
+
+Importing this module does no schema work, because every worker imports it
+and concurrent migrations would race. gunicorn.conf.py checks the schema
+once in the master before any worker starts (see ensure_schema()); under
+another server, run ``flask migrate-db`` before starting it.
+"""
+
+from app import create_app
+
+app = create_app()